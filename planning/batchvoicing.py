@@ -0,0 +1,141 @@
+# batchvoicing.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Contrary motion voicings for whole arrays of inputs at once, with NumPy, for analysis, auditioning and pre-rendering.
+# Gives the same chords as buildContraryChord() in theory.py, one row per input, without a Python loop over the inputs.
+#
+#   python batchvoicing.py     # check every input against buildContraryChord()
+
+import numpy
+
+from theory import *
+from voicingtable import LOWEST_ROOT, HIGHEST_ROOT
+
+# region Constants
+# voicing codes, the chord width from buildContraryChord() for the 4 voice voicings
+NO_VOICING = 0           # buildContraryChord() raises ValueError for these inputs
+SINGLE_NOTE = 1          # the pivot pitch alone, when the contrary pitch is at or above it
+# widths 2-4 are close voicings with that many notes, widths 5-9 are the 4 voice voicings, named by VOICING_NAMES in theory.py
+NO_PITCH = -1000         # fills the unused voices of a row, voicings can reach below 0 so see voiceCounts()
+
+DEGREES_PER_SCALE = len(SCALES_OF_CHORDS[0])  # notes in every scale of chords
+
+# scale of chords ID --> pitch classes
+SCALE_PITCH_CLASSES = numpy.array([SCALES_OF_CHORDS[scaleId] for scaleId in range(len(SCALES_OF_CHORDS))])
+
+# scale of chords ID, pitch class --> scale degree, or -1 if the pitch class is not in the scale
+SCALE_DEGREE_OF_PITCH_CLASS = numpy.full((len(SCALES_OF_CHORDS), OCTAVE), -1, dtype=numpy.int64)
+for scaleId in range(len(SCALES_OF_CHORDS)):
+    for degree, pitchClass in enumerate(SCALES_OF_CHORDS[scaleId]):
+        SCALE_DEGREE_OF_PITCH_CLASS[scaleId, pitchClass] = degree
+
+# chord width, note --> is the note one of the 4 voices? the "maintain 4 voices" rule of buildContraryChord()
+SKIPPED_NOTES = {OCTAVE_CHORD: (3,), DROP_2: (2, 5), DROP_3: (2, 3, 5), DROP_2_AND_4: (2, 4, 5, 7),
+                 DOUBLE_OCTAVE_CHORD: (2, 3, 5, 7, 8)}
+KEPT_NOTES = numpy.ones((MAX_CHORD_WIDTH + 1, MAX_CHORD_WIDTH + 1), dtype=bool)
+for width, notes in SKIPPED_NOTES.items():
+    KEPT_NOTES[width, list(notes)] = False
+# endregion
+
+# voicings for every input, broadcast together like any NumPy operation
+# returns (pitches, voicings): an (N, 4) array of pitches, lowest first and padded with NO_PITCH,
+# and the voicing code of each row, where NO_VOICING marks the inputs buildContraryChord() rejects
+def contraryMotionBatch(contraryPitches, pivotPitches, scaleOfChordsIds, scaleOfChordsRoots):
+    contrary, pivot, scaleIds, roots = numpy.broadcast_arrays(
+        *[numpy.asarray(values, dtype=numpy.int64).ravel() for values in
+          (contraryPitches, pivotPitches, scaleOfChordsIds, scaleOfChordsRoots)])
+    count = len(contrary)
+
+    inputScaleDegree = SCALE_DEGREE_OF_PITCH_CLASS[scaleIds, (contrary - roots) % OCTAVE]
+    pivotScaleDegree = SCALE_DEGREE_OF_PITCH_CLASS[scaleIds, (pivot - roots) % OCTAVE]
+    singleNote = contrary >= pivot
+    inScale = (inputScaleDegree >= 0) & (pivotScaleDegree >= 0)
+    chorded = ~singleNote & inScale
+
+    octaveSpread = numpy.abs(contrary - pivot) // OCTAVE
+    chordWidth = 1 + (pivotScaleDegree - inputScaleDegree) % DEGREES_PER_SCALE + DEGREES_PER_SCALE * octaveSpread
+    chordWidth = numpy.minimum(chordWidth, MAX_CHORD_WIDTH)
+
+    pitches = numpy.full((count, MAX_VOICES), NO_PITCH, dtype=numpy.int64)
+
+    # take a note, skip a note, for every chorded row at once, one note of the widest chord per step
+    chordRows = numpy.flatnonzero(chorded)
+    chordScaleIds, chordRoots, width = scaleIds[chordRows], roots[chordRows], chordWidth[chordRows]
+    startDegree = inputScaleDegree[chordRows]
+    chordPitches = numpy.full((len(chordRows), MAX_VOICES), NO_PITCH, dtype=numpy.int64)
+    voices = numpy.zeros(len(chordRows), dtype=numpy.int64)  # voices filled so far in each row
+    rows = numpy.arange(len(chordRows))
+    previousPitch = contrary[chordRows]
+    currentOctave = (previousPitch - chordRoots) // OCTAVE
+    for note in range(1, MAX_CHORD_WIDTH + 1):
+        currentPitch = SCALE_PITCH_CLASSES[chordScaleIds, (startDegree + 2 * (note - 1)) % DEGREES_PER_SCALE] \
+                       + chordRoots + OCTAVE * (currentOctave - 1)
+
+        # keep adding higher notes
+        higher = currentPitch < previousPitch
+        currentOctave += higher
+        currentPitch += OCTAVE * higher
+        previousPitch = currentPitch
+
+        kept = (note <= width) & KEPT_NOTES[width, note]
+        chordPitches[rows[kept], voices[kept]] = currentPitch[kept]
+        voices += kept
+    pitches[chordRows] = chordPitches
+
+    # the pivot pitch alone
+    pitches[singleNote, 0] = pivot[singleNote]
+
+    voicings = numpy.where(chorded, chordWidth, NO_VOICING)
+    voicings[singleNote] = SINGLE_NOTE
+    return pitches, voicings
+
+# how many voices each row of contraryMotionBatch() has
+def voiceCounts(voicings):
+    return numpy.minimum(voicings, MAX_VOICES)
+
+# every input the voicing table covers, as flat arrays of (contrary pitch, pivot pitch, scale of chords ID, root)
+def allInputs(pitches=128, lowestRoot=LOWEST_ROOT, highestRoot=HIGHEST_ROOT):
+    contrary, pivot, scaleIds, roots = numpy.meshgrid(numpy.arange(pitches), numpy.arange(pitches),
+                                                      numpy.arange(len(SCALES_OF_CHORDS)),
+                                                      numpy.arange(lowestRoot, highestRoot + 1), indexing="ij")
+    return contrary.ravel(), pivot.ravel(), scaleIds.ravel(), roots.ravel()
+
+# inputs where contraryMotionBatch() and buildContraryChord() disagree, as
+# [(contrary pitch, pivot pitch, scale of chords ID, root, batch chord, scalar chord)]
+def verifyBatchVoicings(contraryPitches, pivotPitches, scaleOfChordsIds, scaleOfChordsRoots):
+    pitches, voicings = contraryMotionBatch(contraryPitches, pivotPitches, scaleOfChordsIds, scaleOfChordsRoots)
+    counts = voiceCounts(voicings).tolist()
+    mismatches = []
+    for row, inputs in enumerate(zip(contraryPitches.tolist(), pivotPitches.tolist(), scaleOfChordsIds.tolist(),
+                                     scaleOfChordsRoots.tolist())):
+        contraryPitch, pivotPitch, scaleId, root = inputs
+        try:
+            expected = buildContraryChord(contraryPitch, pivotPitch, SCALES_OF_CHORDS[scaleId], root)
+        except ValueError:
+            expected = None
+        if voicings[row] == NO_VOICING:
+            chord = None
+        else:
+            chord = pitches[row, :counts[row]].tolist()
+        if chord != expected:
+            mismatches.append((contraryPitch, pivotPitch, scaleId, root, chord, expected))
+    return mismatches
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    inputs = allInputs()
+    start = time.time()
+    pitches, voicings = contraryMotionBatch(*inputs)
+    elapsed = time.time() - start
+    print("%d voicings in %.2fs, %.0f per second" % (len(voicings), elapsed, len(voicings) / elapsed))
+    for code, name in enumerate(VOICING_NAMES):
+        print("  %-14s %8d" % (name, numpy.count_nonzero(voicings == code)))
+
+    start = time.time()
+    mismatches = verifyBatchVoicings(*inputs)
+    print("Verified against buildContraryChord() in %.1fs, %d mismatches" % (time.time() - start, len(mismatches)))
+    for mismatch in mismatches[:10]:
+        print("  " + str(mismatch))
+    sys.exit(1 if mismatches else 0)
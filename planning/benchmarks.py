@@ -0,0 +1,289 @@
+# benchmarks.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Micro-benchmarks for the hot path of the instrument: contrary motion voicings, tilt to pitch,
+# the button logic and the scale of chords transitions. Every case is timed over many repeats,
+# each long enough to swamp timer resolution, in rounds across all cases with the garbage collector off,
+# and summarized by its median.
+# Results can be saved as a JSON baseline, and a later run compared with it fails if any case got slower.
+#
+#   python benchmarks.py [--filter contraryMotion] [--save baseline.json]
+#   python benchmarks.py --compare baseline.json [--threshold 0.1]
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+from theory import *
+from instrument import Performer, chordNumeralToButtonNameDict
+from output import NoteRegistry, NullBackend
+from voicingtable import getVoicingTable
+
+MNC_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# region Constants
+REPEATS = 15              # timings per case, the median is what gets compared
+MIN_REPEAT_TIME = 0.02    # seconds, each repeat loops over its case until it takes at least this long
+THRESHOLD = 0.10          # how much slower than the baseline a case may get, as a fraction
+SAMPLES_PER_CASE = 2000   # inputs per voicing case, spread evenly over every input that fits it
+
+PITCHES = 128
+BUTTONS = ["16", "12", "h8", "h4", "15", "11", "h7", "h3", "10", "h6", "14", "h2", "h5", "h9", "13"]
+CHORD_NUMERAL_BUTTONS = [chordNumeralToButtonNameDict[chordNumeral] for chordNumeral in sorted(chordNumeralToButtonNameDict)]
+# endregion
+
+# region Inputs
+# every valid (contrary pitch, pivot pitch, scale of chords ID, root) with root 0, grouped by scale and by
+# the width of its chord, see voicingWidth() in theory.py
+def _voicingInputs():
+    byWidth = dict((width, []) for width in range(1, MAX_CHORD_WIDTH + 1))
+    byScale = dict((scaleOfChordsId, []) for scaleOfChordsId in range(len(SCALES_OF_CHORDS)))
+    for scaleOfChordsId in range(len(SCALES_OF_CHORDS)):
+        for pivotPitch in range(PITCHES):
+            for contraryPitch in range(PITCHES):
+                try:
+                    chord = contraryMotion(contraryPitch, pivotPitch, scaleOfChordsId, 0)
+                except ValueError:
+                    continue
+                width = voicingWidth(chord, scaleOfChordsId, 0)
+                inputs = (contraryPitch, pivotPitch, scaleOfChordsId, 0)
+                byWidth[width].append(inputs)
+                byScale[scaleOfChordsId].append(inputs)
+    return byWidth, byScale
+
+# an even spread of count items from values, always in the same order
+def _sample(values, count=SAMPLES_PER_CASE):
+    if len(values) <= count:
+        return list(values)
+    stride = float(len(values)) / count
+    return [values[int(index * stride)] for index in range(count)]
+
+# tilt values across the whole range the phone sends, and a little past it
+def _tilts(count=SAMPLES_PER_CASE):
+    return [(-1.1 + 1.3 * index / count, -1.1 + 1.3 * ((index * 7919) % count) / count) for index in range(count)]
+
+class _Message(object):
+    __slots__ = ("address", "arguments")
+
+    def __init__(self, address, arguments):
+        self.address = address
+        self.arguments = arguments
+
+    def getAddress(self):
+        return self.address
+
+    def getArguments(self):
+        return self.arguments
+# endregion
+
+# region Cases
+# [(name, function to time, operations per call)]
+def buildCases(voicingTable):
+    cases = []
+    byWidth, byScale = _voicingInputs()
+
+    def voicings(inputs):
+        def run():
+            for contraryPitch, pivotPitch, scaleOfChordsId, root in inputs:
+                try: contraryMotion(contraryPitch, pivotPitch, scaleOfChordsId, root)
+                except ValueError: pass
+        return run
+
+    for width in range(1, MAX_CHORD_WIDTH + 1):
+        inputs = _sample(byWidth[width])
+        cases.append(("contraryMotion/width=%d" % width, voicings(inputs), len(inputs)))
+    for scaleOfChordsId in range(len(SCALES_OF_CHORDS)):
+        inputs = _sample(byScale[scaleOfChordsId])
+        cases.append(("contraryMotion/" + SCALE_OF_CHORDS_NAMES[scaleOfChordsId], voicings(inputs), len(inputs)))
+
+    tableInputs = _sample([inputs for width in sorted(byWidth) for inputs in byWidth[width]])
+    def tableLookups():
+        lookup = voicingTable.lookup
+        for contraryPitch, pivotPitch, scaleOfChordsId, root in tableInputs:
+            lookup(contraryPitch, pivotPitch, scaleOfChordsId, root)
+    cases.append(("voicingTable.lookup", tableLookups, len(tableInputs)))
+
+    tilts = _tilts()
+    def mapTilts():
+        scaleOfChords = SCALES_OF_CHORDS[ScaleOfChords.MAJOR_SIXTH_DIMINISHED_SCALE]
+        for x, y in tilts:
+            mapAccelerometerToPitch(x, y, scaleOfChords, 0, False)
+    cases.append(("mapAccelerometerToPitch", mapTilts, len(tilts)))
+
+    performer = Performer(voicingTable, NoteRegistry(NullBackend()))
+    performer.quitWithoutAccelerometer = False
+    def performerTilts():
+        mapTilt = performer.mapAccelerometerToPitch
+        for x, y in tilts:
+            mapTilt(x, y, 0.0)
+    cases.append(("Performer.mapAccelerometerToPitch", performerTilts, len(tilts)))
+
+    # every button after every button
+    sequences = [(first, second) for first in BUTTONS for second in BUTTONS]
+    def buttonSequences():
+        buttonOperations = performer.buttonOperations
+        for first, second in sequences:
+            buttonOperations(first)
+            buttonOperations(second)
+    cases.append(("buttonOperations", buttonSequences, 2 * len(sequences)))
+
+    def chordNumerals():
+        handleChordNumerals = performer.handleChordNumerals
+        for buttonName in CHORD_NUMERAL_BUTTONS:
+            handleChordNumerals(buttonName)
+    cases.append(("handleChordNumerals", chordNumerals, len(CHORD_NUMERAL_BUTTONS)))
+
+    # each transition from every scale of chords
+    for name in ("makeFamilyUp", "makeFamilyDown", "makeFamilyAcross", "makeDominant"):
+        def transitions(transition=getattr(performer, name)):
+            for scaleOfChordsId in range(len(SCALES_OF_CHORDS)):
+                performer.setScaleOfChords(scaleOfChordsId)
+                performer.setScaleOfChordsRoot(0)
+                transition()
+        cases.append((name, transitions, len(SCALES_OF_CHORDS)))
+
+    # the whole tap, press and release of every button, through a silent backend
+    taps = [(_Message("/7/push" + buttonName, [1.0]), _Message("/7/push" + buttonName, [0.0])) for buttonName in BUTTONS]
+    tilt = _Message("/accxyz", [-0.5, -0.4, 0.0])
+    def touches():
+        performer.parseAccelerometerData(tilt)
+        handleTouchInput = performer.handleTouchInput
+        for press, release in taps:
+            handleTouchInput(press)
+            handleTouchInput(release)
+    cases.append(("handleTouchInput", touches, 2 * len(taps)))
+    return cases
+# endregion
+
+# region Timing
+# how many calls make one repeat last at least MIN_REPEAT_TIME
+def calibrate(function, minTime=MIN_REPEAT_TIME):
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for loop in range(loops):
+            function()
+        if time.perf_counter() - start >= minTime:
+            return loops
+        loops *= 2
+
+def quantile(sortedValues, fraction):
+    position = fraction * (len(sortedValues) - 1)
+    low = int(position)
+    high = min(low + 1, len(sortedValues) - 1)
+    return sortedValues[low] + (sortedValues[high] - sortedValues[low]) * (position - low)
+
+# median, quartiles and extremes of nanoseconds per operation
+def summarize(timings, loops, operations):
+    timings = sorted(timings)
+    return {
+        "medianNs": quantile(timings, 0.5),
+        "q1Ns": quantile(timings, 0.25),
+        "q3Ns": quantile(timings, 0.75),
+        "minNs": timings[0],
+        "maxNs": timings[-1],
+        "repeats": len(timings),
+        "loops": loops,
+        "operations": operations,
+    }
+
+# time every case, one repeat of each per round, so drift in machine speed spreads over all cases
+# instead of landing on whichever case happened to be running
+def timeCases(cases, repeats=REPEATS):
+    loops = []
+    for name, function, operations in cases:
+        function()  # warm up
+        loops.append(calibrate(function))
+    timings = [[] for case in cases]
+
+    gcWasEnabled = gc.isenabled()
+    gc.disable()
+    try:
+        for repeat in range(repeats):
+            for index, (name, function, operations) in enumerate(cases):
+                start = time.perf_counter()
+                for loop in range(loops[index]):
+                    function()
+                timings[index].append((time.perf_counter() - start) / (loops[index] * operations) * 1e9)
+    finally:
+        if gcWasEnabled:
+            gc.enable()
+    return dict((name, summarize(timings[index], loops[index], operations))
+                for index, (name, function, operations) in enumerate(cases))
+
+def runBenchmarks(nameFilter=None, repeats=REPEATS, voicingTablePath=None):
+    voicingTable = getVoicingTable(voicingTablePath or os.path.join(MNC_DIRECTORY, "voicingtable.bin"))
+    cases = [case for case in buildCases(voicingTable) if not nameFilter or nameFilter in case[0]]
+    return timeCases(cases, repeats)
+# endregion
+
+# region Baselines
+def saveBaseline(path, results):
+    baseline = {"python": sys.version.split()[0], "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "cases": results}
+    with open(path, "w") as handle:
+        json.dump(baseline, handle, indent=2, sort_keys=True)
+
+def loadBaseline(path):
+    with open(path) as handle:
+        return json.load(handle)["cases"]
+
+# a case regressed if its median is past the threshold and even its fastest repeat is slower than the baseline's median,
+# so a few noisy repeats are not enough to fail
+def isRegression(result, baseline, threshold=THRESHOLD):
+    return result["medianNs"] > baseline["medianNs"] * (1.0 + threshold) and result["minNs"] > baseline["medianNs"]
+
+# [(name, result, baseline or None, regressed)]
+def compareResults(results, baselines, threshold=THRESHOLD):
+    comparisons = []
+    for name in sorted(results):
+        baseline = baselines.get(name)
+        regressed = baseline is not None and isRegression(results[name], baseline, threshold)
+        comparisons.append((name, results[name], baseline, regressed))
+    return comparisons
+# endregion
+
+def formatResults(results, comparisons=None):
+    lines = ["%-64s %10s %10s %8s %10s" % ("case", "median ns", "min ns", "iqr %", "change")]
+    compared = dict((name, (baseline, regressed)) for name, result, baseline, regressed in comparisons or [])
+    for name in sorted(results):
+        result = results[name]
+        spread = (result["q3Ns"] - result["q1Ns"]) / result["medianNs"] * 100 if result["medianNs"] else 0.0
+        change = ""
+        if name in compared and compared[name][0] is not None:
+            baseline, regressed = compared[name]
+            change = "%+.1f%%" % ((result["medianNs"] - baseline["medianNs"]) / baseline["medianNs"] * 100)
+            if regressed:
+                change += " REGRESSED"
+        lines.append("%-64s %10.1f %10.1f %8.1f %10s" % (name, result["medianNs"], result["minNs"], spread, change))
+    return "\n".join(lines)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the MNC hot path.")
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=REPEATS, help="timings per case (default: %d)" % REPEATS)
+    parser.add_argument("--save", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", help="compare with a JSON baseline, and fail if any case regressed")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown before failing, as a fraction (default: %.2f)" % THRESHOLD)
+    options = parser.parse_args(arguments)
+
+    results = runBenchmarks(options.filter, options.repeat)
+    comparisons = None
+    if options.compare:
+        comparisons = compareResults(results, loadBaseline(options.compare), options.threshold)
+    print(formatResults(results, comparisons))
+
+    if options.save:
+        saveBaseline(options.save, results)
+    if comparisons:
+        regressions = [name for name, result, baseline, regressed in comparisons if regressed]
+        if regressions:
+            print("%d of %d cases regressed past %.0f%%" % (len(regressions), len(comparisons), options.threshold * 100))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+# chordindex.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Which chord numeral, modifiers and tilt play a chord? A reverse index from pitches to gestures,
+# for practice tools and score following.
+# Every state the buttons can reach is found by pressing them on a Performer, from each chord numeral,
+# and every chord tilt can play in each of those states is listed once, with all the tilts that play it.
+# The index is keyed by exact pitches and by pitch class bitmask, saved to disk, and answers
+# exact lookups with a dictionary read and nearest matches by searching only the chords that could win.
+#
+#   python chordindex.py                   # build and save chordindex.bin, then time some lookups
+#   python chordindex.py 52 60 67 76       # gestures for these pitches, or the nearest chords
+#   python chordindex.py --classes 0 4 7   # gestures for chords with exactly these pitch classes
+
+import heapq
+import os
+import struct
+
+from theory import *
+from instrument import Performer, chordNumeralToButtonNameDict
+from output import NoteRegistry, NullBackend
+
+# region Constants
+# every button, in the order they are stored
+BUTTON_NAMES = ["16", "12", "h8", "h4", "15", "11", "h7", "h3", "10", "h6", "14", "h2", "h5", "h9", "13"]
+BUTTON_LABELS = {"10": "On", "h6": "Off", "14": "Alt", "h2": "Dom", "h5": "Fam Down", "h9": "Fam Across",
+                 "13": "Fam Up"}
+for chordNumeral, buttonName in chordNumeralToButtonNameDict.items():
+    BUTTON_LABELS[buttonName] = str(chordNumeral)
+CHORD_NUMERAL_BUTTONS = [chordNumeralToButtonNameDict[chordNumeral] for chordNumeral in sorted(chordNumeralToButtonNameDict)]
+
+# the part of a Performer that the buttons change
+STATE_SLOTS = ("scaleOfChordsId", "scaleOfChordsRoot", "bassNote", "chordNumeral", "offChordLock",
+               "alternate", "dominant", "familyUp", "familyDown", "familyAcross")
+
+PITCH_BIAS = OCTAVE  # voicings can reach a semitone below pitch 0, so pitches are stored an octave up
+
+FILE_MAGIC = b"MNCI"
+FILE_VERSION = 2
+FILE_HEADER = struct.Struct("<4sHBbbHHH")     # magic, version, mode, lowest tonic, highest tonic, scales of chords, gestures, chords
+SCALE_RECORD = struct.Struct("<BbB")          # scale of chords ID, root, off chord lock
+GESTURE_RECORD = struct.Struct("<HBB")        # scale index, chord numeral, button count, then the buttons
+CHORD_RECORD = struct.Struct("<HB4BB")        # scale index, voice count, pitches, tilt count, then the tilts
+TILT_BITS = 4  # a tilt is stored in one byte, x scale degree in the high bits and y in the low
+# endregion
+
+# total voice movement between two chords of the same size, lowest notes first
+def pairedMovement(fromChord, toChord):
+    movement = 0
+    for index in range(len(toChord)):
+        movement += abs(toChord[index] - fromChord[index])
+    return movement
+
+# roll and pitch in the middle of the tilt the quantizers turn into these scale degrees
+def tiltForScaleDegrees(tiltXDegree, tiltYDegree):
+    x = min(tiltForScaleDegree(tiltXDegree, *TILT_X_RANGE), 0.0)  # the instrument treats any x above 0 as 0
+    y = min(tiltForScaleDegree(tiltYDegree, *TILT_Y_RANGE), 0.0)
+    return x, y
+
+# One way to play a chord: the buttons, the tilts, and the scale of chords they play it in
+class ChordMatch(object):
+    __slots__ = ("chord", "distance", "buttons", "chordNumeral", "scaleOfChordsId", "scaleOfChordsRoot",
+                 "offChordLock", "tilts")
+
+    def __init__(self, chord, distance, buttons, chordNumeral, scaleOfChordsId, scaleOfChordsRoot, offChordLock, tilts):
+        self.chord = chord          # pitches, lowest first, in C or the tonic of the mode
+        self.distance = distance    # 0 for an exact match, see nearest() and nearestPitchClasses()
+        self.buttons = buttons      # button names to press in order, starting with a chord numeral
+        self.chordNumeral = chordNumeral
+        self.scaleOfChordsId = scaleOfChordsId
+        self.scaleOfChordsRoot = scaleOfChordsRoot
+        self.offChordLock = offChordLock
+        self.tilts = tilts          # [(x scale degree, y scale degree)] that play the chord, see tiltForScaleDegrees()
+
+    def describe(self):
+        x, y = tiltForScaleDegrees(*self.tilts[len(self.tilts) // 2])
+        return "%-16s %-24s tilt x %5.2f y %5.2f (%d tilts)  %s" % (
+            str(list(self.chord)), " + ".join([BUTTON_LABELS[buttonName] for buttonName in self.buttons]), x, y,
+            len(self.tilts), SCALE_OF_CHORDS_NAMES[self.scaleOfChordsId])
+
+class ChordIndex(object):
+
+    def __init__(self, scales, gestures, chords, source=None, mode=MAJOR_MODE):
+        self.mode = mode          # MAJOR_MODE or MINOR_MODE, the chord numerals the gestures press
+        self.scales = scales      # [(scale of chords ID, root, off chord lock)], everything that decides what tilt plays
+        self.gestures = gestures  # [(scale index, chord numeral, button names)], the shortest way to each button state
+        self.chords = chords      # [(scale index, pitches, tilts)], one per chord a scale of chords can play
+        self.source = source      # file the index was loaded from, if any
+
+        self.gesturesOfScale = [[] for scale in scales]  # scale index --> gestures that reach it
+        for gesture in gestures:
+            self.gesturesOfScale[gesture[0]].append(gesture)
+
+        self.byPitches = {}  # pitches --> chord indices
+        self.byMask = {}     # pitch class bitmask --> distinct pitches
+        for index, (scaleIndex, pitches, tilts) in enumerate(chords):
+            if pitches not in self.byPitches:
+                self.byPitches[pitches] = []
+                self.byMask.setdefault(pitchClassMask(pitches), []).append(pitches)
+            self.byPitches[pitches].append(index)
+        self.masks = sorted(self.byMask)
+
+        # voice count --> distinct pitches, and (voice count, lowest note, highest note) --> distinct pitches, for nearest()
+        self.byVoices = {}
+        self.byOuterVoices = {}
+        for pitches in sorted(self.byPitches):
+            self.byVoices.setdefault(len(pitches), []).append(pitches)
+            self.byOuterVoices.setdefault((len(pitches), pitches[0], pitches[-1]), []).append(pitches)
+
+    # every way to play these exact pitches
+    def find(self, pitches):
+        return self._matches(tuple(sorted(pitches)), 0)
+
+    # every way to play a chord with exactly these pitch classes, in any voicing
+    def findPitchClasses(self, pitchClasses):
+        matches = []
+        for pitches in self.byMask.get(pitchClassMask(pitchClasses), ()):
+            matches.extend(self._matches(pitches, 0))
+        return matches
+
+    # ways to play the chords closest to these pitches, by total voice movement, for up to limit chords
+    # only chords with as many voices are considered. The lowest and highest voices alone move at least
+    # as far as their own distance, so chords are visited in rings of that distance, stopping once no ring can do better
+    def nearest(self, pitches, limit=1):
+        pitches = tuple(sorted(pitches))
+        if pitches in self.byPitches:
+            return self.find(pitches)
+        voices = len(pitches)
+        chords = self.byVoices.get(voices, ())
+        limit = min(limit, len(chords))
+        if limit == 0:
+            return []
+        lowest, highest = pitches[0], pitches[-1]
+        ringsPerMovement = 2 if voices == 1 else 1  # a single voice is both the lowest and the highest
+
+        best = []  # heap of (-movement, pitches), the worst of the best on top
+        ring = 0
+        while True:
+            if len(best) == limit and ring > -best[0][0] * ringsPerMovement:
+                break
+            if 8 * ring * ring > len(chords):
+                # far from every chord, by now comparing with all of them is quicker than more rings
+                best = heapq.nsmallest(limit, [(pairedMovement(pitches, candidate), candidate)
+                                               for candidate in chords])
+                best = [(-movement, candidate) for movement, candidate in best]
+                break
+            for lowestStep in range(-ring, ring + 1):
+                highestStep = ring - abs(lowestStep)
+                for highestStep in set((highestStep, -highestStep)):
+                    for candidate in self.byOuterVoices.get((voices, lowest + lowestStep, highest + highestStep), ()):
+                        movement = pairedMovement(pitches, candidate)
+                        if len(best) < limit:
+                            heapq.heappush(best, (-movement, candidate))
+                        elif movement < -best[0][0]:
+                            heapq.heapreplace(best, (-movement, candidate))
+            ring += 1
+
+        matches = []
+        for negativeMovement, candidate in sorted(best, reverse=True):
+            matches.extend(self._matches(candidate, -negativeMovement))
+        return matches
+
+    # ways to play the chords whose pitch classes differ least from these, counting classes added or missing
+    def nearestPitchClasses(self, pitchClasses, limit=1):
+        mask = pitchClassMask(pitchClasses)
+        if mask in self.byMask:
+            return self.findPitchClasses(pitchClasses)
+        distances = sorted([(PITCH_CLASS_COUNTS[mask ^ candidate], candidate) for candidate in self.masks])
+        matches = []
+        for distance, candidate in distances[:limit]:
+            for pitches in self.byMask[candidate]:
+                matches.extend(self._matches(pitches, distance))
+        return matches
+
+    def _matches(self, pitches, distance):
+        matches = []
+        for index in self.byPitches.get(pitches, ()):
+            scaleIndex, chord, tilts = self.chords[index]
+            scaleOfChordsId, scaleOfChordsRoot, offChordLock = self.scales[scaleIndex]
+            for gestureScale, chordNumeral, buttons in self.gesturesOfScale[scaleIndex]:
+                matches.append(ChordMatch(chord, distance, buttons, chordNumeral, scaleOfChordsId, scaleOfChordsRoot,
+                                          offChordLock, tilts))
+        matches.sort(key=lambda match: (match.distance, len(match.buttons), match.chord))
+        return matches
+
+    # press each gesture's buttons on a new Performer, tilt it every way listed, and compare what it plays
+    # returns a list of (buttons, tilt, indexed chord, played chord) that disagree
+    def verify(self, mode=None):
+        if mode is None: mode = self.mode
+        mismatches = []
+        for scaleIndex, pitches, tilts in self.chords:
+            for gestureScale, chordNumeral, buttons in self.gesturesOfScale[scaleIndex]:
+                performer = Performer(None, NoteRegistry(NullBackend()), mode=mode)
+                for buttonName in buttons:
+                    performer.buttonOperations(buttonName)
+                for tilt in tilts:
+                    x, y = tiltForScaleDegrees(*tilt)
+                    pitchX, pitchY = mapAccelerometerToPitch(x, y, performer.scaleOfChords, performer.scaleOfChordsRoot,
+                                                             performer.offChordLock)
+                    try:
+                        played = tuple(contraryMotion(pitchX, pitchY, performer.scaleOfChordsId,
+                                                      performer.scaleOfChordsRoot))
+                    except ValueError:
+                        played = None
+                    if played != pitches:
+                        mismatches.append((buttons, (x, y), pitches, played))
+        return mismatches
+
+    # write the scales, gestures and chords to a file that loadChordIndex() can read
+    def save(self, path):
+        handle = open(path, "wb")
+        try:
+            handle.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.mode, LOWEST_TONIC, HIGHEST_TONIC,
+                                          len(self.scales), len(self.gestures), len(self.chords)))
+            for scaleOfChordsId, scaleOfChordsRoot, offChordLock in self.scales:
+                handle.write(SCALE_RECORD.pack(scaleOfChordsId, scaleOfChordsRoot, offChordLock))
+            for scaleIndex, chordNumeral, buttons in self.gestures:
+                handle.write(GESTURE_RECORD.pack(scaleIndex, chordNumeral, len(buttons)))
+                handle.write(struct.pack("<%dB" % len(buttons), *[BUTTON_NAMES.index(buttonName) for buttonName in buttons]))
+            for scaleIndex, pitches, tilts in self.chords:
+                stored = [pitch + PITCH_BIAS for pitch in pitches] + [0] * (MAX_VOICES - len(pitches))
+                handle.write(CHORD_RECORD.pack(*([scaleIndex, len(pitches)] + stored + [len(tilts)])))
+                handle.write(struct.pack("<%dB" % len(tilts), *[(x << TILT_BITS) | y for x, y in tilts]))
+        finally:
+            handle.close()
+
+# region Building
+# button state of a performer, see STATE_SLOTS
+def _state(performer):
+    return tuple([getattr(performer, slot) for slot in STATE_SLOTS])
+
+def _setState(performer, state):
+    for slot, value in zip(STATE_SLOTS, state):
+        setattr(performer, slot, value)
+    performer.setScaleOfChords(performer.scaleOfChordsId)
+
+# every button state reachable by pressing a chord numeral and then any buttons, with the shortest presses to each
+def reachableStates(mode=MAJOR_MODE):
+    performer = Performer(None, NoteRegistry(NullBackend()), mode=mode)
+    start = _state(performer)
+    gestures = {}
+    queue = []
+    for buttonName in CHORD_NUMERAL_BUTTONS:
+        _setState(performer, start)
+        performer.buttonOperations(buttonName)
+        state = _state(performer)
+        if state not in gestures:
+            gestures[state] = [buttonName]
+            queue.append(state)
+
+    # breadth first, so the first presses found to a state are the fewest
+    for state in queue:
+        for buttonName in BUTTON_NAMES:
+            _setState(performer, state)
+            performer.buttonOperations(buttonName)
+            nextState = _state(performer)
+            if nextState not in gestures:
+                gestures[nextState] = gestures[state] + [buttonName]
+                queue.append(nextState)
+    return gestures
+
+# scale degrees a tilt quantizer can return while the instrument accepts the tilt, -1 < tilt < 1 and no higher than 0
+def reachableTiltDegrees(tiltRange):
+    minValue, maxValue, minDegree, maxDegree = tiltRange
+    degrees = []
+    for degree in range(min(minDegree, maxDegree), max(minDegree, maxDegree) + 1):
+        value = min(tiltForScaleDegree(degree, *tiltRange), 0.0)
+        if -1.0 < value < 1.0 and tiltToScaleDegree(value, *tiltRange) == degree:
+            degrees.append(degree)
+    return degrees
+
+# the index of every chord tilt can play in every reachable button state
+# voicings come from voicingTable if given, otherwise they are built with contraryMotion()
+def buildChordIndex(mode=MAJOR_MODE, voicingTable=None):
+    lookup = voicingTable.lookup if voicingTable is not None else contraryMotion
+
+    scales, scaleIndices, gestures = [], {}, []
+    states = reachableStates(mode)
+    for state, buttons in sorted(states.items(), key=lambda item: (len(item[1]), item[1])):
+        values = dict(zip(STATE_SLOTS, state))
+        scale = (values["scaleOfChordsId"], values["scaleOfChordsRoot"], int(values["offChordLock"]))
+        if scale not in scaleIndices:
+            scaleIndices[scale] = len(scales)
+            scales.append(scale)
+        gestures.append((scaleIndices[scale], values["chordNumeral"], buttons))
+
+    # keep one gesture per chord numeral and scale, the shortest, the rest reach the same chords with more presses
+    shortest, seen = [], set()
+    for gesture in gestures:
+        if (gesture[0], gesture[1]) not in seen:
+            seen.add((gesture[0], gesture[1]))
+            shortest.append(gesture)
+
+    chords = []
+    tiltXDegrees = reachableTiltDegrees(TILT_X_RANGE)
+    tiltYDegrees = reachableTiltDegrees(TILT_Y_RANGE)
+    for scaleIndex, (scaleOfChordsId, scaleOfChordsRoot, offChordLock) in enumerate(scales):
+        scaleOfChords = SCALES_OF_CHORDS[scaleOfChordsId]
+        tiltsOfChord = {}  # pitches --> tilts, in the order tilt first plays them
+        for tiltXDegree in tiltXDegrees:
+            for tiltYDegree in tiltYDegrees:
+                pitchX, pitchY = scaleDegreesToPitches(tiltXDegree, tiltYDegree, scaleOfChords, scaleOfChordsRoot,
+                                                       offChordLock)
+                try:
+                    pitches = tuple(lookup(pitchX, pitchY, scaleOfChordsId, scaleOfChordsRoot))
+                except ValueError:
+                    continue  # the instrument plays the last chord again
+                if pitches not in tiltsOfChord:
+                    tiltsOfChord[pitches] = []
+                    chords.append((scaleIndex, pitches, tiltsOfChord[pitches]))
+                tiltsOfChord[pitches].append((tiltXDegree, tiltYDegree))
+    return ChordIndex(scales, shortest, chords, mode=mode)
+# endregion
+
+# open an index saved by ChordIndex.save(), returns None if the file is missing, out of date or for another mode
+def loadChordIndex(path, mode=MAJOR_MODE):
+    if not os.path.exists(path):
+        return None
+
+    handle = open(path, "rb")
+    try:
+        data = handle.read()
+    finally:
+        handle.close()
+    if len(data) < FILE_HEADER.size:
+        return None
+    magic, version, fileMode, lowestTonic, highestTonic, scaleCount, gestureCount, chordCount = \
+        FILE_HEADER.unpack_from(data, 0)
+    if (magic, version, fileMode, lowestTonic, highestTonic) != (FILE_MAGIC, FILE_VERSION, mode, LOWEST_TONIC, HIGHEST_TONIC):
+        return None
+
+    offset = FILE_HEADER.size
+    scales = []
+    for index in range(scaleCount):
+        scaleOfChordsId, scaleOfChordsRoot, offChordLock = SCALE_RECORD.unpack_from(data, offset)
+        scales.append((scaleOfChordsId, scaleOfChordsRoot, offChordLock))
+        offset += SCALE_RECORD.size
+    gestures = []
+    for index in range(gestureCount):
+        scaleIndex, chordNumeral, buttonCount = GESTURE_RECORD.unpack_from(data, offset)
+        offset += GESTURE_RECORD.size
+        buttons = [BUTTON_NAMES[button] for button in struct.unpack_from("<%dB" % buttonCount, data, offset)]
+        offset += buttonCount
+        gestures.append((scaleIndex, chordNumeral, buttons))
+    chords = []
+    tiltMask = (1 << TILT_BITS) - 1
+    for index in range(chordCount):
+        record = CHORD_RECORD.unpack_from(data, offset)
+        offset += CHORD_RECORD.size
+        scaleIndex, voices, tiltCount = record[0], record[1], record[-1]
+        pitches = tuple([pitch - PITCH_BIAS for pitch in record[2:2 + voices]])
+        tilts = [(tilt >> TILT_BITS, tilt & tiltMask) for tilt in struct.unpack_from("<%dB" % tiltCount, data, offset)]
+        offset += tiltCount
+        chords.append((scaleIndex, pitches, tilts))
+    return ChordIndex(scales, gestures, chords, path, mode)
+
+# load the index from disk, building and saving it first if needed
+def getChordIndex(path, mode=MAJOR_MODE, voicingTable=None):
+    index = loadChordIndex(path, mode)
+    if index is None:
+        index = buildChordIndex(mode, voicingTable)
+        index.save(path)
+        index.source = path
+    return index
+
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chordindex.bin")
+    arguments = sys.argv[1:]
+
+    if not arguments:
+        start = time.time()
+        index = buildChordIndex()
+        index.save(path)
+        print("Built %s in %.2fs: %d scales of chords, %d gestures, %d chords, %d distinct, %d bytes" % (
+            path, time.time() - start, len(index.scales), len(index.gestures), len(index.chords),
+            len(index.byPitches), os.path.getsize(path)))
+
+        start = time.time()
+        index = loadChordIndex(path)
+        print("Loaded in %.1f ms" % ((time.time() - start) * 1000))
+
+        start = time.time()
+        mismatches = index.verify()
+        print("Verified in %.1fs, %d mismatches" % (time.time() - start, len(mismatches)))
+        for mismatch in mismatches[:10]:
+            print("  " + str(mismatch))
+
+        random.seed(0)
+        known = list(index.byPitches)
+        queries = [("find", index.find, random.choice(known)) for query in range(1000)]
+        queries += [("findPitchClasses", index.findPitchClasses, random.choice(known)) for query in range(1000)]
+        queries += [("nearest", index.nearest, [pitch + random.choice((-1, 1)) for pitch in random.choice(known)])
+                    for query in range(1000)]
+        queries += [("nearestPitchClasses", index.nearestPitchClasses, random.sample(range(OCTAVE), 4))
+                    for query in range(1000)]
+        for name in ("find", "findPitchClasses", "nearest", "nearestPitchClasses"):
+            timings = []
+            for queryName, function, pitches in queries:
+                if queryName == name:
+                    start = time.time()
+                    function(pitches)
+                    timings.append(time.time() - start)
+            timings.sort()
+            print("  %-20s median %.3f ms, worst %.3f ms" % (name, timings[len(timings) // 2] * 1000, timings[-1] * 1000))
+        sys.exit(1 if mismatches else 0)
+
+    index = getChordIndex(path)
+    if arguments[0] == "--classes":
+        pitchClasses = [int(argument) for argument in arguments[1:]]
+        matches = index.nearestPitchClasses(pitchClasses, limit=3)
+    else:
+        matches = index.nearest([int(argument) for argument in arguments], limit=3)
+    if not matches:
+        print("No chords with that many voices")
+    for match in matches:
+        print(("exact  " if match.distance == 0 else "off %-2d " % match.distance) + match.describe())
@@ -0,0 +1,202 @@
+# ensemble.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# One server for a whole ensemble of phones, under CPython.
+# Packets are routed by the phone they came from to that phone's own Performer (see instrument.py),
+# and each performer plays on its own pair of MIDI channels. A worker has room for len(CHANNEL_PAIRS) phones,
+# and turns away any more, since two performers on one pair would stop each other's notes.
+# With --workers, several processes share the port and the kernel keeps each phone on the same worker,
+# so every worker writes to its own MIDI port and has channel pairs of its own.
+#
+#   python ensemble.py [--port 50380] [--raw-midi /dev/snd/midiC1D0] [--workers 1]
+#   python ensemble.py --workers 3 --raw-midi "/dev/snd/midiC1D{worker}"
+
+import argparse
+import asyncio
+import multiprocessing
+import signal
+import socket
+
+from envelope import EnvelopeScheduler, ReleaseCurve, synchronized
+from instrument import Performer
+from latency import clock
+from oscserver import OscDispatcher, TOUCH, ACCELEROMETER, KEY_CHANGE, MAX_PACKET_SIZE, MAX_PACKETS_PER_WAKEUP, RECEIVE_BUFFER_SIZE
+from output import NoteRegistry, RawMidiBackend, NullBackend
+from patterns import STRUM, ARPEGGIO
+
+# region Constants
+DRUM_CHANNEL = 9
+# (chord channel, bass channel) for each performer, leaving out General MIDI drums
+CHANNEL_PAIRS = [(0, 1), (2, 3), (4, 5), (6, 7), (8, 10), (11, 12), (13, 14)]
+CHORD_INSTRUMENT = 24  # NYLON_GUITAR, as in mnc.py
+BASS_INSTRUMENT = 81   # SAWTOOTH
+# endregion
+
+# Every performer playing through one output, keyed by the address their packets come from
+class Ensemble(object):
+
+    def __init__(self, mnc, backend, chordInstrument=CHORD_INSTRUMENT, bassInstrument=BASS_INSTRUMENT, latency=None):
+        self.mnc = mnc  # settings and the voicing table come from mnc.py
+        self.noteRegistry = NoteRegistry(backend)  # shared by every performer, each on channels no other performer uses
+        self.chordInstrument = chordInstrument
+        self.bassInstrument = bassInstrument
+        self.latency = latency
+        self.envelopes = EnvelopeScheduler()  # every performer's decay runs on one thread
+        self.releaseCurve = ReleaseCurve(mnc.DECAY_RELEASE_MS, mnc.DECAY_CURVE)
+        self.sessions = {}  # source host --> (Performer, OscDispatcher)
+        self.refused = set()  # hosts turned away once every channel pair was taken
+
+    # a performer and dispatcher for a phone we have not heard from before
+    # returns None once every channel pair is taken, and the phone's packets are ignored
+    def join(self, host):
+        if len(self.sessions) >= len(CHANNEL_PAIRS):
+            if host not in self.refused:
+                self.refused.add(host)
+                print("No channels left for %s, %d performers are already playing" % (host, len(self.sessions)))
+            return None
+        mnc = self.mnc
+        chordChannel, bassChannel = CHANNEL_PAIRS[len(self.sessions)]
+        performer = Performer(mnc.voicingTable, self.noteRegistry, chordChannel, bassChannel, mnc.KEY_MODE,
+                              mnc.TRANSPOSE_KEY_SEMITONES, mnc.BASS, mnc.DECAY, mnc.RESTRIKE_COMMON_TONES,
+                              mnc.ACCELEROMETER_FILTER, mnc.TILT_HYSTERESIS)
+        performer.useEnvelopes(self.envelopes, self.releaseCurve, mnc.VOICE_RELEASE_MS / 1000.0)
+        performer.quitWithoutAccelerometer = False  # one phone without tilt should not stop everybody
+        if mnc.CONTINUOUS_MOTION:
+            performer.useContinuousMotion(mnc.MAX_REVOICE_RATE)
+        if mnc.CHORD_PATTERN == STRUM:
+            performer.useStrum(mnc.STRUM_SPREAD_MS / 1000.0, mnc.STRUM_ORDER)
+        elif mnc.CHORD_PATTERN == ARPEGGIO:
+            performer.useArpeggio(mnc.ARPEGGIO_TEMPO, mnc.ARPEGGIO_SUBDIVISION, mnc.ARPEGGIO_ORDER)
+
+        backend = self.noteRegistry.backend
+        self.envelopes.lock.acquire()  # another performer's decay may be writing
+        try:
+            backend.setInstrument(self.chordInstrument, chordChannel)
+            backend.setInstrument(self.bassInstrument, bassChannel)
+            backend.setVolume(127, chordChannel)
+            backend.flush()
+        finally:
+            self.envelopes.lock.release()
+
+        touchHandler = synchronized(self.envelopes.lock, performer.handleTouchInput)
+        accelerometerHandler = synchronized(self.envelopes.lock, performer.parseAccelerometerData)
+        keyHandler = synchronized(self.envelopes.lock, performer.handleKeyChange)  # each phone can change its own key
+        dispatcher = OscDispatcher(touchHandler, accelerometerHandler, self.latency, keyHandler)
+        dispatcher.addPrefix("/7/push", TOUCH)
+        dispatcher.addAddress("/accxyz", ACCELEROMETER)
+        dispatcher.addAddress("/mnc/key", KEY_CHANGE)
+        session = self.sessions[host] = (performer, dispatcher)
+        print("Performer %d joined from %s on channels %d and %d" % (len(self.sessions), host, chordChannel, bassChannel))
+        return session
+
+    # None for a phone that was turned away
+    def dispatcherFor(self, host):
+        session = self.sessions.get(host)
+        if session is None:
+            session = self.join(host)
+            if session is None:
+                return None
+        return session[1]
+
+    # stop everything that is sounding, on the way out
+    def close(self):
+        self.envelopes.lock.acquire()
+        try:
+            self.noteRegistry.allNotesOff()
+            self.noteRegistry.backend.flush()
+        finally:
+            self.envelopes.lock.release()
+
+# Reads every packet waiting on the socket into one reused buffer, and hands each one
+# to the dispatcher of the phone that sent it
+class EnsembleListener(object):
+
+    def __init__(self, sock, ensemble, maxPacketsPerWakeup=MAX_PACKETS_PER_WAKEUP):
+        self.sock = sock
+        self.ensemble = ensemble
+        self.maxPacketsPerWakeup = maxPacketsPerWakeup
+        self.buffer = bytearray(MAX_PACKET_SIZE)
+
+    def readReady(self):
+        sock, ensemble, buffer = self.sock, self.ensemble, self.buffer
+        receivedAt = clock()
+        for packet in range(self.maxPacketsPerWakeup):
+            try:
+                length, source = sock.recvfrom_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                break
+            dispatcher = ensemble.dispatcherFor(source[0])
+            if dispatcher is not None:
+                dispatcher.receive(buffer, length, receivedAt)
+        for performer, dispatcher in ensemble.sessions.values():
+            dispatcher.flushAccelerometer()
+
+# a non-blocking UDP socket on port, shared with the other workers if there are any
+def openEnsembleSocket(port, host="0.0.0.0", shared=False):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if shared:
+        # the kernel hashes each sender to one of the sockets on the port, so a phone always reaches the same worker
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    return sock
+
+# serve until interrupted, in this process
+def runWorker(worker, port, rawMidiPath, shared):
+    from replay import loadInstrument
+
+    mnc = loadInstrument()
+    if rawMidiPath:
+        backend = RawMidiBackend(open(rawMidiPath.format(worker=worker), "wb", 0))
+    else:
+        backend = NullBackend()
+    ensemble = Ensemble(mnc, backend, latency=getattr(mnc, "latencyHistograms", None))
+    port = port or mnc.OSC_LISTENER_PORT
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        sock = openEnsembleSocket(port, shared=shared)
+        loop.add_reader(sock.fileno(), EnsembleListener(sock, ensemble).readReady)
+        print("Worker %d listening for OSC on port %d" % (worker, port))
+        try:
+            await asyncio.Event().wait()
+        finally:
+            loop.remove_reader(sock.fileno())
+            sock.close()
+            ensemble.close()
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Play MNC from many phones at once under CPython.")
+    parser.add_argument("--port", type=int, default=None, help="UDP port (default: OSC_LISTENER_PORT in mnc.py)")
+    parser.add_argument("--raw-midi", help="write MIDI to this ALSA rawmidi port, pipe or file, "
+                                           "{worker} is replaced with the worker number (default: no sound)")
+    parser.add_argument("--workers", type=int, default=1, help="processes sharing the port (default: 1)")
+    options = parser.parse_args(arguments)
+
+    if options.workers <= 1:
+        runWorker(0, options.port, options.raw_midi, False)
+        return
+
+    if options.raw_midi and "{worker}" not in options.raw_midi:
+        parser.error("--raw-midi needs {worker} in it when there is more than one worker")
+    workers = [multiprocessing.Process(target=runWorker, args=(worker, options.port, options.raw_midi, True))
+               for worker in range(options.workers)]
+    for process in workers:
+        process.start()
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        for process in workers:
+            process.terminate()  # workers let go of their notes on SIGTERM too
+            process.join()
+
+if __name__ == "__main__":
+    main()
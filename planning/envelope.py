@@ -0,0 +1,252 @@
+# envelope.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Release envelopes, run by one scheduler thread that sleeps until the next volume step is due.
+# A release curve is worked out once as a table of (time, volume) steps, only where the volume changes,
+# so a fading channel costs one wakeup per step and a quiet instrument costs none.
+# MIDI volume is per channel, so a channel fades along its curve, while a single voice
+# rings on for its release time and stops with one noteOff.
+
+import heapq
+import math
+import threading
+import traceback
+
+from latency import clock
+
+# region Constants
+LINEAR = 0       # the same volume drop every step, like the old 10 ms decay timer
+EXPONENTIAL = 1  # quick at first, then a long tail
+
+FULL_VOLUME = 127
+VOLUME_STEP = 3  # volume drop between steps, as the old decay timer did it
+CURVE_RESOLUTION = 0.001  # seconds, how finely a curve is sampled to find its steps
+EXPONENTIAL_FLOOR = 0.01  # an exponential curve reaches this fraction of the start volume at the end
+# endregion
+
+# (time after the release started, volume) for every step of a release, worked out once
+class ReleaseCurve(object):
+
+    def __init__(self, releaseMs, shape=LINEAR, startVolume=FULL_VOLUME, volumeStep=VOLUME_STEP):
+        self.releaseTime = releaseMs / 1000.0
+        self.shape = shape
+        self.startVolume = startVolume
+        self.times = []    # seconds after the release started
+        self.volumes = []  # volume from that time on, the last one is 0
+
+        samples = max(int(self.releaseTime / CURVE_RESOLUTION), 1)
+        lastVolume = startVolume
+        for sample in range(1, samples + 1):
+            volume = self.level(float(sample) / samples)
+            # a step is due when the volume has dropped by volumeStep, or reached 0
+            if volume <= lastVolume - volumeStep or (volume == 0 and lastVolume > 0):
+                self.times.append(sample * self.releaseTime / samples)
+                self.volumes.append(volume)
+                lastVolume = volume
+        if not self.volumes or self.volumes[-1] != 0:
+            self.times.append(self.releaseTime)
+            self.volumes.append(0)
+
+    # volume at this fraction of the way through the release
+    def level(self, fraction):
+        if fraction >= 1.0:
+            return 0
+        if self.shape == EXPONENTIAL:
+            return int(self.startVolume * math.pow(EXPONENTIAL_FLOOR, fraction))
+        return int(self.startVolume * (1.0 - fraction))
+
+# Fades one channel along a release curve, then calls finished()
+class ChannelRelease(object):
+    __slots__ = ("backend", "channel", "curve", "finished", "startTime", "step", "cancelled")
+
+    def __init__(self, backend, channel, curve, finished=None):
+        self.backend = backend
+        self.channel = channel
+        self.curve = curve
+        self.finished = finished  # called once the channel reaches 0, ex: to stop its notes
+        self.startTime = 0.0
+        self.step = 0             # next step of the curve
+        self.cancelled = False
+
+    # first deadline, from when the release starts
+    def begin(self, now):
+        self.startTime = now
+        return now + self.curve.times[0]
+
+    # apply the steps that are due, returns the next deadline or None when done
+    def advance(self, now):
+        times, volumes = self.curve.times, self.curve.volumes
+        step = self.step
+        elapsed = now - self.startTime
+        while step + 1 < len(times) and times[step + 1] <= elapsed:
+            step += 1  # running late, skip straight to the volume that is due now
+        self.backend.setVolume(volumes[step], self.channel)
+        step += 1
+        self.step = step
+        if step < len(times):
+            self.backend.flush()
+            return self.startTime + times[step]
+        if self.finished is not None:
+            self.finished()
+        self.backend.flush()
+        return None
+
+# Lets one voice ring on after it leaves a chord, then stops it
+class VoiceRelease(object):
+    __slots__ = ("noteRegistry", "pitch", "channel", "releaseTime", "cancelled")
+
+    def __init__(self, noteRegistry, pitch, channel, releaseTime):
+        self.noteRegistry = noteRegistry
+        self.pitch = pitch
+        self.channel = channel
+        self.releaseTime = releaseTime  # seconds
+        self.cancelled = False
+
+    def begin(self, now):
+        return now + self.releaseTime
+
+    def advance(self, now):
+        self.noteRegistry.noteOff(self.pitch, self.channel)  # nothing is sent if the note was already stopped
+        self.noteRegistry.backend.flush()
+        return None
+
+# Steps the pitch bends of voices gliding between chords, see MpeVoices in output.py
+# Made once and started again whenever glides begin, so it is never running twice.
+class VoiceGlides(object):
+    __slots__ = ("voices", "noteRegistry", "cancelled")
+
+    def __init__(self, voices, noteRegistry):
+        self.voices = voices
+        self.noteRegistry = noteRegistry  # flushed through whichever backend it has by then
+        self.cancelled = False
+
+    def begin(self, now):
+        return now
+
+    def advance(self, now):
+        nextDeadline = self.voices.stepGlides(now)
+        self.noteRegistry.backend.flush()
+        return nextDeadline
+
+# Calls a function once, after a delay, ex: to catch up with input that came in too fast to play
+class DelayedCall(object):
+    __slots__ = ("function", "delay", "cancelled")
+
+    def __init__(self, function, delay):
+        self.function = function
+        self.delay = delay  # seconds
+        self.cancelled = False
+
+    def begin(self, now):
+        return now + self.delay
+
+    def advance(self, now):
+        self.function()
+        return None
+
+# Runs envelopes from a heap of deadlines. The thread starts with the first envelope and
+# only wakes when a step is due, or when an envelope is added or cancelled.
+# Envelope steps run while holding lock, so handlers that hold it too never interleave MIDI with them.
+class EnvelopeScheduler(object):
+
+    def __init__(self, lock=None):
+        self.lock = lock or threading.RLock()
+        self.condition = threading.Condition(self.lock)
+        self.clock = clock
+        self.heap = []         # (deadline, order added, envelope)
+        self.keys = {}         # key --> envelope, for envelopes that replace each other, ex: a channel's release
+        self.order = 0
+        self.threaded = True   # False to run envelopes only from advance(), ex: when rendering offline
+        self.thread = None
+        self.wakeups = 0
+        self.errors = 0        # envelopes stopped because a step raised
+
+    # start an envelope now, replacing any running under the same key
+    def start(self, envelope, key=None):
+        self.condition.acquire()
+        try:
+            if key is not None:
+                self.cancel(key)
+                self.keys[key] = envelope
+            self._push(envelope.begin(self.clock()), envelope)
+            if self.threaded:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="envelopes")
+                    self.thread.daemon = True
+                    self.thread.start()
+                self.condition.notify()
+        finally:
+            self.condition.release()
+
+    # stop the envelope running under key, wherever it has got to
+    def cancel(self, key):
+        self.condition.acquire()
+        try:
+            envelope = self.keys.pop(key, None)
+            if envelope is not None:
+                envelope.cancelled = True  # left in the heap, and dropped when it comes up
+        finally:
+            self.condition.release()
+
+    def _push(self, deadline, envelope):
+        self.order += 1
+        heapq.heappush(self.heap, (deadline, self.order, envelope))
+
+    # run every step due by now, returns the next deadline or None if nothing is waiting
+    def advance(self, now):
+        self.condition.acquire()
+        try:
+            heap = self.heap
+            while heap:
+                deadline, order, envelope = heap[0]
+                if envelope.cancelled:
+                    heapq.heappop(heap)
+                    continue
+                if deadline > now:
+                    return deadline
+                heapq.heappop(heap)
+                try:
+                    nextDeadline = envelope.advance(now)
+                except Exception:
+                    # one broken envelope is dropped, every other release, glide and pattern keeps running
+                    self.errors += 1
+                    traceback.print_exc()
+                    nextDeadline = None
+                if nextDeadline is not None:
+                    self._push(nextDeadline, envelope)
+                else:
+                    self._finish(envelope)
+            return None
+        finally:
+            self.condition.release()
+
+    # done or broken, so the key no longer points at a running envelope
+    def _finish(self, envelope):
+        envelope.cancelled = True
+        for key in [key for key, keyed in self.keys.items() if keyed is envelope]:
+            del self.keys[key]
+
+    def _run(self):
+        self.condition.acquire()
+        try:
+            while True:
+                nextDeadline = self.advance(self.clock())
+                self.wakeups += 1
+                if nextDeadline is None:
+                    self.condition.wait()
+                else:
+                    self.condition.wait(max(nextDeadline - self.clock(), 0.0))
+        finally:
+            self.thread = None  # if the thread ever stops, the next start() begins another
+            self.condition.release()
+
+# a function that runs function while holding lock, for handlers that share the output with envelopes
+def synchronized(lock, function):
+    def locked(*arguments):
+        lock.acquire()
+        try:
+            return function(*arguments)
+        finally:
+            lock.release()
+    locked.__name__ = function.__name__
+    return locked
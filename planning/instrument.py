@@ -0,0 +1,519 @@
+# instrument.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# The instrument itself: what each button does, how tilt becomes pitches, and what gets played.
+# All of a performer's state lives in one Performer, so a process can host several phones at once,
+# each on its own pair of MIDI channels. Nothing in here touches JythonMusic.
+
+import sys
+import time
+
+from theory import *
+from output import ChannelVoices, MpeVoices, GM_BEND_RANGE
+from motion import AccelerometerStream, HysteresisQuantizer, ONE_EURO
+from envelope import ChannelRelease, VoiceRelease, VoiceGlides, DelayedCall
+from patterns import Strum, Arpeggio, LOWEST_FIRST
+
+# region Constants
+# Mapping chord numerals of a key to button names
+chordNumeralToButtonNameDict = {
+    1 : "16",
+    2: "12",
+    3 : "h8",
+    4 : "h4",
+    5 : "15",
+    6: "11",
+    7 : "h7",
+    8 : "h3"
+}
+buttonNameToChordNumeralDict = dict((buttonName, chordNumeral) for chordNumeral, buttonName in chordNumeralToButtonNameDict.items())
+
+CHORD_VOLUME = 127
+BASS_VOLUME = 100
+# endregion
+
+class Performer(object):
+    __slots__ = (
+        # settings
+        "keyTable", "useBass", "useDecay", "chordChannel", "bassChannel", "quitWithoutAccelerometer",
+        # where notes go, and the voicings
+        "voicingTable", "noteRegistry", "chordVoices", "chordChannels", "chordPattern", "clock",
+        # chord changes sent out over OSC
+        "oscOutput",
+        # release envelopes
+        "envelopes", "releaseCurve", "voiceReleaseTime", "voiceGlides",
+        # voice leading between chord numerals
+        "voiceLeading", "lastChordScale",
+        # tilt
+        "accelerometerStream", "tiltQuantizerX", "tiltQuantizerY",
+        # continuous motion, re-voicing as tilt changes while a button is held
+        "continuousMotion", "revoiceInterval", "motionPitches", "pendingPitches", "lastRevoiceTime", "revoiceScheduled",
+        # what is being played
+        "scaleOfChordsId", "scaleOfChords", "scaleOfChordsRoot", "pivotPitch", "bassNote", "soundingBass", "buttonsHeld", "lastChord",
+        "chordNumeral", "offChordLock", "alternate", "dominant", "familyUp", "familyDown", "familyAcross",
+    )
+
+    def __init__(self, voicingTable, noteRegistry, chordChannel=0, bassChannel=1, mode=MAJOR_MODE, transposeKeySemitones=0,
+                 useBass=True, useDecay=False, restrikeCommonTones=False, accelerometerFilter=ONE_EURO, tiltHysteresis=0.25):
+        self.keyTable = keyTable(transposeKeySemitones, mode)  # what each chord numeral plays in the key, see setKey()
+        self.useBass = useBass    # want a bass root note for each chord numeral?
+        self.useDecay = useDecay  # want notes to decay quicker?
+        self.chordChannel = chordChannel  # top 4 voices
+        self.bassChannel = bassChannel
+        self.quitWithoutAccelerometer = True  # a lone instrument quits, a server just ignores the tap
+
+        self.voicingTable = voicingTable
+        self.noteRegistry = noteRegistry  # shared by every performer on the same output
+        self.chordVoices = ChannelVoices(noteRegistry, chordChannel, CHORD_VOLUME, restrikeCommonTones)
+        self.chordChannels = [chordChannel]  # every channel the chord is played on, see useMpe()
+        self.chordPattern = None  # Strum or Arpeggio, None to play chords as a block
+        self.clock = time.time  # when a message arrived, render.py swaps in the recorded times
+        self.oscOutput = None   # OscOutput, to send each chord change out over OSC, see useOscOutput()
+
+        self.envelopes = None  # EnvelopeScheduler, see useEnvelopes()
+        self.releaseCurve = None
+        self.voiceReleaseTime = 0.0
+        self.voiceGlides = None  # VoiceGlides, see useMpe()
+
+        self.voiceLeading = None    # VoiceLeading, to move into a new chord numeral as smoothly as possible
+        self.lastChordScale = None  # (scale of chords ID, root) of the last chord
+
+        self.accelerometerStream = AccelerometerStream(filter=accelerometerFilter) # recent /accxyz samples, smoothed
+        self.tiltQuantizerX = HysteresisQuantizer(*(TILT_X_RANGE + (tiltHysteresis,))) # roll --> scale degree
+        self.tiltQuantizerY = HysteresisQuantizer(*(TILT_Y_RANGE + (tiltHysteresis,))) # pitch --> scale degree
+
+        self.continuousMotion = False  # see useContinuousMotion()
+        self.revoiceInterval = 0.0     # seconds between re-voicings at the least
+        self.motionPitches = None      # (pitchX, pitchY) of the chord sounding
+        self.pendingPitches = None     # (pitchX, pitchY) that came in too soon after the last re-voicing
+        self.lastRevoiceTime = 0.0
+        self.revoiceScheduled = False  # a DelayedCall will play pendingPitches
+
+        self.scaleOfChordsId = ScaleOfChords.MAJOR_SIXTH_DIMINISHED_SCALE # choose a chord scale to move through
+        self.scaleOfChords = SCALES_OF_CHORDS[self.scaleOfChordsId] # pitch classes of the current scale of chords
+        self.scaleOfChordsRoot = self.keyTable.tonic # the root of the scale of chords
+        self.pivotPitch = self.keyTable.tonic + OCTAVE * 5 # the note around which the contrary motion expands/shrinks
+                        # if the pivot pitch is played, only that single pitch will sound
+        self.bassNote = self.keyTable.tonic + OCTAVE * 4
+        self.soundingBass = None  # bass pitch struck and not yet stopped, see toggleBassNote()
+        self.buttonsHeld = 0
+        self.lastChord = []
+        self.chordNumeral = 1
+        self.offChordLock = False
+        self.alternate = False # alternate scale of chords for each chord numeral in the key
+        self.dominant = False
+        self.familyUp = False
+        self.familyDown = False
+        self.familyAcross = False
+
+    # run decay and voice releases on a scheduler, see envelope.py
+    # voices leaving a chord ring on for voiceReleaseTime seconds, 0 stops them right away
+    def useEnvelopes(self, envelopes, releaseCurve, voiceReleaseTime=0.0):
+        self.envelopes = envelopes
+        self.releaseCurve = releaseCurve
+        self.voiceReleaseTime = voiceReleaseTime
+        self.chordVoices.voiceRelease = self.releaseVoice if voiceReleaseTime > 0 else None
+
+    # play each voice of the chord on a channel of its own, gliding to nearby pitches with pitch bend, see MpeVoices
+    # bendRange is the synth's pitch bend range on those channels, in semitones, and glideTime 0 bends straight there
+    def useMpe(self, channels, bendRange=GM_BEND_RANGE, glideTime=0.0):
+        self.chordVoices.release()
+        voiceRelease = self.chordVoices.voiceRelease
+        self.chordVoices = MpeVoices(self.noteRegistry, channels, CHORD_VOLUME, self.chordVoices.restrikeCommonTones,
+                                     bendRange, bendRange, glideTime)
+        self.chordVoices.voiceRelease = voiceRelease
+        self.chordVoices.startGlides = self.startGlides
+        self.chordChannels = list(channels)
+        self.voiceGlides = VoiceGlides(self.chordVoices, self.noteRegistry)
+        if self.chordPattern is not None:
+            self.chordPattern.voices = self.chordVoices
+
+    # strum each chord over spread seconds instead of striking it as a block, see patterns.py
+    def useStrum(self, spread, order=LOWEST_FIRST):
+        self.chordPattern = Strum(self.chordVoices, self.envelopes, self.noteRegistry, spread, order)
+
+    # arpeggiate each chord while a button is held, subdivision notes to a beat at tempo beats per minute
+    def useArpeggio(self, tempo, subdivision, order=LOWEST_FIRST):
+        self.chordPattern = Arpeggio(self.chordVoices, self.envelopes, self.noteRegistry, tempo, subdivision, order)
+
+    # send each chord change, and each release of the last button, to oscOutput, see oscoutput.py
+    def useOscOutput(self, oscOutput):
+        self.oscOutput = oscOutput
+
+    # step glides on the scheduler, returns False if there is none to step them
+    def startGlides(self):
+        if self.envelopes is None:
+            return False
+        self.voiceGlides.cancelled = False  # left cancelled when the last glides finished
+        self.envelopes.start(self.voiceGlides)
+        return True
+
+    # fade the chord channels out along the release curve, to achieve decay effect
+    def startDecay(self):
+        finished = self.silence
+        for channel in self.chordChannels:
+            release = ChannelRelease(self.noteRegistry.backend, channel, self.releaseCurve, finished)
+            self.envelopes.start(release, ("decay", channel))
+            finished = None  # the channels fade together, so silencing once is enough
+
+    def stopDecay(self):
+        for channel in self.chordChannels:
+            self.envelopes.cancel(("decay", channel))
+
+    # let a voice that left the chord ring on, then stop it
+    def releaseVoice(self, pitch, channel):
+        self.envelopes.start(VoiceRelease(self.noteRegistry, pitch, channel, self.voiceReleaseTime))
+
+    # stop everything this performer is playing, once the decay reaches 0
+    def silence(self):
+        for channel in self.chordChannels:
+            self.noteRegistry.allNotesOff(channel)
+        self.toggleBassNote(self.bassNote, 0.0)
+        self.chordVoices.reset()
+        if self.chordPattern is not None: self.chordPattern.stop()
+
+    # re-voice the chord as tilt changes while a button is held, at most maxRevoiceRate times a second (0 for no limit)
+    def useContinuousMotion(self, maxRevoiceRate=0):
+        self.continuousMotion = True
+        self.revoiceInterval = 1.0 / maxRevoiceRate if maxRevoiceRate > 0 else 0.0
+
+    # Parse accelerometer data from OSC messages
+    def parseAccelerometerData(self, message):
+        x, y, z = message.getArguments()
+        now = self.clock()
+        self.accelerometerStream.add(x, y, z, now)
+        if self.continuousMotion and self.buttonsHeld > 0:
+            self.followTilt(now)
+
+    # re-voice when tilt moves the quantized pitches, nothing is sent while they stay the same
+    def followTilt(self, now):
+        x, y, z = self.accelerometerStream.values()
+        if not ((-1.0 < x < 1.0) and (-1.0 < y < 1.0)):
+            return
+        pitches = tuple(self.mapAccelerometerToPitch(x, y, z))
+        if pitches == self.motionPitches:
+            self.pendingPitches = None  # back where the chord is, so a waiting change is no longer needed
+            return
+
+        wait = self.lastRevoiceTime + self.revoiceInterval - now
+        if wait <= 0:
+            self.revoice(pitches, now)
+            return
+        self.pendingPitches = pitches  # too soon, play the newest pitches once the interval is up
+        if not self.revoiceScheduled and self.envelopes is not None:
+            self.revoiceScheduled = True
+            self.envelopes.start(DelayedCall(self.playPendingPitches, wait), ("revoice", self.chordChannel))
+
+    def playPendingPitches(self):
+        self.revoiceScheduled = False
+        if self.pendingPitches is not None and self.buttonsHeld > 0:
+            self.revoice(self.pendingPitches, self.clock())
+
+    # play the chord for new pitches under the held button, without striking the bass again
+    def revoice(self, pitches, now):
+        pitchX, pitchY = pitches
+        self.motionPitches = pitches
+        self.pendingPitches = None
+        self.lastRevoiceTime = now
+        self.obliqueMotion(pitchY)
+        chord = self.contraryMotion(pitchX)
+        if chord != self.lastChord:
+            self.playVoicing(chord)
+
+    # Map accelerometer values to pitches
+    def mapAccelerometerToPitch(self, x, y, z):
+        # Ensure x and y are within range
+        if x > 0.0: x = 0.0
+        if y > 0.0: y = 0.0
+
+        # map acc range to octave + 1 range, ex. C4-C5
+        # hysteresis keeps sensor noise near a boundary from flipping between scale degrees
+        xMapped = self.tiltQuantizerX.quantize(x)
+        yMapped = self.tiltQuantizerY.quantize(y)
+        # zMapped = 0 # $$$ come back to this if need more accel input
+
+        return scaleDegreesToPitches(xMapped, yMapped, self.scaleOfChords, self.scaleOfChordsRoot, self.offChordLock)
+
+    # fill in the middle of contrary motion chords, take a note - skip a note
+    # voicings come from the precomputed table, see buildContraryChord() in theory.py for the rules
+    # pitches outside the scale of chords move to the nearest one in it first, so this never raises
+    def contraryMotion(self, contraryPitch):
+        root = self.scaleOfChordsRoot
+        snap = SNAP_TO_SCALE_OF_CHORDS[self.scaleOfChordsId]
+        contraryPitch += snap[(contraryPitch - root) % OCTAVE]
+        pivotPitch = self.pivotPitch + snap[(self.pivotPitch - root) % OCTAVE]
+        return self.voicingTable.lookup(contraryPitch, pivotPitch, self.scaleOfChordsId, root)
+
+    # keep the bottom note the same, while moving the notes above
+    def obliqueMotion(self, inputPitch):
+        # redundant, but named differently for clarity
+        # may add more functionality to obliqueMotion later on
+        self.setPivotPitch(inputPitch)
+
+    # display and play the chord!
+    # only the voices that change are sent, see ChannelVoices in output.py
+    def playChord(self, chord):
+        if self.useDecay: # undo any decay from the last chord
+            for channel in self.chordChannels: self.noteRegistry.backend.setVolume(CHORD_VOLUME, channel)
+
+        if self.chordPattern is not None: self.chordPattern.play(chord)
+        else: self.chordVoices.play(chord)
+
+    # change key, semitones from C and MAJOR_MODE or MINOR_MODE, from the next chord numeral on
+    # every key is worked out already, see KeyTable in theory.py, so this is one lookup
+    def setKey(self, semitones, mode=None):
+        if mode is None: mode = self.keyTable.mode
+        self.keyTable = keyTable(semitones, mode)
+
+    # Change key from an OSC message, /mnc/key semitones [mode], ex: /mnc/key -3 1 for A minor
+    # semitones outside LOWEST_TONIC to HIGHEST_TONIC move by octaves into it, anything else unplayable is ignored
+    def handleKeyChange(self, message):
+        arguments = message.getArguments()
+        if len(arguments) == 0:
+            return
+        try:
+            semitones = keyTonic(int(arguments[0]))
+            mode = int(arguments[1]) if len(arguments) > 1 else None
+        except (TypeError, ValueError, OverflowError):
+            return
+        if mode is not None and not 0 <= mode < len(MODE_KEYS):
+            return
+        self.setKey(semitones, mode)
+
+    # change the chord scale, by scale of chords ID
+    def setScaleOfChords(self, newScaleOfChordsId):
+        self.scaleOfChordsId = newScaleOfChordsId
+        self.scaleOfChords = SCALES_OF_CHORDS[newScaleOfChordsId]
+
+    # change the root note of the chord scale
+    def setScaleOfChordsRoot(self, newRoot):
+        self.scaleOfChordsRoot = newRoot
+
+    # Change the pivot pitch
+    def setPivotPitch(self, newPivotPitch):
+        self.pivotPitch = newPivotPitch
+
+    # Play a bass note for the chord numeral
+    def toggleBassNote(self, bassNote, onOrOff):
+        channel = self.bassChannel
+
+        # the bass note may have changed since it was played, so stop the one that is sounding
+        if onOrOff == 1.0 or onOrOff == 0.0:
+            if self.soundingBass is not None:
+                self.noteRegistry.noteOff(self.soundingBass, channel)
+                self.soundingBass = None
+        if onOrOff == 1.0:
+            self.noteRegistry.noteOn(bassNote, BASS_VOLUME, channel)
+            self.soundingBass = bassNote
+
+    # Play the appropriate chord from a touch input
+    def handleTouchInput(self, message):
+        address = message.getAddress()
+        arguments = message.getArguments()
+        onOrOff = arguments[0]
+        buttonName = str(address[-2] + address[-1]) # we identify the touch OSC button names by the last two characters
+
+        if not self.pressButton(buttonName, onOrOff):
+            return
+
+        if self.accelerometerStream.count > 0:
+            x, y, z = self.accelerometerStream.values()
+        else:
+            print("\nTurn on the accelerometer in TouchOSC!!!\nSettings -> Options -> OSC -> Accelerometer (/accxyz)")
+            if self.quitWithoutAccelerometer: sys.exit(1)
+            return
+
+        if  (-1.0 < x < 1.0) and (-1.0 < y < 1.0):
+            pitchX, pitchY = self.mapAccelerometerToPitch(x, y, z)
+            self.motionPitches = (pitchX, pitchY) # where continuous motion moves on from
+            self.pendingPitches = None
+            self.obliqueMotion(pitchY)
+            chord = self.contraryMotion(pitchX)
+        else:
+            chord = self.lastChord # tilt is out of range, so play the last chord again
+
+        self.playVoicing(chord, onOrOff)
+
+    # Press or release a button, returns True if the press should play a chord
+    # buttonName None counts the press without changing the state, ex: for a key of a MIDI keyboard
+    def pressButton(self, buttonName, onOrOff):
+        if buttonName is not None: self.buttonOperations(buttonName)
+
+        # if releasing a button, stop all sounds. this allows for touch to hold sustain notes on certain instruments, such as SQUARE
+        if onOrOff == 0:
+            self.buttonsHeld -= 1
+            if self.buttonsHeld == 0:
+                if self.chordPattern is not None: self.chordPattern.release()
+                if self.useDecay and self.envelopes: self.startDecay() # fade out, achieves decay effect
+                stoppedBass = self.soundingBass if self.useBass else None  # for oscOutput, toggleBassNote() clears it
+                if self.useBass: self.toggleBassNote(self.bassNote, onOrOff)
+                self.noteRegistry.backend.flush()
+                if self.oscOutput is not None: self.oscOutput.sendRelease(self, stoppedBass)
+            return False
+        else:
+            self.buttonsHeld += 1
+            if self.useDecay and self.envelopes: self.stopDecay()
+            return True
+
+    # Play a chord for a gesture, and the bass note with it
+    # onOrOff None changes the chord under a held gesture without striking the bass again
+    def playVoicing(self, chord, onOrOff=None):
+        # when the scale of chords changes, play the voicing of the new chord closest to the last one
+        chordScale = (self.scaleOfChordsId, self.scaleOfChordsRoot)
+        if self.voiceLeading is not None and chordScale != self.lastChordScale:
+            chord = self.voiceLeading.lead(self.lastChord, chord, self.scaleOfChordsId, self.scaleOfChordsRoot)
+        self.lastChordScale = chordScale
+
+        # play the appropriate chord
+        self.lastChord = chord
+        self.playChord(chord)
+        if self.useBass and onOrOff is not None: self.toggleBassNote(self.bassNote, onOrOff)
+        self.noteRegistry.backend.flush() # send the chord and bass change together
+        if self.oscOutput is not None: self.oscOutput.sendChord(self, chord, onOrOff) # after the MIDI, so it never waits on the network
+
+    # nearest pitch in the current scale of chords, see SNAP_TO_SCALE_OF_CHORDS in theory.py
+    def snapToScaleOfChords(self, pitch):
+        return snapToScaleOfChords(pitch, self.scaleOfChordsId, self.scaleOfChordsRoot)
+
+    # Update the performer's state based on what button was pressed
+    def buttonOperations(self, buttonName):
+        self.offChordLock = False
+
+        # Handle modifier buttons
+        if buttonName == "10":   # On Chord lock
+            self.resetFamilyTransformations()
+            if self.alternate or self.dominant:
+                self.makeDefault(self.chordNumeral)
+        elif buttonName == "h6": # Off Chord lock
+            self.offChordLock = True
+        elif buttonName == "14": # "Alt" button
+            self.resetFamilyTransformations()
+            if not self.alternate:
+                self.makeAlternate(self.chordNumeral)
+                self.alternate = True
+        elif buttonName == "h2": # "Make Dominant" Button, turns any chord into a Dom7
+            self.makeDominant()
+        elif buttonName == "h5": # Family Down / "Sister" Button, transform down a minor third
+            if self.familyUp:
+                self.makeFamilyDown()
+                self.familyUp = False
+            if self.familyAcross:
+                self.makeFamilyAcross()
+                self.familyAcross = False
+            if self.alternate or self.dominant:
+                self.makeDefault(self.chordNumeral)
+            if not self.familyDown:
+                self.makeFamilyDown()
+                self.familyDown = True
+        elif buttonName == "h9": # Family Across / "Cousin" Button, transform across a tritone
+            if self.familyUp:
+                self.makeFamilyDown()
+                self.familyUp = False
+            if self.familyDown:
+                self.makeFamilyUp()
+                self.familyDown = False
+            if self.alternate or self.dominant:
+                self.makeDefault(self.chordNumeral)
+            if not self.familyAcross:
+                self.makeFamilyAcross()
+                self.familyAcross = True
+        elif buttonName == "13": # "Family Up / Brother" Button, transform up minor third
+            if self.familyAcross:
+                self.makeFamilyAcross()
+                self.familyAcross = False
+            if self.familyDown:
+                self.makeFamilyUp()
+                self.familyDown = False
+            if self.alternate or self.dominant:
+                self.makeDefault(self.chordNumeral)
+            if not self.familyUp:
+                self.makeFamilyUp()
+                self.familyUp = True
+        else:
+            self.handleChordNumerals(buttonName)  # Call the function to handle chord numerals
+
+    # Reset family transformations
+    def resetFamilyTransformations(self):
+        if self.familyUp:
+            self.makeFamilyDown()
+            self.familyUp = False
+        if self.familyDown:
+            self.makeFamilyUp()
+            self.familyDown = False
+        if self.familyAcross:
+            self.makeFamilyAcross()
+            self.familyAcross = False
+
+    # Chord numeral buttons logic
+    def handleChordNumerals(self, buttonName):
+        self.resetFamilyTransformations()
+        # Set offChordLock to False
+        self.offChordLock = False
+
+        # scale of chords, root and bass note for the chord numeral, from the key's table
+        chordNumeral = buttonNameToChordNumeralDict.get(buttonName)
+        if chordNumeral is not None:
+            scaleOfChordsId, root, bassNote = self.keyTable.numerals[chordNumeral]
+            self.chordNumeral = chordNumeral
+            self.bassNote = bassNote
+            self.setScaleOfChords(scaleOfChordsId)
+            self.setScaleOfChordsRoot(root)
+
+        return True
+
+    # Switch to an alternate scale of chords based on the current chord numeral
+    def makeAlternate(self, chordNumeral):
+        alternateScale = self.keyTable.alternates[chordNumeral]
+        if alternateScale is not None:
+            newScaleOfChordsId, newRoot = alternateScale
+            self.setScaleOfChords(newScaleOfChordsId)
+            self.setScaleOfChordsRoot(newRoot)
+
+        self.alternate = True
+
+    # Move to another scale of chords with one lookup in the transition tables
+    def transformScaleOfChords(self, operation):
+        newScaleOfChordsId, newRoot = transformScaleOfChords(operation, self.scaleOfChordsId, self.scaleOfChordsRoot)
+        self.setScaleOfChords(newScaleOfChordsId)
+        self.setScaleOfChordsRoot(newRoot)
+
+    # Make current scale of chords a dominant seventh diminished scale with the same root
+    def makeDominant(self):
+        self.transformScaleOfChords(DOMINANT)
+        self.dominant = True
+
+    # Switch to family a minor third up
+    def makeFamilyUp(self):
+        # bass note of scale of chords goes down in cycle through 1 - 3 - 5 - 6/7, for voice leading
+        # scale of chords goes ups in minor thirds
+        # ex: Dmin6 --> Fmin6/D
+        self.transformScaleOfChords(FAMILY_UP)
+
+    # Switch to family a minor third down
+    def makeFamilyDown(self):
+        # bass note of scale of chords goes up in cycle through 1 - 3 - 5 - 6/7, for voice leading
+        # scale of chords goes down in minor thirds
+        # ex: Dmin6 --> Bmin6/D
+        self.transformScaleOfChords(FAMILY_DOWN)
+
+    # Switch to family a tritone across
+    def makeFamilyAcross(self):
+        # bass note of scale of chords go between 1 - 5  or 3 - 6/7, for voice leading
+        # scale of chords goes across in tritones
+        # ex: Dmin6 --> Abmin6/Eb
+        self.transformScaleOfChords(FAMILY_ACROSS)
+
+    # Reset to default scale of chords for the current chord numeral
+    def makeDefault(self, chordNumeral):
+        self.alternate = False
+        self.dominant = False
+        buttonName = chordNumeralToButtonNameDict.get(chordNumeral)
+        self.buttonOperations(buttonName)
+
+# time the stages of the touch path for every performer, see latency.py
+def instrumentPerformers(latencyHistograms):
+    from latency import TOUCH, BUTTON_OPERATIONS, CONTRARY_MOTION, PLAY_CHORD, ACCELEROMETER
+    for stage, name in ((TOUCH, "handleTouchInput"), (BUTTON_OPERATIONS, "buttonOperations"),
+                        (CONTRARY_MOTION, "contraryMotion"), (PLAY_CHORD, "playChord"),
+                        (ACCELEROMETER, "parseAccelerometerData")):
+        setattr(Performer, name, latencyHistograms.wrap(stage, getattr(Performer, name)))
@@ -0,0 +1,151 @@
+# jitter.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Evening out Wi-Fi jitter for OSC bundles that carry timetags.
+# The phone's clock and ours are related by an offset, estimated from the packets that took least time to arrive.
+# Each event is then held until the time it was sent, on our clock, plus a fixed latency, and events are let go
+# in the order they were sent, so notes keep the spacing they were played with and a tap is always paired
+# with the tilt that came before it. The latency can grow, up to a limit, to cover the jitter actually seen.
+
+from array import array
+import heapq
+
+from latency import LatencyHistograms
+
+# region Constants
+LATENCY = 0.020        # seconds from when an event was sent to when it is let go, at the least
+MAX_LATENCY = 0.100    # adaptive latency never grows past this
+JITTER_SAMPLES = 256   # recent delays the adaptive latency is worked out from
+ADAPT_EVERY = 32       # events between working the latency out again
+JITTER_PERCENTILE = 0.95  # fraction of events the latency should be long enough for
+
+OFFSET_WINDOW = 8.0    # seconds of packets the clock offset is the smallest of, so it follows a drifting clock
+OFFSET_BUCKETS = 8
+
+# stages of the histograms
+HELD = "held"  # time from an event arriving to it being let go
+LATE = "late"  # how long after it was due an event arrived
+# endregion
+
+# Local clock minus sender clock, as the smallest difference seen over the last window.
+# The packets that took least time to arrive are the ones that queued least, so their difference is the
+# closest to the true offset, plus the network's fixed delay.
+class ClockOffset(object):
+
+    def __init__(self, window=OFFSET_WINDOW, buckets=OFFSET_BUCKETS):
+        self.bucketTime = window / buckets
+        self.minimums = [None] * buckets  # smallest difference in each bucket of the window
+        self.bucket = None                # bucket number of the newest sample
+        self.offset = None
+
+    # add a packet's times, returns the offset
+    def add(self, senderTime, receivedAt):
+        difference = receivedAt - senderTime
+        minimums = self.minimums
+        bucket = int(receivedAt / self.bucketTime)
+        if bucket != self.bucket:
+            # empty the buckets that have fallen out of the window since the last sample
+            first = bucket - len(minimums) + 1 if self.bucket is None else max(self.bucket + 1, bucket - len(minimums) + 1)
+            for passed in range(first, bucket + 1):
+                minimums[passed % len(minimums)] = None
+            self.bucket = bucket
+            self.offset = None
+        slot = bucket % len(minimums)
+        if minimums[slot] is None or difference < minimums[slot]:
+            minimums[slot] = difference
+        if self.offset is None:
+            self.offset = min([minimum for minimum in minimums if minimum is not None])
+        elif difference < self.offset:
+            self.offset = difference
+        return self.offset
+
+# Holds timetagged events and lets them go in the order they were sent, latency after they were sent.
+# An event sent before one already let go is out of order: it is dropped if droppable, ex: a tilt that a newer
+# one has replaced, and otherwise let go at once, ex: a touch, since a lost note off would hang a note.
+class JitterBuffer(object):
+
+    def __init__(self, handler, latency=LATENCY, maxLatency=MAX_LATENCY, adaptive=True):
+        self.handler = handler        # called with (kind, message, receivedAt) for each event let go
+        self.minLatency = latency
+        self.maxLatency = max(maxLatency, latency)
+        self.adaptive = adaptive      # grow the latency to cover the jitter seen, or keep it fixed
+        self.latency = latency        # seconds, the latency in use
+        self.clockOffset = ClockOffset()
+        self.heap = []                # (sender time, order added, kind, message, received at)
+        self.order = 0
+        self.lastSent = None          # sender time of the newest event let go
+
+        self.delays = array("d", [0.0]) * JITTER_SAMPLES  # recent delays beyond the quickest packet
+        self.delayCount = 0
+
+        self.histograms = LatencyHistograms([HELD, LATE])
+        self.events = 0
+        self.released = 0
+        self.late = 0        # arrived after they were due, and went out as soon as they could
+        self.outOfOrder = 0  # arrived after a newer event went out
+        self.dropped = 0
+
+    # add an event sent at senderTime, in seconds on the sender's clock
+    def add(self, senderTime, kind, message, receivedAt, droppable=False):
+        self.events += 1
+        offset = self.clockOffset.add(senderTime, receivedAt)
+        self._addDelay(receivedAt - senderTime - offset)
+
+        if self.lastSent is not None and senderTime < self.lastSent:
+            self.outOfOrder += 1
+            if droppable:
+                self.dropped += 1
+            else:
+                self._release(kind, message, receivedAt, receivedAt)
+            return
+        self.order += 1
+        heapq.heappush(self.heap, (senderTime, self.order, kind, message, receivedAt))
+
+    def _addDelay(self, delay):
+        self.delays[self.delayCount % JITTER_SAMPLES] = delay
+        self.delayCount += 1
+        if self.adaptive and self.delayCount % ADAPT_EVERY == 0:
+            delays = sorted(self.delays[:min(self.delayCount, JITTER_SAMPLES)])
+            covered = delays[int(JITTER_PERCENTILE * (len(delays) - 1))]
+            self.latency = min(max(covered, self.minLatency), self.maxLatency)
+
+    # let go of every event due by now, in the order they were sent
+    # returns when the next one is due, or None if nothing is waiting
+    def release(self, now):
+        heap = self.heap
+        while heap:
+            senderTime, order, kind, message, receivedAt = heap[0]
+            due = senderTime + self.clockOffset.offset + self.latency
+            if due > now:
+                return due
+            heapq.heappop(heap)
+            self.lastSent = senderTime
+            if receivedAt > due:
+                self.late += 1
+                self.histograms.record(LATE, receivedAt - due)
+            self._release(kind, message, receivedAt, now)
+        return None
+
+    def _release(self, kind, message, receivedAt, now):
+        self.released += 1
+        self.histograms.record(HELD, now - receivedAt)
+        self.handler(kind, message, receivedAt)
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "released": self.released,
+            "late": self.late,
+            "outOfOrder": self.outOfOrder,
+            "dropped": self.dropped,
+            "waiting": len(self.heap),
+            "latencyMs": self.latency * 1000.0,
+            "clockOffsetMs": (self.clockOffset.offset or 0.0) * 1000.0,
+            "heldP50Microseconds": self.histograms.percentile(HELD, 0.5),
+            "heldP99Microseconds": self.histograms.percentile(HELD, 0.99),
+        }
+
+    def formatReport(self):
+        stats = self.stats()
+        return ("jitter buffer: %(events)d events, %(late)d late, %(outOfOrder)d out of order, %(dropped)d dropped, "
+                "latency %(latencyMs).1f ms, held p50 <%(heldP50Microseconds)d us p99 <%(heldP99Microseconds)d us" % stats)
@@ -0,0 +1,113 @@
+# latency.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Timing for each stage of the touch path, kept in fixed-size histograms.
+# Stages are timed by wrapping their functions, so when instrumentation is off
+# nothing is wrapped and the instrument runs exactly as it would without this module.
+
+from array import array
+import time
+
+# region Constants
+# bucket i holds durations from 2^i to 2^(i+1) microseconds, the last one holds everything longer
+BUCKETS = 24  # up to ~8 seconds
+
+# the touch path, in the order a tap goes through it
+TOUCH = "touch"                      # all of handleTouchInput(), OSC message in to last noteOn out
+OSC_DISPATCH = "oscDispatch"         # packet received to handler called, when the listener can see it
+BUTTON_OPERATIONS = "buttonOperations"
+CONTRARY_MOTION = "contraryMotion"
+PLAY_CHORD = "playChord"
+ACCELEROMETER = "accelerometer"      # parseAccelerometerData()
+STAGES = [TOUCH, OSC_DISPATCH, BUTTON_OPERATIONS, CONTRARY_MOTION, PLAY_CHORD, ACCELEROMETER]
+# endregion
+
+clock = getattr(time, "perf_counter", time.time)  # Jython is Python 2.7, without perf_counter
+
+class LatencyHistograms(object):
+
+    def __init__(self, stages=STAGES):
+        self.stages = list(stages)
+        # all memory is allocated here, recording only increments
+        self.buckets = dict((stage, array("l", [0]) * BUCKETS) for stage in self.stages)
+        self.counts = dict((stage, 0) for stage in self.stages)
+        self.totals = dict((stage, 0.0) for stage in self.stages)
+        self.maximums = dict((stage, 0.0) for stage in self.stages)
+
+    # add one duration, in seconds
+    def record(self, stage, seconds):
+        microseconds = int(seconds * 1e6)
+        bucket = 0
+        while microseconds > 1 and bucket < BUCKETS - 1:
+            microseconds >>= 1
+            bucket += 1
+        self.buckets[stage][bucket] += 1
+        self.counts[stage] += 1
+        self.totals[stage] += seconds
+        if seconds > self.maximums[stage]:
+            self.maximums[stage] = seconds
+
+    # a function that times each call to function under stage
+    def wrap(self, stage, function):
+        def timed(*arguments):
+            start = clock()
+            try:
+                return function(*arguments)
+            finally:
+                self.record(stage, clock() - start)
+        timed.__name__ = function.__name__
+        return timed
+
+    # upper edge of the bucket holding this fraction of a stage's durations, in microseconds
+    def percentile(self, stage, fraction):
+        count = self.counts[stage]
+        if count == 0:
+            return 0
+        target = fraction * count
+        seen = 0
+        for bucket, bucketCount in enumerate(self.buckets[stage]):
+            seen += bucketCount
+            if seen >= target:
+                return 2 ** (bucket + 1)
+        return 2 ** BUCKETS
+
+    def report(self):
+        report = {}
+        for stage in self.stages:
+            count = self.counts[stage]
+            report[stage] = {
+                "count": count,
+                "meanMicroseconds": self.totals[stage] / count * 1e6 if count else 0.0,
+                "maxMicroseconds": self.maximums[stage] * 1e6,
+                "p50Microseconds": self.percentile(stage, 0.50),
+                "p99Microseconds": self.percentile(stage, 0.99),
+                "buckets": list(self.buckets[stage]),
+            }
+        return report
+
+    def formatReport(self):
+        lines = ["%-18s %8s %10s %10s %10s %10s" % ("stage", "count", "mean us", "p50 us", "p99 us", "max us")]
+        report = self.report()
+        for stage in self.stages:
+            entry = report[stage]
+            if entry["count"]:
+                lines.append("%-18s %8d %10.1f %10d %10d %10.1f" % (stage, entry["count"], entry["meanMicroseconds"],
+                    entry["p50Microseconds"], entry["p99Microseconds"], entry["maxMicroseconds"]))
+        return "\n".join(lines)
+
+    def dumpJson(self, path):
+        import json  # only needed on the way out, so it is not loaded at startup
+        handle = open(path, "w")
+        try:
+            json.dump(self.report(), handle, indent=2, sort_keys=True)
+        finally:
+            handle.close()
+
+    def reset(self):
+        for stage in self.stages:
+            buckets = self.buckets[stage]
+            for bucket in range(BUCKETS):
+                buckets[bucket] = 0
+            self.counts[stage] = 0
+            self.totals[stage] = 0.0
+            self.maximums[stage] = 0.0
@@ -0,0 +1,175 @@
+# midiinput.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Playing the instrument from a MIDI keyboard or controller instead of, or alongside, TouchOSC.
+# The lowest keys are the buttons: white keys from C2 are the chord numerals, black keys the modifiers.
+# Keys above them set the pitches directly: one key is the contrary pitch, two or more are the contrary pitch
+# and the pivot pitch. Controllers can sweep either one through the scale of chords, like tilt does.
+# Every pitch is snapped to the scale of chords with one table lookup, so any key plays a chord.
+# MIDI is read on its own thread, from JythonMusic's MidiIn or straight from a rawmidi port, and handled as it arrives.
+
+import os
+import threading
+
+from theory import *
+
+# region Constants
+NO_MIDI_INPUT = "none"
+JYTHON_MIDI_INPUT = "jython"  # JythonMusic's MidiIn
+RAW_MIDI_INPUT = "raw"        # MIDI bytes from an ALSA rawmidi port, named pipe or file
+
+# MIDI event types, as status bytes without the channel, same as JythonMusic's
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+CONTROL_CHANGE = 0xB0
+
+# key --> button name, for the keys that act as buttons
+KEY_BUTTONS = {
+    34: "10",  # A#1, On Chord lock
+    35: "h6",  # B1, Off Chord lock
+    36: "16", 38: "12", 40: "h8", 41: "h4", 43: "15", 45: "11", 47: "h7", 48: "h3",  # C2-C3, chord numerals 1-8
+    37: "14",  # C#2, Alt
+    39: "h2",  # D#2, Dom
+    42: "h5",  # F#2, Family Down
+    44: "h9",  # G#2, Family Across
+    46: "13",  # A#2, Family Up
+}
+HIGHEST_BUTTON_KEY = 48  # C3, keys above this are pitches
+
+CONTRARY_CONTROLLER = 1  # mod wheel sweeps the contrary pitch, like roll
+PIVOT_CONTROLLER = 2     # breath controller sweeps the pivot pitch, like pitch
+CONTROLLER_DEGREES = 9   # scale degrees a controller sweeps through, 0-8 as tilt does
+
+READ_SIZE = 256  # bytes read from a rawmidi port at once, whatever has arrived is handled straight away
+# endregion
+
+# Turns MIDI messages into presses and pitches for a Performer
+class KeyboardInput(object):
+
+    def __init__(self, performer, channel=None):
+        self.performer = performer
+        self.channel = channel     # only listen to this MIDI channel, None for all of them
+        self.keysDown = set()      # keys held, so a stray note off never releases a button twice
+        self.pitchKeys = []        # keys held above the buttons, in the order they were pressed
+        self.contraryKey = None    # key for the contrary pitch, None to use contraryDegree
+        self.pivotKey = None       # key for the pivot pitch, None to use pivotDegree
+        self.contraryDegree = 0    # scale degrees from a controller, the root of octaves 4 and 5 to begin with
+        self.pivotDegree = 0
+
+    # JythonMusic's MidiIn handler, also called by RawMidiInput
+    def handleMidiInput(self, eventType, channel, data1, data2):
+        if self.channel is not None and channel != self.channel:
+            return
+        if eventType == NOTE_ON and data2 == 0:
+            eventType = NOTE_OFF
+        if eventType == NOTE_ON or eventType == NOTE_OFF:
+            self.handleKey(data1, eventType == NOTE_ON)
+        elif eventType == CONTROL_CHANGE:
+            self.handleController(data1, data2)
+
+    def handleKey(self, key, down):
+        if down == (key in self.keysDown):
+            return  # a repeated note on, or a note off for a key pressed before we were listening
+        if down:
+            self.keysDown.add(key)
+        else:
+            self.keysDown.discard(key)
+        onOrOff = 1.0 if down else 0.0
+
+        if key <= HIGHEST_BUTTON_KEY:
+            buttonName = KEY_BUTTONS.get(key)
+            if buttonName is not None and self.performer.pressButton(buttonName, onOrOff):
+                self.play(onOrOff)
+            return
+
+        if down:
+            self.pitchKeys.append(key)
+            if len(self.pitchKeys) == 1:
+                self.contraryKey = key
+            else:
+                self.contraryKey = min(self.pitchKeys)
+                self.pivotKey = max(self.pitchKeys)
+        else:
+            self.pitchKeys.remove(key)  # the pitches stay where they are, as a chord does when a button is released
+        if self.performer.pressButton(None, onOrOff):
+            self.play(onOrOff)
+
+    # sweep the contrary or pivot pitch through the scale of chords, and follow it if a chord is held
+    def handleController(self, controller, value):
+        degree = value * CONTROLLER_DEGREES // 128
+        if controller == CONTRARY_CONTROLLER:
+            changed = self.contraryKey is not None or degree != self.contraryDegree
+            self.contraryKey, self.contraryDegree = None, degree
+        elif controller == PIVOT_CONTROLLER:
+            changed = self.pivotKey is not None or degree != self.pivotDegree
+            self.pivotKey, self.pivotDegree = None, degree
+        else:
+            return
+        if changed and self.performer.buttonsHeld > 0:
+            self.play()
+
+    # contrary and pivot pitches in the current scale of chords
+    def pitches(self):
+        performer = self.performer
+        contraryPitch, pivotPitch = scaleDegreesToPitches(self.contraryDegree, self.pivotDegree, performer.scaleOfChords,
+                                                          performer.scaleOfChordsRoot, performer.offChordLock)
+        if self.contraryKey is not None:
+            contraryPitch = performer.snapToScaleOfChords(self.contraryKey)
+        if self.pivotKey is not None:
+            pivotPitch = performer.snapToScaleOfChords(self.pivotKey)
+        return contraryPitch, pivotPitch
+
+    # onOrOff None plays the new chord under the held keys, see Performer.playVoicing()
+    def play(self, onOrOff=None):
+        performer = self.performer
+        contraryPitch, pivotPitch = self.pitches()
+        performer.obliqueMotion(pivotPitch)
+        performer.playVoicing(performer.contraryMotion(contraryPitch), onOrOff)  # both pitches are in the scale
+
+# Splits a MIDI byte stream into messages, following running status and skipping system messages
+class MidiParser(object):
+
+    def __init__(self, handler):
+        self.handler = handler  # called with (eventType, channel, data1, data2)
+        self.status = None      # running status, None inside a system exclusive message
+        self.data = []
+
+    def feed(self, data):
+        for byte in bytearray(data):
+            if byte >= 0xF8:
+                continue  # real time messages can come between any two bytes
+            if byte >= 0x80:
+                self.status = byte if byte < 0xF0 else None  # system messages end running status
+                self.data = []
+                continue
+            if self.status is None:
+                continue
+            self.data.append(byte)
+            eventType = self.status & 0xF0
+            length = 1 if eventType == 0xC0 or eventType == 0xD0 else 2  # program change and channel pressure
+            if len(self.data) == length:
+                data1, data2 = self.data[0], (self.data[1] if length == 2 else 0)
+                self.data = []
+                self.handler(eventType, self.status & 0x0F, data1, data2)
+
+# Reads a rawmidi port on a thread of its own, which blocks until bytes arrive and hands them straight to a parser
+class RawMidiInput(object):
+
+    def __init__(self, path, handler):
+        self.path = path
+        self.parser = MidiParser(handler)
+        self.file = None
+        self.thread = None
+
+    def start(self):
+        self.file = os.open(self.path, os.O_RDONLY)
+        self.thread = threading.Thread(target=self._run, name="midi input")
+        self.thread.daemon = True  # a blocking read cannot be interrupted, so the thread ends with the process
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            data = os.read(self.file, READ_SIZE)
+            if not data:
+                break  # end of a file or pipe
+            self.parser.feed(data)
@@ -0,0 +1,132 @@
+# motion.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Accelerometer input: a fixed-size ring buffer of timestamped /accxyz samples,
+# smoothed as they arrive, and a quantizer with hysteresis for turning tilt into scale degrees.
+# TouchOSC sends accelerometer messages at a high rate, so adding a sample only writes into
+# preallocated arrays and updates a few numbers.
+
+from array import array
+import math
+
+# region Constants
+NO_FILTER = 0
+LOW_PASS = 1   # exponential smoothing, a fixed amount per sample
+ONE_EURO = 2   # low pass whose cutoff rises with speed: steady when still, quick when moving
+
+AXES = 3  # x, y, z
+MIN_SAMPLE_INTERVAL = 0.001  # seconds, for samples that arrive with the same timestamp
+# endregion
+
+# smoothing factor for a low pass filter with this cutoff (Hz), for a sample dt seconds after the last
+def lowPassAlpha(cutoff, dt):
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+class AccelerometerStream(object):
+
+    def __init__(self, size=256, filter=ONE_EURO, alpha=0.5, minCutoff=5.0, beta=5.0, derivativeCutoff=1.0):
+        self.size = size
+        self.filter = filter
+        self.alpha = alpha                       # LOW_PASS: how much of each new sample to take, 0-1
+        self.minCutoff = minCutoff               # ONE_EURO: cutoff in Hz when the phone is still, a 32 ms time constant
+        self.beta = beta                         # ONE_EURO: Hz the cutoff rises per g/s, tilt is about +-1 g
+        self.derivativeCutoff = derivativeCutoff # ONE_EURO: cutoff in Hz for the speed estimate
+
+        # ring buffer of raw samples
+        self.times = array("d", [0.0]) * size
+        self.samples = array("d", [0.0]) * (size * AXES)  # x, y, z for each sample, side by side
+        self.index = 0  # where the next sample goes
+        self.count = 0  # how many samples have arrived, up to size
+
+        # filter state, per axis
+        self.filtered = array("d", [0.0]) * AXES
+        self.derivatives = array("d", [0.0]) * AXES
+        self.lastTime = 0.0
+
+    # store a sample and update the filtered values
+    def add(self, x, y, z, timestamp):
+        index = self.index
+        self.times[index] = timestamp
+        samples = self.samples
+        offset = index * AXES
+        samples[offset] = x
+        samples[offset + 1] = y
+        samples[offset + 2] = z
+        self.index = (index + 1) % self.size
+
+        filtered = self.filtered
+        if self.count == 0 or self.filter == NO_FILTER:
+            filtered[0] = x
+            filtered[1] = y
+            filtered[2] = z
+        elif self.filter == LOW_PASS:
+            alpha = self.alpha
+            filtered[0] += alpha * (x - filtered[0])
+            filtered[1] += alpha * (y - filtered[1])
+            filtered[2] += alpha * (z - filtered[2])
+        else:
+            dt = max(timestamp - self.lastTime, MIN_SAMPLE_INTERVAL)
+            self._oneEuro(0, x, dt)
+            self._oneEuro(1, y, dt)
+            self._oneEuro(2, z, dt)
+
+        self.lastTime = timestamp
+        if self.count < self.size:
+            self.count += 1
+
+    # see Casiez et al., "1 Euro Filter: A Simple Speed-based Low-pass Filter for Noisy Input in Interactive Systems"
+    def _oneEuro(self, axis, value, dt):
+        filtered, derivatives = self.filtered, self.derivatives
+        derivative = (value - filtered[axis]) / dt
+        derivatives[axis] += lowPassAlpha(self.derivativeCutoff, dt) * (derivative - derivatives[axis])
+        cutoff = self.minCutoff + self.beta * abs(derivatives[axis])
+        filtered[axis] += lowPassAlpha(cutoff, dt) * (value - filtered[axis])
+
+    # the smoothed x, y, z
+    def values(self):
+        filtered = self.filtered
+        return filtered[0], filtered[1], filtered[2]
+
+    # a raw sample as (timestamp, x, y, z), 0 is the newest
+    def sample(self, age=0):
+        if not (0 <= age < self.count):
+            raise IndexError("no sample that old")
+        index = (self.index - 1 - age) % self.size
+        offset = index * AXES
+        samples = self.samples
+        return self.times[index], samples[offset], samples[offset + 1], samples[offset + 2]
+
+    def clear(self):
+        self.index = 0
+        self.count = 0
+
+# Maps a value range onto whole steps, like JythonMusic's mapValue() into an int range,
+# except the step only changes once the value is more than `hysteresis` of a step past the boundary.
+# With hysteresis = 0 the result is the same as mapValue().
+class HysteresisQuantizer(object):
+
+    def __init__(self, minValue, maxValue, minResultValue, maxResultValue, hysteresis=0.0):
+        self.minValue = float(minValue)
+        self.maxValue = float(maxValue)
+        self.minResultValue = minResultValue
+        self.maxResultValue = maxResultValue
+        self.hysteresis = hysteresis  # fraction of a step, 0-0.5
+        self.step = None  # last step returned
+
+    def quantize(self, value):
+        value = min(max(value, self.minValue), self.maxValue)
+        normal = (value - self.minValue) / (self.maxValue - self.minValue)
+        result = normal * (self.maxResultValue - self.minResultValue) + self.minResultValue
+        step = int(result)
+
+        # stay on the last step until the value is clearly past its edges
+        last = self.step
+        if last is not None and step != last and last - self.hysteresis <= result < last + 1 + self.hysteresis:
+            step = last
+
+        self.step = step
+        return step
+
+    def reset(self):
+        self.step = None
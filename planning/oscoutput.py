@@ -0,0 +1,119 @@
+# oscoutput.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Sends each chord change out over OSC, ex: to visuals, a second synth or a recorder.
+# A change goes out as one bundle: the sounding pitches, the voicing, the scale of chords, its root and
+# the chord numeral, so a receiver never sees half of one chord and half of the next.
+# The bundle is encoded into one buffer reused for every chord, with the addresses and names worked out
+# once, and sent with one non-blocking send per destination, so however many destinations there are
+# the tap never waits on the network. A send that would block is dropped and counted instead.
+
+import socket
+import struct
+
+from theory import OCTAVE, SCALE_OF_CHORDS_NAMES, VOICING_NAMES, voicingWidth
+
+# region Constants
+INT = struct.Struct(">i")
+TIMETAG = struct.Struct(">Q")
+BUNDLE = b"#bundle\0"
+IMMEDIATELY = 1  # the timetag meaning "as soon as it arrives"
+BUNDLE_HEADER_SIZE = 16  # "#bundle", then the timetag
+ELEMENT_SIZE = 4         # each message in a bundle follows its size
+BUFFER_SIZE = 1024       # room for a chord of every note there is
+
+CHORD = "/mnc/chord"      # ,i... sounding pitches, lowest first
+VOICING = "/mnc/voicing"  # ,is width and name, see VOICING_NAMES in theory.py
+SCALE = "/mnc/scale"      # ,is scale of chords ID and name
+ROOT = "/mnc/root"        # ,i pitch class of the scale of chords root
+NUMERAL = "/mnc/numeral"  # ,i chord numeral 1-8
+BASS = "/mnc/bass"        # ,ii bass pitch and 1 for on or 0 for off, only when the bass is struck or stopped
+RELEASE = "/mnc/release"  # no arguments, the last button was released, with /mnc/bass <pitch> 0 if that stopped the bass
+# endregion
+
+# an OSC string: ASCII, ended with at least one null and padded to 4 bytes
+def oscString(text):
+    data = text.encode("ascii") + b"\0"
+    return data + b"\0" * (-len(data) % 4)
+
+# address and type tags of a message, which only need working out once
+def messagePrefix(address, tags):
+    return oscString(address) + oscString("," + tags)
+
+# Encodes chord changes as OSC bundles and sends them to every destination, see the top of this file
+class OscOutput(object):
+
+    def __init__(self, destinations, sock=None):
+        # resolved once, so a send never waits on DNS
+        self.destinations = [(socket.gethostbyname(host), port) for host, port in destinations]
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+        self.sock = sock
+
+        self.buffer = bytearray(BUFFER_SIZE)  # one bundle, always starting with the same header
+        self.buffer[:len(BUNDLE)] = BUNDLE
+        TIMETAG.pack_into(self.buffer, len(BUNDLE), IMMEDIATELY)
+        self.view = memoryview(self.buffer)
+
+        self.chordPrefixes = [messagePrefix(CHORD, "i" * count) for count in range(BUFFER_SIZE // 8)]  # by number of pitches
+        self.voicingPrefix = messagePrefix(VOICING, "is")
+        self.scalePrefix = messagePrefix(SCALE, "is")
+        self.rootPrefix = messagePrefix(ROOT, "i")
+        self.numeralPrefix = messagePrefix(NUMERAL, "i")
+        self.bassPrefix = messagePrefix(BASS, "ii")
+        self.voicingNames = [oscString(name) for name in VOICING_NAMES]
+        self.scaleNames = [oscString(name) for name in SCALE_OF_CHORDS_NAMES]
+        self.releasePrefix = messagePrefix(RELEASE, "")
+
+        self.sent = 0     # packets, counting each destination
+        self.dropped = 0  # packets the socket could not take
+
+    # send a chord a performer has just played, see Performer.playVoicing()
+    # onOrOff None for a chord changed under a held gesture, which leaves the bass alone
+    def sendChord(self, performer, chord, onOrOff=None):
+        scaleOfChordsId = performer.scaleOfChordsId
+        width = voicingWidth(chord, scaleOfChordsId, performer.scaleOfChordsRoot)
+
+        offset = self._message(BUNDLE_HEADER_SIZE, self.chordPrefixes[len(chord)], sorted(chord))
+        offset = self._message(offset, self.voicingPrefix, (width,), self.voicingNames[width])
+        offset = self._message(offset, self.scalePrefix, (scaleOfChordsId,), self.scaleNames[scaleOfChordsId])
+        offset = self._message(offset, self.rootPrefix, (performer.scaleOfChordsRoot % OCTAVE,))
+        offset = self._message(offset, self.numeralPrefix, (performer.chordNumeral,))
+        if performer.useBass and onOrOff is not None:
+            offset = self._message(offset, self.bassPrefix, (performer.bassNote, int(onOrOff)))
+        self._send(self.view[:offset])
+
+    # send that the last button was released, see Performer.pressButton()
+    # stoppedBass is the bass pitch the release stopped, or None if no bass was sounding
+    def sendRelease(self, performer, stoppedBass=None):
+        offset = self._message(BUNDLE_HEADER_SIZE, self.releasePrefix, ())
+        if stoppedBass is not None:
+            offset = self._message(offset, self.bassPrefix, (stoppedBass, 0))
+        self._send(self.view[:offset])
+
+    # write one bundle element at offset, returns where the next one goes
+    def _message(self, offset, prefix, values, text=None):
+        buffer = self.buffer
+        start = offset + ELEMENT_SIZE
+        end = start + len(prefix)
+        buffer[start:end] = prefix
+        for value in values:
+            INT.pack_into(buffer, end, value)
+            end += 4
+        if text is not None:
+            buffer[end:end + len(text)] = text
+            end += len(text)
+        INT.pack_into(buffer, offset, end - start)
+        return end
+
+    def _send(self, packet):
+        for destination in self.destinations:
+            try:
+                self.sock.sendto(packet, destination)
+                self.sent += 1
+            except socket.error:  # the socket buffer is full, or nothing is listening
+                self.dropped += 1
+
+    def formatReport(self):
+        return "osc output: %d packets to %d destinations, %d dropped" % (self.sent, len(self.destinations), self.dropped)
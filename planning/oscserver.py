@@ -0,0 +1,359 @@
+# oscserver.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# A native asyncio OSC listener for running the instrument under CPython instead of JythonMusic's OscIn.
+# Every packet waiting on the socket is read into one reused buffer and parsed in place,
+# addresses are matched against a table built once, and of the /accxyz packets in a burst only the newest
+# is handled, always before the next touch.
+# Messages in OSC bundles can go through a jitter buffer instead, which plays them back with the timing
+# their timetags give, see jitter.py.
+#
+#   python oscserver.py [--port 50380] [--raw-midi /dev/snd/midiC1D0] [--midi-in /dev/snd/midiC2D0]
+#                       [--jitter-buffer 20] [--max-jitter-buffer 100] [--fixed-latency]
+
+import argparse
+import asyncio
+import signal
+import socket
+import struct
+
+from jitter import JitterBuffer, LATENCY, MAX_LATENCY
+from latency import OSC_DISPATCH, clock
+
+# region Constants
+TOUCH = 0
+ACCELEROMETER = 1
+IGNORED = 2
+KEY_CHANGE = 3  # /mnc/key, see Performer.handleKeyChange()
+
+FLOAT = struct.Struct(">f")
+INT = struct.Struct(">i")
+FLOAT_TAG = ord("f")
+INT_TAG = ord("i")
+TRUE_TAG = ord("T")
+FALSE_TAG = ord("F")
+COMMA = ord(",")
+
+BUNDLE = b"#bundle\0"
+BUNDLE_HEADER_SIZE = 16  # "#bundle", then the timetag
+TIMETAG = struct.Struct(">Q")  # NTP time, seconds since 1900 in the high 32 bits and the fraction in the low
+TIMETAG_SECOND = float(1 << 32)
+IMMEDIATELY = 1  # the timetag meaning "as soon as it arrives"
+
+MAX_PACKET_SIZE = 65536
+MAX_PACKETS_PER_WAKEUP = 256     # read at most this many packets before letting the loop do other work
+MAX_ADDRESSES = 256              # addresses matched by a prefix that are kept in the table, past this they are matched every time
+RECEIVE_BUFFER_SIZE = 1 << 20    # room for bursts while a chord is being played
+# endregion
+
+# JythonMusic's message interface, for the instrument's handlers
+class OscMessage(object):
+    __slots__ = ("address", "arguments")
+
+    def __init__(self, address, arguments):
+        self.address = address
+        self.arguments = arguments
+
+    def getAddress(self):
+        return self.address
+
+    def getArguments(self):
+        return self.arguments
+
+# end of an OSC string that starts at offset, and the offset after its padding
+def _paddedEnd(data, offset, length):
+    end = data.find(b"\0", offset, length)
+    if end < 0:
+        raise ValueError("unterminated OSC string")
+    return end, (end + 4) & ~3
+
+# arguments of the message whose type tags start at offset, read in place
+def parseArguments(data, offset, length):
+    if offset >= length or data[offset] != COMMA:
+        return []
+    tagsEnd, position = _paddedEnd(data, offset, length)
+    arguments = []
+    for index in range(offset + 1, tagsEnd):
+        tag = data[index]
+        if tag == FLOAT_TAG:
+            arguments.append(FLOAT.unpack_from(data, position)[0])
+            position += 4
+        elif tag == INT_TAG:
+            arguments.append(INT.unpack_from(data, position)[0])
+            position += 4
+        elif tag == TRUE_TAG:
+            arguments.append(1.0)
+        elif tag == FALSE_TAG:
+            arguments.append(0.0)
+        else:
+            raise ValueError("unsupported OSC type tag: " + chr(tag))
+    if position > length:
+        raise ValueError("OSC arguments run past the end of the packet")
+    return arguments
+
+class OscDispatcher(object):
+
+    def __init__(self, touchHandler, accelerometerHandler, latency=None, keyHandler=None):
+        self.handlers = {TOUCH: touchHandler, ACCELEROMETER: accelerometerHandler, KEY_CHANGE: keyHandler}
+        self.latency = latency  # LatencyHistograms, to time packet receipt to handler
+
+        # address length --> [(address bytes, (kind, address as a string))], filled in as addresses are seen
+        self.addresses = {}
+        self.prefixes = []
+        self.cachedAddresses = 0  # addresses added to the table by _resolve()
+
+        # newest accelerometer packet not handled yet
+        self.pendingAccelerometer = None
+        self.pendingReceivedAt = 0.0
+
+        self.jitterBuffer = None  # JitterBuffer for bundled messages, see useJitterBuffer()
+        self.bundled = []         # (timetag, kind, message) of the bundle being received, reused for every bundle
+
+        self.packets = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def addAddress(self, address, kind):
+        encoded = address.encode("ascii")
+        self.addresses.setdefault(len(encoded), []).append((encoded, (kind, address)))
+
+    # addresses starting with prefix, ex: "/7/push" for "/7/push.*"
+    def addPrefix(self, prefix, kind):
+        self.prefixes.append((prefix.encode("ascii"), kind))
+
+    # hold messages from timetagged bundles and let them go latency seconds after they were sent, see jitter.py
+    # without one, bundled messages are handled as they arrive, like any other
+    def useJitterBuffer(self, latency=LATENCY, maxLatency=MAX_LATENCY, adaptive=True):
+        self.jitterBuffer = JitterBuffer(self._releaseTimed, latency, maxLatency, adaptive)
+
+    # kind and string form of an address, compared in place against the table
+    # the first time an address is seen it is matched against the prefixes, and added to the table if one matches
+    # unknown addresses are never added, so stray senders cannot grow the table
+    def _resolve(self, addressView):
+        for address, entry in self.addresses.get(len(addressView), ()):
+            if addressView == address:
+                return entry
+        address = addressView.tobytes()
+        for prefix, kind in self.prefixes:
+            if address.startswith(prefix):
+                decoded = address.decode("ascii", "replace")
+                if self.cachedAddresses < MAX_ADDRESSES:
+                    self.cachedAddresses += 1
+                    self.addAddress(decoded, kind)
+                return kind, decoded
+        return IGNORED, None
+
+    # handle one packet, data may be a reused buffer holding length bytes
+    # the whole packet is parsed before any of it is handled, so a handler's errors are never taken for a bad packet
+    def receive(self, data, length, receivedAt):
+        self.packets += 1
+        bundled = self.bundled
+        isBundle = data.startswith(BUNDLE, 0, length)
+        try:
+            if isBundle:
+                self._parseBundle(data, 0, length, bundled)
+            else:
+                kind, message = self._parseMessage(data, 0, length)
+        except (ValueError, struct.error):
+            del bundled[:]
+            self.dropped += 1  # not an OSC packet we understand
+            return
+        if isBundle:
+            self._handleBundled(bundled, receivedAt)
+            return
+        if kind == IGNORED:
+            self.dropped += 1
+            return
+        self._handle(kind, message, receivedAt)
+
+    # kind and message of the OSC message from start to end, the message is None if it is ignored
+    def _parseMessage(self, data, start, end):
+        addressEnd, argumentsStart = _paddedEnd(data, start, end)
+        kind, address = self._resolve(memoryview(data)[start:addressEnd])
+        if kind == IGNORED:
+            return kind, None
+        return kind, OscMessage(address, parseArguments(data, argumentsStart, end))
+
+    # add (timetag, kind, message) to bundled for every message of the bundle from start to end,
+    # and of the bundles inside it, which carry their own timetags
+    def _parseBundle(self, data, start, end, bundled):
+        timetag = TIMETAG.unpack_from(data, start + len(BUNDLE))[0]
+        position = start + BUNDLE_HEADER_SIZE
+        while position < end:
+            size = INT.unpack_from(data, position)[0]
+            position += 4
+            elementEnd = position + size
+            if size < 0 or elementEnd > end:
+                raise ValueError("OSC bundle element runs past the end of the packet")
+            if data.startswith(BUNDLE, position, elementEnd):
+                self._parseBundle(data, position, elementEnd, bundled)
+            else:
+                kind, message = self._parseMessage(data, position, elementEnd)
+                bundled.append((timetag, kind, message))
+            position = elementEnd
+
+    # handle the messages of a parsed bundle, in the order they were in it
+    def _handleBundled(self, bundled, receivedAt):
+        try:
+            for timetag, kind, message in bundled:
+                if kind == IGNORED:
+                    self.dropped += 1
+                elif self.jitterBuffer is None or timetag == IMMEDIATELY:
+                    self._handle(kind, message, receivedAt)
+                else:
+                    self.jitterBuffer.add(timetag / TIMETAG_SECOND, kind, message, receivedAt, kind == ACCELEROMETER)
+        finally:
+            del bundled[:]
+
+    # let go of the bundled messages that are due, returns when the next one is or None
+    def releaseTimed(self, now):
+        if self.jitterBuffer is None:
+            return None
+        return self.jitterBuffer.release(now)
+
+    # messages from the jitter buffer are already in order, and spaced out, so each tilt is handled
+    def _releaseTimed(self, kind, message, receivedAt):
+        self.flushAccelerometer()
+        self._dispatch(kind, message, receivedAt)
+
+    def _handle(self, kind, message, receivedAt):
+        if kind == ACCELEROMETER:
+            if self.pendingAccelerometer is not None:
+                self.coalesced += 1
+            self.pendingAccelerometer = message
+            self.pendingReceivedAt = receivedAt
+        else:
+            self.flushAccelerometer()  # the touch is played with the newest tilt
+            self._dispatch(kind, message, receivedAt)
+
+    # handle the newest accelerometer packet, if one is waiting
+    def flushAccelerometer(self):
+        message = self.pendingAccelerometer
+        if message is not None:
+            self.pendingAccelerometer = None
+            self._dispatch(ACCELEROMETER, message, self.pendingReceivedAt)
+
+    def _dispatch(self, kind, message, receivedAt):
+        if self.latency is not None:
+            self.latency.record(OSC_DISPATCH, clock() - receivedAt)
+        self.handlers[kind](message)
+
+# Reads every packet waiting on a non-blocking UDP socket into one reused buffer,
+# then lets the dispatcher coalesce the accelerometer packets among them.
+# Bundled messages in a jitter buffer are let go by one timer on the loop, set for the next that is due.
+class OscListener(object):
+
+    def __init__(self, sock, dispatcher, maxPacketsPerWakeup=MAX_PACKETS_PER_WAKEUP, loop=None):
+        self.sock = sock
+        self.dispatcher = dispatcher
+        self.maxPacketsPerWakeup = maxPacketsPerWakeup
+        self.buffer = bytearray(MAX_PACKET_SIZE)
+        self.loop = loop
+        self.timer = None         # asyncio handle of the next release
+        self.timerDeadline = None
+
+    def readReady(self):
+        sock, dispatcher, buffer = self.sock, self.dispatcher, self.buffer
+        receivedAt = clock()
+        for packet in range(self.maxPacketsPerWakeup):
+            try:
+                length = sock.recv_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                break
+            dispatcher.receive(buffer, length, receivedAt)
+        dispatcher.flushAccelerometer()
+        if dispatcher.jitterBuffer is not None:
+            self.releaseDue()
+
+    # let go of the bundled messages that are due, and wake up again for the next one
+    def releaseDue(self):
+        now = clock()
+        deadline = self.dispatcher.releaseTimed(now)
+        if deadline == self.timerDeadline:
+            return
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = None if deadline is None else self.loop.call_later(deadline - now, self._timerFired)
+        self.timerDeadline = deadline
+
+    def _timerFired(self):
+        self.timer = self.timerDeadline = None
+        self.releaseDue()
+
+# start listening on the running event loop, returns (socket, dispatcher)
+# jitterBuffer is (latency, max latency, adaptive) to hold bundled messages in one, see useJitterBuffer()
+async def startOscServer(touchHandler, accelerometerHandler, port, host="0.0.0.0", latency=None, jitterBuffer=None,
+                         keyHandler=None):
+    loop = asyncio.get_running_loop()
+    dispatcher = OscDispatcher(touchHandler, accelerometerHandler, latency, keyHandler)
+    dispatcher.addPrefix("/7/push", TOUCH)
+    dispatcher.addAddress("/accxyz", ACCELEROMETER)
+    if keyHandler is not None:
+        dispatcher.addAddress("/mnc/key", KEY_CHANGE)
+    if jitterBuffer is not None:
+        dispatcher.useJitterBuffer(*jitterBuffer)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    listener = OscListener(sock, dispatcher, loop=loop)
+    loop.add_reader(sock.fileno(), listener.readReady)
+    return sock, dispatcher
+
+# stop listening and close the socket
+def stopOscServer(sock):
+    asyncio.get_running_loop().remove_reader(sock.fileno())
+    sock.close()
+
+def main(arguments=None):
+    from midiinput import RawMidiInput
+    from output import RawMidiBackend
+    from replay import loadInstrument, useBackend
+
+    parser = argparse.ArgumentParser(description="Play MNC from TouchOSC under CPython.")
+    parser.add_argument("--port", type=int, default=None, help="UDP port (default: OSC_LISTENER_PORT in mnc.py)")
+    parser.add_argument("--raw-midi", help="write MIDI to this ALSA rawmidi port, pipe or file")
+    parser.add_argument("--midi-in", help="also play from a MIDI keyboard on this ALSA rawmidi port, see midiinput.py")
+    parser.add_argument("--jitter-buffer", type=float, metavar="MS",
+                        help="play bundled messages back this long after their timetags, see jitter.py (default: off)")
+    parser.add_argument("--max-jitter-buffer", type=float, default=MAX_LATENCY * 1000, metavar="MS",
+                        help="longest the jitter buffer grows to cover the jitter it sees (default: %(default)g)")
+    parser.add_argument("--fixed-latency", action="store_true", help="keep the jitter buffer at --jitter-buffer")
+    options = parser.parse_args(arguments)
+
+    mnc = loadInstrument()
+    if options.raw_midi:
+        useBackend(mnc, RawMidiBackend(open(options.raw_midi, "wb", 0)))
+    port = options.port or mnc.OSC_LISTENER_PORT
+    if options.midi_in:
+        RawMidiInput(options.midi_in, mnc.handleMidiInput).start()
+    latency = getattr(mnc, "latencyHistograms", None)
+    jitterBuffer = None
+    if options.jitter_buffer is not None:
+        jitterBuffer = (options.jitter_buffer / 1000.0, options.max_jitter_buffer / 1000.0, not options.fixed_latency)
+
+    async def serve():
+        sock, dispatcher = await startOscServer(mnc.handleTouchInput, mnc.parseAccelerometerData, port,
+            latency=latency, jitterBuffer=jitterBuffer, keyHandler=mnc.handleKeyChange)
+        print("Listening for OSC on port %d" % port)
+        if dispatcher.jitterBuffer is not None:
+            # kill -USR2 prints the jitter buffer's statistics, to tune its latency while playing
+            try: asyncio.get_running_loop().add_signal_handler(signal.SIGUSR2, lambda: print(dispatcher.jitterBuffer.formatReport()))
+            except (AttributeError, NotImplementedError): pass # no SIGUSR2 on this platform
+        try:
+            await asyncio.Event().wait()
+        finally:
+            stopOscServer(sock)
+            print("%d packets, %d accelerometer packets coalesced, %d dropped" % (
+                dispatcher.packets, dispatcher.coalesced, dispatcher.dropped))
+            if dispatcher.jitterBuffer is not None:
+                print(dispatcher.jitterBuffer.formatReport())
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+# output.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# MIDI output stages that sit between the instrument logic and the MIDI backend.
+# A backend is anything with JythonMusic's Play.noteOn(pitch, velocity, channel)
+# and Play.noteOff(pitch, channel), so Play itself works as-is, and so does a NoteRegistry.
+#
+# The backends below also have setVolume(), getVolume(), setInstrument(), pitchBend() and flush().
+# The instrument calls flush() once per gesture, so a backend can send a whole chord change at once.
+
+# region Constants
+PLAY_BACKEND = "play"  # JythonMusic's Play
+RAW_BACKEND = "raw"    # raw MIDI bytes to a file, pipe or ALSA rawmidi port
+NULL_BACKEND = "null"  # nothing, for benchmarking
+
+NOTE_ON = 0x90
+CONTROL_CHANGE = 0xB0
+PROGRAM_CHANGE = 0xC0
+PITCH_BEND = 0xE0
+VOLUME_CONTROLLER = 7
+
+BEND_CENTER = 8192  # pitch bend value with no bend, bends below are -8192 to 8191 around it
+BEND_MAX = 8191
+GM_BEND_RANGE = 2   # semitones a full bend covers, the General MIDI default and JythonMusic's
+GLIDE_STEP = 0.005  # seconds between pitch bend steps of a glide
+# endregion
+
+# region Backends
+# JythonMusic's Play, one call per note as before
+class PlayBackend(object):
+
+    def __init__(self, play):
+        self.play = play
+
+    def noteOn(self, pitch, velocity, channel):
+        self.play.noteOn(pitch, velocity, channel)
+
+    def noteOff(self, pitch, channel):
+        self.play.noteOff(pitch, channel)
+
+    def setVolume(self, volume, channel=0):
+        self.play.setVolume(volume, channel)
+
+    def getVolume(self, channel=0):
+        return self.play.getVolume(channel)
+
+    def setInstrument(self, instrument, channel=0):
+        self.play.setInstrument(instrument, channel)
+
+    # bend is -8192 to 8191, 0 for none, as JythonMusic's setPitchBend() takes it
+    def pitchBend(self, bend, channel=0):
+        self.play.setPitchBend(bend, channel)
+
+    def flush(self):
+        pass
+
+# Encodes MIDI into a buffer with running status, and writes the whole buffer on flush(),
+# so four voices plus the bass changing together go out in one write.
+# Note offs are sent as note ons with velocity 0, so they share the running status.
+class RawMidiBackend(object):
+
+    def __init__(self, stream, runningStatus=True):
+        self.stream = stream  # anything with write(), opened unbuffered
+        self.runningStatus = runningStatus
+        self.buffer = bytearray()
+        self.status = None  # last status byte in the buffer
+        self.volumes = [127] * 16
+        self.messages = 0
+        self.writes = 0
+
+    def _send(self, status, data1, data2=None):
+        buffer = self.buffer
+        if status != self.status or not self.runningStatus:
+            buffer.append(status)
+            self.status = status
+        buffer.append(data1 & 0x7F)
+        if data2 is not None:
+            buffer.append(data2 & 0x7F)
+        self.messages += 1
+
+    def noteOn(self, pitch, velocity, channel):
+        self._send(NOTE_ON | channel, pitch, velocity)
+
+    def noteOff(self, pitch, channel):
+        self._send(NOTE_ON | channel, pitch, 0)
+
+    def setVolume(self, volume, channel=0):
+        self.volumes[channel] = volume
+        self._send(CONTROL_CHANGE | channel, VOLUME_CONTROLLER, volume)
+
+    def getVolume(self, channel=0):
+        return self.volumes[channel]
+
+    def setInstrument(self, instrument, channel=0):
+        self._send(PROGRAM_CHANGE | channel, instrument)
+
+    def pitchBend(self, bend, channel=0):
+        value = bend + BEND_CENTER
+        self._send(PITCH_BEND | channel, value & 0x7F, value >> 7)
+
+    def flush(self):
+        if self.buffer:
+            self.stream.write(self.buffer)
+            self.writes += 1
+            self.buffer = bytearray()
+        self.status = None  # each write starts with a full status byte, in case another writer shares the port
+
+    def close(self):
+        self.flush()
+        self.stream.close()
+
+# Counts what it would have sent
+class NullBackend(object):
+
+    def __init__(self):
+        self.volumes = [127] * 16
+        self.messages = 0
+        self.writes = 0
+        self.pending = 0
+
+    def noteOn(self, pitch, velocity, channel):
+        self.pending += 1
+
+    def noteOff(self, pitch, channel):
+        self.pending += 1
+
+    def setVolume(self, volume, channel=0):
+        self.volumes[channel] = volume
+        self.pending += 1
+
+    def getVolume(self, channel=0):
+        return self.volumes[channel]
+
+    def setInstrument(self, instrument, channel=0):
+        self.pending += 1
+
+    def pitchBend(self, bend, channel=0):
+        self.pending += 1
+
+    def flush(self):
+        if self.pending:
+            self.messages += self.pending
+            self.writes += 1
+            self.pending = 0
+
+# the backend for an OUTPUT_BACKEND setting
+def openOutputBackend(kind, play=None, path=None):
+    if kind == PLAY_BACKEND:
+        return PlayBackend(play)
+    elif kind == RAW_BACKEND:
+        return RawMidiBackend(open(path, "wb", 0))
+    elif kind == NULL_BACKEND:
+        return NullBackend()
+    raise ValueError("unknown output backend: " + str(kind))
+# endregion
+
+# region Output Stages
+
+# Counts the notes sounding on each (channel, pitch), in front of a backend.
+# A noteOff is one exact call, sent when the last noteOn of that pitch is released,
+# and allNotesOff() only touches the notes that are actually on.
+class NoteRegistry(object):
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.counts = {}  # (channel, pitch) --> how many times the note is being held
+
+    def noteOn(self, pitch, velocity, channel):
+        key = (channel, pitch)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.backend.noteOn(pitch, velocity, channel)
+
+    # returns False if the note was not sounding, in which case nothing is sent
+    def noteOff(self, pitch, channel):
+        key = (channel, pitch)
+        count = self.counts.get(key, 0)
+        if count == 0:
+            return False
+        if count == 1:
+            del self.counts[key]
+            self.backend.noteOff(pitch, channel)
+        else:
+            self.counts[key] = count - 1
+        return True
+
+    # bends are per channel and not counted, so they go straight through
+    def pitchBend(self, bend, channel):
+        self.backend.pitchBend(bend, channel)
+
+    def isSounding(self, pitch, channel):
+        return (channel, pitch) in self.counts
+
+    # pitches sounding on a channel, lowest first
+    def soundingNotes(self, channel):
+        return sorted([pitch for (noteChannel, pitch) in self.counts if noteChannel == channel])
+
+    # stop every sounding note, or only the ones on a channel
+    def allNotesOff(self, channel=None):
+        for key in list(self.counts):
+            noteChannel, pitch = key
+            if channel is None or noteChannel == channel:
+                del self.counts[key]
+                self.backend.noteOff(pitch, noteChannel)
+
+# Keeps the set of notes held on one channel and only sends what changes between chords.
+# Under contrary and oblique motion most voices are common tones, so most chord changes
+# are one noteOff and one noteOn instead of silencing and re-striking all four voices.
+class ChannelVoices(object):
+
+    def __init__(self, backend, channel, velocity=127, restrikeCommonTones=False):
+        self.backend = backend
+        self.channel = channel
+        self.velocity = velocity
+        self.restrikeCommonTones = restrikeCommonTones  # re-attack notes shared with the last chord?
+        self.voiceRelease = None  # called with (pitch, channel) instead of noteOff for voices leaving, to let them ring on
+        self.held = []  # pitches currently held, in the order they were played
+
+    # move from the held notes to the notes of this chord
+    def play(self, chord):
+        backend, channel = self.backend, self.channel
+        held = self.held
+        restrike = self.restrikeCommonTones
+        noteOff = self.voiceRelease or backend.noteOff
+
+        # voices leaving the chord (and common tones, if re-striking) stop first...
+        for pitch in held:
+            if restrike or pitch not in chord:
+                noteOff(pitch, channel)
+
+        # ...then voices entering the chord start, from the bottom up
+        for pitch in chord:
+            if restrike or pitch not in held:
+                backend.noteOn(pitch, self.velocity, channel)
+
+        self.held = list(chord)
+
+    # stop every held note
+    def release(self):
+        self.play([])
+
+    # forget the held notes without sending anything, after the channel was silenced some other way
+    def reset(self):
+        self.held = []
+
+# One voice of MpeVoices, on a channel of its own
+class MpeVoice(object):
+    __slots__ = ("channel", "note", "pitch", "bend", "sounding", "target", "freedAt",
+                 "fromBend", "toBend", "glideStart", "gliding")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.note = 0           # pitch the note was struck at
+        self.pitch = 0          # pitch it sounds at, or is gliding to
+        self.bend = None        # pitch bend last sent on the channel, None until the first, so it is centred then
+        self.sounding = False
+        self.target = None      # pitch of the next chord this voice moves to, None if it leaves
+        self.freedAt = 0        # chords played when the voice was last freed
+        self.fromBend = 0       # a glide goes from this bend...
+        self.toBend = 0         # ...to this one
+        self.glideStart = None  # when the glide's first step ran
+        self.gliding = False
+
+def voicePitch(voice):
+    return voice.pitch
+
+# Plays each voice of a chord on a channel of its own, as MPE does, so every voice can bend on its own.
+# Voices are matched across chords the way voiceMovement() pairs them: common tones hold, and a voice moving
+# no further than glideLimit from where it was struck glides there with pitch bend instead of being struck again.
+# The voices are made once, one per channel, so playing a chord never makes any.
+class MpeVoices(object):
+
+    def __init__(self, backend, channels, velocity=127, restrikeCommonTones=False,
+                 bendRange=GM_BEND_RANGE, glideLimit=GM_BEND_RANGE, glideTime=0.0):
+        self.backend = backend
+        self.velocity = velocity
+        self.restrikeCommonTones = restrikeCommonTones
+        self.bendRange = bendRange  # semitones a full bend covers, as the synth is set up
+        self.glideLimit = min(glideLimit, bendRange)  # semitones, further moves are struck again
+        self.glideTime = glideTime  # seconds a glide takes, 0 to bend straight to the new pitch
+        self.voiceRelease = None    # as ChannelVoices.voiceRelease
+        self.startGlides = None     # called to have stepGlides() run, returns False if it cannot be, see VoiceGlides
+        self.stepping = False       # stepGlides() is running
+        self.voices = [MpeVoice(channel) for channel in channels]
+        self.held = []   # sounding voices, lowest first
+        self.chords = 0  # chords played, a free voice is taken in the order it was freed
+
+        # semitones + glideLimit --> pitch bend
+        self.bends = []
+        for semitones in range(-self.glideLimit, self.glideLimit + 1):
+            bend = int(round(semitones * BEND_CENTER / float(bendRange)))
+            self.bends.append(max(-BEND_CENTER, min(bend, BEND_MAX)))
+
+    # move from the held voices to the pitches of this chord, lowest first
+    def play(self, chord):
+        backend = self.backend
+        held = self.held
+        noteOff = self.voiceRelease or backend.noteOff
+        self.chords += 1
+
+        # common tones hold...
+        leaving = 0
+        for voice in held:
+            voice.target = voice.pitch if voice.pitch in chord else None
+            if voice.target is None:
+                leaving += 1
+        entering = 0
+        for pitch in chord:
+            if self._heldAt(pitch) is None:
+                entering += 1
+
+        # ...and the other voices pair up in order when as many leave as enter, otherwise each new pitch takes the nearest
+        if leaving == entering:
+            index = 0
+            for pitch in chord:
+                if self._heldAt(pitch) is None:
+                    while held[index].target is not None:
+                        index += 1
+                    held[index].target = pitch
+                    index += 1
+        elif leaving:
+            for pitch in chord:
+                if self._heldAt(pitch) is None:
+                    nearest = None
+                    for voice in held:
+                        if voice.target is None and (nearest is None or abs(voice.pitch - pitch) < abs(nearest.pitch - pitch)):
+                            nearest = voice
+                    if nearest is not None:
+                        nearest.target = pitch
+
+        # voices without a pitch stop first...
+        for voice in held:
+            if voice.target is None:
+                noteOff(voice.note, voice.channel)
+                voice.sounding = False
+                voice.gliding = False
+                voice.freedAt = self.chords
+
+        # ...then paired voices move, gliding if they can...
+        for voice in held:
+            target = voice.target
+            if target is None:
+                continue
+            if target == voice.pitch:
+                if self.restrikeCommonTones:
+                    self._strike(voice, target)
+            elif abs(target - voice.note) <= self.glideLimit:
+                self._glide(voice, target)
+            else:
+                self._strike(voice, target)
+
+        # ...and new voices start, from the bottom up. Past the size of the pool, pitches are left out
+        for pitch in chord:
+            if not self._targeted(pitch):
+                voice = self._freeVoice()
+                if voice is not None:
+                    self._strike(voice, pitch)
+
+        del held[:]
+        for voice in self.voices:
+            if voice.sounding:
+                held.append(voice)
+        held.sort(key=voicePitch)
+
+    def _heldAt(self, pitch):
+        for voice in self.held:
+            if voice.pitch == pitch:
+                return voice
+        return None
+
+    def _targeted(self, pitch):
+        for voice in self.held:
+            if voice.target == pitch:
+                return True
+        return False
+
+    # the voice that has been free the longest, so a voice that is ringing on is taken last
+    def _freeVoice(self):
+        free = None
+        for voice in self.voices:
+            if not voice.sounding and (free is None or voice.freedAt < free.freedAt):
+                free = voice
+        return free
+
+    def _strike(self, voice, pitch):
+        backend, channel = self.backend, voice.channel
+        if voice.sounding:
+            backend.noteOff(voice.note, channel)
+        if voice.bend != 0:
+            backend.pitchBend(0, channel)
+            voice.bend = 0
+        backend.noteOn(pitch, self.velocity, channel)
+        voice.note = voice.pitch = pitch
+        voice.sounding = True
+        voice.gliding = False
+
+    def _glide(self, voice, pitch):
+        bend = self.bends[pitch - voice.note + self.glideLimit]
+        voice.pitch = pitch
+        if self.glideTime > 0 and self.startGlides is not None and (self.stepping or self.startGlides()):
+            self.stepping = True
+            voice.fromBend = voice.bend
+            voice.toBend = bend
+            voice.glideStart = None
+            voice.gliding = True
+        else:
+            voice.gliding = False
+            voice.bend = bend
+            self.backend.pitchBend(bend, voice.channel)
+
+    # bend every gliding voice to where it should be by now, returns when to step next or None when done
+    def stepGlides(self, now):
+        gliding = False
+        for voice in self.held:
+            if not voice.gliding:
+                continue
+            if voice.glideStart is None:
+                voice.glideStart = now
+            fraction = (now - voice.glideStart) / self.glideTime
+            if fraction >= 1.0:
+                bend = voice.toBend
+                voice.gliding = False
+            else:
+                bend = voice.fromBend + int((voice.toBend - voice.fromBend) * fraction)
+                gliding = True
+            if bend != voice.bend:
+                voice.bend = bend
+                self.backend.pitchBend(bend, voice.channel)
+        if not gliding:
+            self.stepping = False
+            return None
+        return now + GLIDE_STEP
+
+    # stop every held voice
+    def release(self):
+        self.play([])
+
+    # forget the held voices without sending anything, after the channels were silenced some other way
+    # bends stay as they are on the channels, and are undone when a voice is next struck
+    def reset(self):
+        for voice in self.held:
+            voice.sounding = False
+            voice.gliding = False
+            voice.freedAt = self.chords
+        del self.held[:]
+# endregion
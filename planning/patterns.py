@@ -0,0 +1,178 @@
+# patterns.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Chords played a note at a time instead of as a block: strums and arpeggios.
+# Both run on the envelope scheduler, and every note is due at a time worked out from when the pattern started,
+# never from when the last note happened to go out, so a late wakeup is caught up on and a long set never drifts.
+# A new chord mid-pattern does not start the pattern over: the notes still to come are simply taken from the new chord.
+
+import math
+
+# region Constants
+BLOCK = 0     # the whole chord at once, as before
+STRUM = 1     # the new notes of each chord one after another, see Strum
+ARPEGGIO = 2  # one note at a time, in time, while a button is held, see Arpeggio
+
+LOWEST_FIRST = 0   # strum up, or arpeggiate from the bottom of the chord
+HIGHEST_FIRST = 1  # strum down, or arpeggiate from the top
+UP_AND_DOWN = 2    # arpeggiate up then back down, without repeating the top and bottom notes
+# endregion
+
+# Strikes the notes entering each chord one after another, spread evenly over spread seconds.
+# Voices leaving the chord stop straight away and common tones hold, as they do for a block chord.
+class Strum(object):
+    __slots__ = ("voices", "envelopes", "noteRegistry", "spread", "order", "sounding", "pending",
+                 "startTime", "gap", "step", "running", "cancelled")
+
+    def __init__(self, voices, envelopes, noteRegistry, spread, order=LOWEST_FIRST):
+        self.voices = voices              # ChannelVoices or MpeVoices, see output.py
+        self.envelopes = envelopes        # EnvelopeScheduler
+        self.noteRegistry = noteRegistry  # its backend is flushed after each note, whichever backend it has by then
+        self.spread = spread        # seconds from the first note of a strum to the last
+        self.order = order          # LOWEST_FIRST or HIGHEST_FIRST
+        self.sounding = []  # notes struck so far
+        self.pending = []   # notes still to strike, in the order they will be
+        self.startTime = 0.0
+        self.gap = 0.0      # seconds between notes
+        self.step = 0       # next note is due at startTime + step * gap
+        self.running = False
+        self.cancelled = False
+
+    # strum into a chord, taking over the notes still to come if a strum is already going
+    def play(self, chord):
+        restrike = self.voices.restrikeCommonTones
+        sounding = [] if restrike else [pitch for pitch in self.sounding if pitch in chord]
+        pending = [pitch for pitch in chord if pitch not in sounding]
+        if self.order == HIGHEST_FIRST:
+            pending.reverse()
+
+        if pending:
+            sounding.append(pending.pop(0))  # the first note sounds with the gesture
+        self.sounding = sounding
+        self.pending = pending
+        self._play()
+        if not pending:
+            return
+
+        self.startTime = self.envelopes.clock()
+        self.gap = self.spread / len(pending)
+        self.step = 1
+        if not self.running:
+            self.running = True
+            self.cancelled = False  # left cancelled when the last strum finished
+            self.envelopes.start(self)
+        # otherwise the strum already waiting on the scheduler picks up the new notes at its next deadline
+
+    # common tones only sound once per strum, however the voices re-strike them
+    def _play(self):
+        voices = self.voices
+        restrike = voices.restrikeCommonTones
+        voices.restrikeCommonTones = False
+        voices.play(sorted(self.sounding))
+        voices.restrikeCommonTones = restrike
+
+    def begin(self, now):
+        return self.startTime + self.step * self.gap
+
+    def advance(self, now):
+        pending = self.pending
+        while pending and self.startTime + self.step * self.gap <= now:
+            self.sounding.append(pending.pop(0))
+            self.step += 1
+        self._play()
+        self.noteRegistry.backend.flush()
+        if pending:
+            return self.startTime + self.step * self.gap
+        self.running = False
+        return None
+
+    # a strum plays out after the button is released, as a strummed string rings on
+    def release(self):
+        pass
+
+    # forget the strum without sending anything, after the channels were silenced
+    def stop(self):
+        self.sounding = []
+        self.pending = []
+
+# Plays the chord one note at a time, a subdivision of a beat apart, for as long as a button is held.
+# Steps fall on one grid from the first note ever played, so gestures stay in time with each other.
+# A new chord carries on from the same place in the pattern, with its own notes.
+class Arpeggio(object):
+    __slots__ = ("voices", "envelopes", "noteRegistry", "interval", "order", "chord", "origin", "step", "note",
+                 "active", "running", "cancelled")
+
+    def __init__(self, voices, envelopes, noteRegistry, tempo, subdivision, order=LOWEST_FIRST):
+        self.voices = voices
+        self.envelopes = envelopes
+        self.noteRegistry = noteRegistry
+        self.interval = 60.0 / tempo / subdivision  # seconds between notes
+        self.order = order    # LOWEST_FIRST, HIGHEST_FIRST or UP_AND_DOWN
+        self.chord = []
+        self.origin = None    # when the first step ever played, step n is due at origin + n * interval
+        self.step = 0         # next step on the grid
+        self.note = 0         # notes played since the gesture began, the place in the pattern
+        self.active = False   # a button is held
+        self.running = False  # waiting on the scheduler
+        self.cancelled = False
+
+    # arpeggiate a chord, from the next step of the pattern if one is already going
+    def play(self, chord):
+        self.chord = chord
+        if self.active:
+            return  # the arpeggio already waiting on the scheduler takes its next note from the new chord
+
+        now = self.envelopes.clock()
+        if self.origin is None:
+            self.origin = now
+        self.active = True
+        self.note = 0
+        self._strike()  # the first note sounds with the gesture, the rest fall on the grid
+        # the next step at least half a step away, so the first two notes are never heard together
+        self.step = int(math.ceil((now - self.origin) / self.interval + 0.5))
+        if not self.running:
+            self.running = True
+            self.cancelled = False  # left cancelled when the last arpeggio finished
+            self.envelopes.start(self)
+
+    def _strike(self):
+        chord = self.chord
+        if not chord:
+            return
+        size, note = len(chord), self.note
+        if self.order == HIGHEST_FIRST:
+            index = size - 1 - note % size
+        elif self.order == UP_AND_DOWN and size > 1:
+            index = note % (2 * size - 2)
+            if index >= size:
+                index = 2 * size - 2 - index
+        else:
+            index = note % size
+        self.voices.play([chord[index]])
+        self.note += 1
+
+    def begin(self, now):
+        return self.origin + self.step * self.interval
+
+    def advance(self, now):
+        if not self.active:
+            self.running = False
+            return None
+        due = self.origin + self.step * self.interval
+        if now < due:
+            return due  # a gesture began again before this wakeup, and moved the next step later
+        # running late, skip the steps that were missed so the pattern stays on the grid
+        self.step = max(self.step, int((now - self.origin) / self.interval))
+        self._strike()
+        self.noteRegistry.backend.flush()
+        self.step += 1
+        return self.origin + self.step * self.interval
+
+    # the arpeggio stops with the last button, and its last note rings on as a chord would
+    def release(self):
+        self.active = False
+
+    # stop without sending anything, after the channels were silenced
+    def stop(self):
+        self.active = False
+        self.chord = []
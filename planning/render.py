@@ -0,0 +1,174 @@
+# render.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Renders recorded sessions to Standard MIDI Files, faster than real time.
+# Each session runs through the same handlers as a live performance, and MIDI events are written
+# to the file as they are produced, so memory stays flat however long the session is.
+# A directory of sessions is rendered in parallel, one fresh instrument per worker process.
+#
+#   python render.py rehearsal.mncs [-o rehearsal.mid]
+#   python render.py rehearsals/ [--jobs 4]
+
+import argparse
+import multiprocessing
+import os
+import struct
+
+from output import BEND_CENTER
+from replay import loadInstrument, useBackend
+from session import readSession
+
+# region Constants
+TICKS_PER_QUARTER_NOTE = 480
+MICROSECONDS_PER_QUARTER_NOTE = 500000  # 120 bpm, so a tick is a fixed slice of real time
+TICKS_PER_SECOND = TICKS_PER_QUARTER_NOTE * 1000000.0 / MICROSECONDS_PER_QUARTER_NOTE
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+CONTROL_CHANGE = 0xB0
+PROGRAM_CHANGE = 0xC0
+PITCH_BEND = 0xE0
+VOLUME_CONTROLLER = 7
+SESSION_EXTENSION = ".mncs"
+# endregion
+
+# variable-length quantity, as used for delta times
+def encodeVariableLength(value):
+    encoded = bytearray([value & 0x7F])
+    value >>= 7
+    while value:
+        encoded.insert(0, (value & 0x7F) | 0x80)
+        value >>= 7
+    return encoded
+
+# An output backend (see output.py) that writes a format 0 Standard MIDI File as events arrive.
+# The renderer sets time, in seconds, before each message is handled.
+class MidiFileBackend(object):
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.file.write(b"MThd" + struct.pack(">IHHH", 6, 0, 1, TICKS_PER_QUARTER_NOTE))
+        self.file.write(b"MTrk")
+        self.lengthPosition = self.file.tell()
+        self.file.write(struct.pack(">I", 0))  # filled in by close()
+        self.trackLength = 0
+        self.lastTick = 0
+        self.time = 0.0
+        self.volumes = [127] * 16
+        self._write(bytearray([0xFF, 0x51, 0x03]) + struct.pack(">I", MICROSECONDS_PER_QUARTER_NOTE)[1:])
+
+    def _write(self, event):
+        tick = max(int(round(self.time * TICKS_PER_SECOND)), self.lastTick)
+        data = encodeVariableLength(tick - self.lastTick) + event
+        self.file.write(data)
+        self.trackLength += len(data)
+        self.lastTick = tick
+
+    def noteOn(self, pitch, velocity, channel):
+        self._write(bytearray([NOTE_ON | channel, pitch & 0x7F, velocity & 0x7F]))
+
+    def noteOff(self, pitch, channel):
+        self._write(bytearray([NOTE_OFF | channel, pitch & 0x7F, 0]))
+
+    def setVolume(self, volume, channel=0):
+        self.volumes[channel] = volume
+        self._write(bytearray([CONTROL_CHANGE | channel, VOLUME_CONTROLLER, volume & 0x7F]))
+
+    def getVolume(self, channel=0):
+        return self.volumes[channel]
+
+    def setInstrument(self, instrument, channel=0):
+        self._write(bytearray([PROGRAM_CHANGE | channel, instrument & 0x7F]))
+
+    # bend is -8192 to 8191, 0 for none, see MpeVoices in output.py
+    def pitchBend(self, bend, channel=0):
+        value = bend + BEND_CENTER
+        self._write(bytearray([PITCH_BEND | channel, value & 0x7F, (value >> 7) & 0x7F]))
+
+    def flush(self):
+        pass
+
+    # end the track and fill in its length
+    def close(self):
+        self._write(bytearray([0xFF, 0x2F, 0x00]))
+        self.file.seek(self.lengthPosition)
+        self.file.write(struct.pack(">I", self.trackLength))
+        self.file.close()
+
+# run the envelope steps due by until (or all of them), each at its own time in the file
+def advanceEnvelopes(envelopes, backend, until=None):
+    deadline = envelopes.advance(backend.time)
+    while deadline is not None and (until is None or deadline <= until):
+        backend.time = deadline
+        deadline = envelopes.advance(deadline)
+    if until is not None:
+        backend.time = until
+
+# render one session log to a MIDI file, returns (session path, MIDI path, messages handled)
+def renderSession(sessionPath, midiPath):
+    mnc = loadInstrument()
+    backend = MidiFileBackend(midiPath)
+    useBackend(mnc, backend)  # the instrument set up its channels on its own backend when it was loaded
+    mnc.performer.clock = lambda: backend.time
+    mnc.envelopes.threaded = False  # decay steps are run between messages instead, at their own times
+    mnc.envelopes.clock = lambda: backend.time
+
+    handled = 0
+    try:
+        for message in readSession(sessionPath):
+            if message.address == "/accxyz":
+                handler = mnc.parseAccelerometerData
+            elif message.address.startswith("/7/push"):
+                handler = mnc.handleTouchInput
+            else:
+                continue
+            advanceEnvelopes(mnc.envelopes, backend, message.timestamp)
+            try:
+                handler(message)
+            except SystemExit:
+                pass  # a tap before the accelerometer was turned on, the live instrument would have quit
+            handled += 1
+        advanceEnvelopes(mnc.envelopes, backend)  # let any decay finish
+        mnc.noteRegistry.allNotesOff()  # let go of anything still sounding at the end
+    finally:
+        backend.close()
+    return sessionPath, midiPath, handled
+
+def _renderJob(paths):
+    return renderSession(*paths)
+
+# render every session log in a directory on a pool of worker processes
+def renderDirectory(directory, jobs=None):
+    paths = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(SESSION_EXTENSION):
+            sessionPath = os.path.join(directory, name)
+            paths.append((sessionPath, os.path.splitext(sessionPath)[0] + ".mid"))
+
+    # the instrument keeps its state in module globals, so each worker renders one session and exits
+    pool = multiprocessing.Pool(processes=jobs, maxtasksperchild=1)
+    try:
+        for result in pool.imap_unordered(_renderJob, paths):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Render MNC session logs to Standard MIDI Files.")
+    parser.add_argument("session", help="a session log, or a directory of them")
+    parser.add_argument("-o", "--output", help="MIDI file to write, for a single session")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes for a directory (default: one per CPU)")
+    options = parser.parse_args(arguments)
+
+    if os.path.isdir(options.session):
+        results = renderDirectory(options.session, options.jobs)
+    else:
+        midiPath = options.output or os.path.splitext(options.session)[0] + ".mid"
+        results = [renderSession(options.session, midiPath)]
+
+    for sessionPath, midiPath, handled in results:
+        print("%s -> %s (%d messages)" % (sessionPath, midiPath, handled))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# replay.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Replays a session log recorded by mnc.py through handleTouchInput() and parseAccelerometerData(),
+# as fast as possible, against a stand-in for JythonMusic, and reports throughput and handler latency.
+# Runs under plain CPython, so the real hot path can be benchmarked without a phone or a MIDI device.
+#
+#   python replay.py rehearsal.mncs [--repeat 10] [--json results.json]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import types
+
+MNC_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# region JythonMusic Stand-ins
+# Counts MIDI calls instead of making sound
+class StubPlay(object):
+    messages = 0
+    volumes = {}
+    instruments = {}  # channel --> program, for getInstrument()
+
+    @staticmethod
+    def noteOn(pitch, velocity=100, channel=0):
+        StubPlay.messages += 1
+
+    @staticmethod
+    def noteOff(pitch, channel=0):
+        StubPlay.messages += 1
+
+    @staticmethod
+    def allNotesOff():
+        StubPlay.messages += 1
+
+    @staticmethod
+    def setVolume(volume, channel=0):
+        StubPlay.messages += 1
+        StubPlay.volumes[channel] = volume
+
+    @staticmethod
+    def getVolume(channel=0):
+        return StubPlay.volumes.get(channel, 127)
+
+    @staticmethod
+    def setInstrument(instrument, channel=0):
+        StubPlay.instruments[channel] = instrument
+
+    @staticmethod
+    def getInstrument(channel=0):
+        return StubPlay.instruments.get(channel, 0)
+
+    @staticmethod
+    def setPitchBend(bend=0, channel=0):
+        StubPlay.messages += 1
+
+class StubOscIn(object):
+    def __init__(self, port):
+        self.port = port
+
+    def hideMessages(self):
+        pass
+
+    def onInput(self, address, handler):
+        pass
+
+class StubTimer(object):
+    def __init__(self, delay, function, arguments=[], repeat=False):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+# JythonMusic's mapValue(), for scripts that still use it
+def mapValue(value, minValue, maxValue, minResultValue, maxResultValue):
+    normal = (float(value) - minValue) / (maxValue - minValue)
+    return type(minResultValue)(normal * (maxResultValue - minResultValue) + minResultValue)
+
+# put the stand-ins where mnc.py's "from music import *" etc. will find them
+def installStandIns():
+    modules = {
+        "midi": {},
+        "music": {"Play": StubPlay, "mapValue": mapValue, "MAJOR_SCALE": [0, 2, 4, 5, 7, 9, 11],
+                  "NYLON_GUITAR": 24, "SAWTOOTH": 81},
+        "osc": {"OscIn": StubOscIn},
+        "timer": {"Timer": StubTimer},
+    }
+    for name, contents in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(contents)
+        sys.modules[name] = module
+# endregion
+
+# import mnc.py with the stand-ins in place, quietly
+def loadInstrument():
+    installStandIns()
+    if MNC_DIRECTORY not in sys.path:
+        sys.path.insert(0, MNC_DIRECTORY)
+    previousDirectory = os.getcwd()
+    os.chdir(MNC_DIRECTORY)  # the voicing table lives next to mnc.py
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import mnc
+    finally:
+        os.chdir(previousDirectory)
+    return mnc
+
+# play mnc.py through backend from now on, with the programs and volumes the instrument set up as it loaded
+def useBackend(mnc, backend):
+    previous = mnc.outputBackend
+    mnc.outputBackend = backend
+    mnc.noteRegistry.backend = backend
+    channels = set(StubPlay.instruments) | set([mnc.CHORD_CHANNEL, mnc.BASS_CHANNEL]) | set(mnc.MPE_CHANNELS or [])
+    for channel in sorted(channels):
+        if channel in StubPlay.instruments:
+            backend.setInstrument(StubPlay.instruments[channel], channel)
+        backend.setVolume(previous.getVolume(channel), channel)
+    backend.flush()
+
+# the value at a fraction of the way through a sorted list
+def percentile(sortedValues, fraction):
+    if not sortedValues:
+        return 0.0
+    return sortedValues[min(int(fraction * len(sortedValues)), len(sortedValues) - 1)]
+
+# feed every message to its handler, returns throughput and latency numbers
+def replay(mnc, messages, repeat=1):
+    handlers = {"/accxyz": mnc.parseAccelerometerData}
+    latencies = {"touch": [], "accelerometer": []}
+    clock = time.perf_counter
+    StubPlay.messages = 0
+
+    # the instrument sees each message arrive at its recorded time, not at replay speed,
+    # and each repeat carries on from the end of the one before
+    recordedTime = [0.0]
+    mnc.performer.clock = lambda: recordedTime[0]
+    sessionLength = messages[-1].timestamp if messages else 0.0
+
+    start = clock()
+    for iteration in range(repeat):
+        for message in messages:
+            if message.address in handlers:
+                handler, kind = handlers[message.address], "accelerometer"
+            else:
+                handler, kind = mnc.handleTouchInput, "touch"
+            recordedTime[0] = iteration * sessionLength + message.timestamp
+            before = clock()
+            handler(message)
+            latencies[kind].append(clock() - before)
+    elapsed = clock() - start
+
+    events = sum(len(values) for values in latencies.values())
+    results = {
+        "events": events,
+        "seconds": elapsed,
+        "eventsPerSecond": events / elapsed if elapsed > 0 else 0.0,
+        "midiMessages": StubPlay.messages,
+    }
+    for kind, values in latencies.items():
+        values.sort()
+        results[kind] = {
+            "events": len(values),
+            "p50Microseconds": percentile(values, 0.50) * 1e6,
+            "p99Microseconds": percentile(values, 0.99) * 1e6,
+        }
+    return results
+
+# only /7/push* and /accxyz messages reach the instrument
+def loadMessages(path):
+    from session import readSession
+    return [message for message in readSession(path)
+            if message.address == "/accxyz" or message.address.startswith("/7/push")]
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Replay an MNC session log at full speed.")
+    parser.add_argument("session", help="session log recorded by mnc.py")
+    parser.add_argument("--repeat", type=int, default=1, help="play the log this many times")
+    parser.add_argument("--json", help="also write the results to this file")
+    options = parser.parse_args(arguments)
+
+    mnc = loadInstrument()
+    results = replay(mnc, loadMessages(options.session), options.repeat)
+
+    print("%d events in %.3fs, %.0f events/sec, %d MIDI messages" % (
+        results["events"], results["seconds"], results["eventsPerSecond"], results["midiMessages"]))
+    for kind in ("touch", "accelerometer"):
+        print("%-14s %8d events   p50 %8.1f us   p99 %8.1f us" % (kind, results[kind]["events"],
+            results[kind]["p50Microseconds"], results[kind]["p99Microseconds"]))
+
+    if options.json:
+        with open(options.json, "w") as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+    return results
+
+if __name__ == "__main__":
+    main()
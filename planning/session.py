@@ -0,0 +1,103 @@
+# session.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Recording OSC input to a compact binary session log, and reading it back.
+# A log is a short header followed by one record per message:
+# seconds since the recording started, the address, and the float arguments.
+
+import struct
+import threading
+import time
+
+# region Constants
+SESSION_MAGIC = b"MNCS"
+SESSION_VERSION = 1
+SESSION_HEADER = struct.Struct("<4sHd")  # magic, version, wall clock time the recording started
+RECORD_HEADER = struct.Struct("<dBB")    # seconds since start, address length, argument count
+# endregion
+
+# Stands in for a JythonMusic OSC message, so recorded messages can go straight to the handlers
+class SessionMessage(object):
+    __slots__ = ("timestamp", "address", "arguments")
+
+    def __init__(self, timestamp, address, arguments):
+        self.timestamp = timestamp
+        self.address = address
+        self.arguments = arguments
+
+    def getAddress(self):
+        return self.address
+
+    def getArguments(self):
+        return self.arguments
+
+class SessionRecorder(object):
+
+    def __init__(self, path):
+        self.path = path
+        self.start = time.time()
+        self.lock = threading.Lock()  # OSC handlers can run on more than one thread
+        self.file = open(path, "wb")
+        self.file.write(SESSION_HEADER.pack(SESSION_MAGIC, SESSION_VERSION, self.start))
+
+    def record(self, address, arguments, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        address = address.encode("utf-8")
+        record = RECORD_HEADER.pack(timestamp - self.start, len(address), len(arguments)) + address +\
+            struct.pack("<%df" % len(arguments), *arguments)
+        self.lock.acquire()
+        try:
+            if self.file is not None:
+                self.file.write(record)
+        finally:
+            self.lock.release()
+
+    # an OSC handler that records each message before passing it on
+    def wrap(self, handler):
+        def recordAndHandle(message):
+            self.record(message.getAddress(), message.getArguments())
+            return handler(message)
+        return recordAndHandle
+
+    def close(self):
+        self.lock.acquire()
+        try:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        finally:
+            self.lock.release()
+
+# the wall clock time a session log started
+def readSessionStart(path):
+    handle = open(path, "rb")
+    try:
+        return _readHeader(handle)
+    finally:
+        handle.close()
+
+# yield each recorded message as a SessionMessage, in the order they arrived
+def readSession(path):
+    handle = open(path, "rb")
+    try:
+        _readHeader(handle)
+        while True:
+            header = handle.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return  # end of the log, or a record cut off when the recording stopped
+            timestamp, addressLength, argumentCount = RECORD_HEADER.unpack(header)
+            body = handle.read(addressLength + 4 * argumentCount)
+            if len(body) < addressLength + 4 * argumentCount:
+                return
+            address = body[:addressLength].decode("utf-8")
+            arguments = list(struct.unpack("<%df" % argumentCount, body[addressLength:]))
+            yield SessionMessage(timestamp, address, arguments)
+    finally:
+        handle.close()
+
+def _readHeader(handle):
+    magic, version, start = SESSION_HEADER.unpack(handle.read(SESSION_HEADER.size))
+    if magic != SESSION_MAGIC or version != SESSION_VERSION:
+        raise ValueError("not a session log: " + str(handle.name))
+    return start
@@ -0,0 +1,93 @@
+# startup.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Measures how long each layer of the instrument takes to import, each in a fresh interpreter,
+# from the theory core up to all of mnc.py with replay.py's stand-ins for JythonMusic.
+# With --history, every run is added to a file and compared with the run before it, so startup can be tracked over time.
+# (Under JythonMusic, mnc.py prints its own startup time when it is ready.)
+#
+#   python startup.py [--runs 5] [--history startup.jsonl]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+MNC_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# region Constants
+# stage --> code it times, each layer includes the ones before it
+STAGES = [
+    ("theory", "import theory"),
+    ("instrument", "import instrument"),
+    ("voicingTable", "import voicingtable; voicingtable.getVoicingTable('voicingtable.bin')"),
+    ("mnc", "import replay; replay.loadInstrument()"),
+]
+TIMER = "import time; start = time.perf_counter(); %s; print(time.perf_counter() - start)"
+# endregion
+
+# seconds the code takes in a fresh interpreter, and seconds for the whole process including interpreter startup
+def timeStage(code):
+    start = time.perf_counter()
+    output = subprocess.check_output([sys.executable, "-c", TIMER % code], cwd=MNC_DIRECTORY)
+    process = time.perf_counter() - start
+    return float(output.decode().strip().splitlines()[-1]), process
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+# {stage: {"importMs": ..., "processMs": ...}}, the median of runs
+def measureStartup(runs=5):
+    timeStage("import voicingtable; voicingtable.getVoicingTable('voicingtable.bin')")  # build the table if needed
+    results = {}
+    for stage, code in STAGES:
+        timings = [timeStage(code) for run in range(runs)]
+        results[stage] = {
+            "importMs": median([importTime for importTime, processTime in timings]) * 1000,
+            "processMs": median([processTime for importTime, processTime in timings]) * 1000,
+        }
+    return results
+
+# the last run saved in a history file, or None
+def lastRun(path):
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path) as history:
+        for line in history:
+            if line.strip():
+                last = json.loads(line)
+    return last
+
+def formatResults(results, previous=None):
+    lines = ["%-14s %10s %10s %10s" % ("stage", "import ms", "process ms", "change")]
+    for stage, code in STAGES:
+        entry = results[stage]
+        change = ""
+        if previous and stage in previous["stages"]:
+            before = previous["stages"][stage]["importMs"]
+            if before > 0:
+                change = "%+.0f%%" % ((entry["importMs"] - before) / before * 100)
+        lines.append("%-14s %10.1f %10.1f %10s" % (stage, entry["importMs"], entry["processMs"], change))
+    return "\n".join(lines)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Measure how long the instrument takes to start.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per stage (default: 5)")
+    parser.add_argument("--history", help="add this run to a history file and compare with the last one")
+    options = parser.parse_args(arguments)
+
+    results = measureStartup(options.runs)
+    previous = lastRun(options.history) if options.history else None
+    print(formatResults(results, previous))
+
+    if options.history:
+        record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0], "stages": results}
+        with open(options.history, "a") as history:
+            history.write(json.dumps(record, sort_keys=True) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# conftest.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Shared setup for the tests, which run under plain CPython without JythonMusic.
+#
+#   cd planning && python -m pytest -q
+
+import os
+import sys
+
+import pytest
+
+PLANNING_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PLANNING_DIRECTORY not in sys.path:
+    sys.path.insert(0, PLANNING_DIRECTORY)
+
+from voicingtable import buildVoicingTable, loadVoicingTable
+
+# An OSC message as the handlers see it
+class Message(object):
+
+    def __init__(self, address, arguments):
+        self.address = address
+        self.arguments = arguments
+
+    def getAddress(self):
+        return self.address
+
+    def getArguments(self):
+        return self.arguments
+
+# Keeps every message it is sent, as ("on", pitch, channel), ("off", pitch, channel) or ("bend", bend, channel)
+class RecordingBackend(object):
+
+    def __init__(self):
+        self.sent = []
+
+    def noteOn(self, pitch, velocity, channel):
+        self.sent.append(("on", pitch, channel))
+
+    def noteOff(self, pitch, channel):
+        self.sent.append(("off", pitch, channel))
+
+    def pitchBend(self, bend, channel=0):
+        self.sent.append(("bend", bend, channel))
+
+    def flush(self):
+        pass
+
+    # everything sent since the last call
+    def take(self):
+        sent, self.sent = self.sent, []
+        return sent
+
+# the table mnc.py saved next to it if it is up to date, otherwise a fresh one
+@pytest.fixture(scope="session")
+def voicingTable():
+    table = loadVoicingTable(os.path.join(PLANNING_DIRECTORY, "voicingtable.bin"))
+    if table is None:
+        table = buildVoicingTable()
+    return table
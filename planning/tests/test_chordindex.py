@@ -0,0 +1,51 @@
+# test_chordindex.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Every gesture in the chord index plays its chord, and a saved index only loads for the mode it was built for.
+
+import struct
+
+import pytest
+
+from theory import MAJOR_MODE, MINOR_MODE
+from chordindex import buildChordIndex, loadChordIndex
+
+@pytest.fixture(scope="module", params=[MAJOR_MODE, MINOR_MODE])
+def chordIndex(request):
+    return buildChordIndex(request.param)
+
+def test_every_gesture_plays_its_chord(chordIndex):
+    assert chordIndex.chords
+    assert chordIndex.verify() == []
+
+def test_saved_index_loads_the_same_chords(chordIndex, tmp_path):
+    path = str(tmp_path / "chordindex.bin")
+    chordIndex.save(path)
+    loaded = loadChordIndex(path, chordIndex.mode)
+    assert loaded is not None
+    assert loaded.mode == chordIndex.mode
+    assert loaded.chords == chordIndex.chords
+    assert loaded.verify() == []
+    pitches = chordIndex.chords[len(chordIndex.chords) // 2][1]
+    assert len(loaded.find(pitches)) == len(chordIndex.find(pitches))
+
+def test_saved_index_is_rejected_for_another_mode(chordIndex, tmp_path):
+    path = str(tmp_path / "chordindex.bin")
+    chordIndex.save(path)
+    otherMode = MINOR_MODE if chordIndex.mode == MAJOR_MODE else MAJOR_MODE
+    assert loadChordIndex(path, otherMode) is None
+
+def test_older_file_version_is_rejected(chordIndex, tmp_path):
+    path = str(tmp_path / "chordindex.bin")
+    chordIndex.save(path)
+    with open(path, "r+b") as handle:
+        handle.seek(4)
+        handle.write(struct.pack("<H", 1))  # the version follows the magic
+    assert loadChordIndex(path, chordIndex.mode) is None
+
+def test_missing_or_truncated_file_is_rejected(tmp_path):
+    path = str(tmp_path / "chordindex.bin")
+    assert loadChordIndex(path) is None
+    with open(path, "wb") as handle:
+        handle.write(b"MNCI")  # shorter than the header
+    assert loadChordIndex(path) is None
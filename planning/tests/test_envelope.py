@@ -0,0 +1,35 @@
+# test_envelope.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# An envelope that raises is dropped, and the scheduler keeps running everything else.
+
+import threading
+
+from envelope import DelayedCall, EnvelopeScheduler
+
+def fail():
+    raise ValueError("broken envelope")
+
+def test_raising_envelope_is_dropped_and_the_rest_still_run(capsys):
+    scheduler = EnvelopeScheduler()
+    scheduler.threaded = False
+    now = [0.0]
+    scheduler.clock = lambda: now[0]
+    ran = []
+    scheduler.start(DelayedCall(fail, 0.01), "broken")
+    scheduler.start(DelayedCall(lambda: ran.append("after"), 0.02), "after")
+
+    now[0] = 1.0
+    assert scheduler.advance(now[0]) is None
+    assert ran == ["after"]
+    assert scheduler.errors == 1
+    assert scheduler.keys == {}
+    assert "broken envelope" in capsys.readouterr().err
+
+def test_scheduler_thread_survives_a_raising_envelope(capsys):
+    scheduler = EnvelopeScheduler()
+    done = threading.Event()
+    scheduler.start(DelayedCall(fail, 0.0))
+    scheduler.start(DelayedCall(done.set, 0.01))
+    assert done.wait(2.0)
+    assert scheduler.errors == 1
@@ -0,0 +1,45 @@
+# test_jitter.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# JitterBuffer lets events go in the order they were sent, and drops the droppable ones that come too late.
+
+from jitter import JitterBuffer
+
+LATENCY = 0.020
+
+def jitterBuffer():
+    released = []
+    buffer = JitterBuffer(lambda kind, message, receivedAt: released.append(message), LATENCY, adaptive=False)
+    return buffer, released
+
+def test_events_go_in_sender_order():
+    buffer, released = jitterBuffer()
+    buffer.add(10.000, "touch", "a", 0.500)
+    buffer.add(10.020, "tilt", "c", 0.505)  # overtook b on the way
+    buffer.add(10.010, "touch", "b", 0.510)
+    assert buffer.release(1.0) is None
+    assert released == ["a", "b", "c"]
+
+def test_events_wait_until_they_are_due():
+    buffer, released = jitterBuffer()
+    buffer.add(10.000, "touch", "a", 0.500)
+    buffer.add(10.010, "touch", "b", 0.510)
+    offset = buffer.clockOffset.offset
+    assert offset == 0.500 - 10.000
+
+    assert buffer.release(0.500) == 10.000 + offset + LATENCY
+    assert released == []
+    assert buffer.release(10.000 + offset + LATENCY) == 10.010 + offset + LATENCY
+    assert released == ["a"]
+
+def test_late_out_of_order_events():
+    buffer, released = jitterBuffer()
+    buffer.add(10.000, "tilt", "a", 0.500)
+    buffer.add(10.020, "tilt", "c", 0.520)
+    buffer.release(1.0)
+
+    buffer.add(10.010, "tilt", "b", 1.100, droppable=True)  # a newer tilt has already gone out
+    buffer.add(10.015, "touch", "b touch", 1.100)            # a touch still goes, at once
+    assert released == ["a", "c", "b touch"]
+    assert (buffer.outOfOrder, buffer.dropped) == (2, 1)
+    assert buffer.heap == []
@@ -0,0 +1,41 @@
+# test_keychange.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# /mnc/key changes the key and mode, moves far transpositions by octaves, and ignores anything unplayable.
+
+import pytest
+
+from theory import *
+from instrument import Performer
+from output import NoteRegistry, NullBackend
+
+from conftest import Message
+
+def performer():
+    return Performer(None, NoteRegistry(NullBackend()))
+
+def changeKey(*arguments):
+    keyPerformer = performer()
+    keyPerformer.handleKeyChange(Message("/mnc/key", list(arguments)))
+    return keyPerformer.keyTable
+
+def test_semitones_and_mode():
+    table = changeKey(-3, MINOR_MODE)  # A minor
+    assert (table.tonic, table.mode) == (-3, MINOR_MODE)
+    assert table is keyTable(-3, MINOR_MODE)
+
+def test_semitones_alone_keep_the_mode():
+    keyPerformer = Performer(None, NoteRegistry(NullBackend()), mode=MINOR_MODE)
+    keyPerformer.handleKeyChange(Message("/mnc/key", [2]))
+    assert (keyPerformer.keyTable.tonic, keyPerformer.keyTable.mode) == (2, MINOR_MODE)
+
+@pytest.mark.parametrize("semitones, tonic", [(17, 5), (-40, -4), (6, -6), (-7, 5), (2.0, 2), ("3", 3)])
+def test_far_transpositions_move_by_octaves(semitones, tonic):
+    table = changeKey(semitones)
+    assert LOWEST_TONIC <= table.tonic <= HIGHEST_TONIC
+    assert table.tonic == tonic
+
+@pytest.mark.parametrize("arguments", [(), ("x",), (float("nan"),), (float("inf"),), (None,), (0, 2), (0, -1),
+                                       (0, "minor")])
+def test_unplayable_keys_are_ignored(arguments):
+    assert changeKey(*arguments) is performer().keyTable
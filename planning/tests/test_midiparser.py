@@ -0,0 +1,35 @@
+# test_midiparser.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# MidiParser splits a MIDI byte stream into messages, following running status.
+
+from midiinput import MidiParser, NOTE_ON, NOTE_OFF, CONTROL_CHANGE
+
+def parse(*chunks):
+    messages = []
+    parser = MidiParser(lambda *message: messages.append(message))
+    for chunk in chunks:
+        parser.feed(bytes(bytearray(chunk)))
+    return messages
+
+def test_running_status_repeats_the_last_status():
+    assert parse([0x91, 60, 100, 64, 90, 67, 0]) == [
+        (NOTE_ON, 1, 60, 100), (NOTE_ON, 1, 64, 90), (NOTE_ON, 1, 67, 0)]
+
+def test_new_status_replaces_running_status():
+    assert parse([0x90, 60, 100, 0x80, 60, 0, 62, 0, 0xB0, 1, 64]) == [
+        (NOTE_ON, 0, 60, 100), (NOTE_OFF, 0, 60, 0), (NOTE_OFF, 0, 62, 0), (CONTROL_CHANGE, 0, 1, 64)]
+
+def test_messages_split_across_reads():
+    assert parse([0x90, 60], [100, 62], [80]) == [(NOTE_ON, 0, 60, 100), (NOTE_ON, 0, 62, 80)]
+
+def test_one_data_byte_messages():
+    assert parse([0xC2, 5, 6, 0xD3, 40]) == [(0xC0, 2, 5, 0), (0xC0, 2, 6, 0), (0xD0, 3, 40, 0)]
+
+def test_real_time_messages_keep_running_status():
+    assert parse([0x90, 60, 0xF8, 100, 0xFE, 62, 0xF8, 80]) == [(NOTE_ON, 0, 60, 100), (NOTE_ON, 0, 62, 80)]
+
+def test_system_messages_end_running_status():
+    # data after a system exclusive message, or before any status, belongs to no channel message
+    assert parse([60, 100, 0x90, 60, 100, 0xF0, 0x7E, 1, 2, 0xF7, 62, 80, 0x90, 64, 70]) == [
+        (NOTE_ON, 0, 60, 100), (NOTE_ON, 0, 64, 70)]
@@ -0,0 +1,48 @@
+# test_noteregistry.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# NoteRegistry counts each (channel, pitch), so a note only stops when its last holder lets go.
+
+from output import NoteRegistry
+
+from conftest import RecordingBackend
+
+def test_note_held_twice_needs_two_note_offs():
+    backend = RecordingBackend()
+    registry = NoteRegistry(backend)
+    registry.noteOn(60, 100, 0)
+    registry.noteOn(60, 100, 0)
+
+    assert registry.noteOff(60, 0)
+    assert registry.isSounding(60, 0)
+    assert ("off", 60, 0) not in backend.sent
+
+    assert registry.noteOff(60, 0)
+    assert not registry.isSounding(60, 0)
+    assert backend.sent.count(("off", 60, 0)) == 1
+
+def test_note_off_for_a_silent_note_sends_nothing():
+    backend = RecordingBackend()
+    registry = NoteRegistry(backend)
+    registry.noteOn(60, 100, 0)
+    assert not registry.noteOff(60, 1)  # same pitch, other channel
+    assert not registry.noteOff(62, 0)
+    assert backend.sent == [("on", 60, 0)]
+
+def test_all_notes_off_on_one_channel():
+    backend = RecordingBackend()
+    registry = NoteRegistry(backend)
+    for pitch in (48, 60, 64):
+        registry.noteOn(pitch, 100, 0)
+    registry.noteOn(60, 100, 0)
+    registry.noteOn(36, 100, 1)
+    backend.sent = []
+
+    registry.allNotesOff(0)
+    assert sorted(backend.sent) == [("off", 48, 0), ("off", 60, 0), ("off", 64, 0)]  # one each, however often held
+    assert registry.soundingNotes(0) == []
+    assert registry.soundingNotes(1) == [36]
+
+    registry.allNotesOff()
+    assert backend.sent[-1] == ("off", 36, 1)
+    assert registry.counts == {}
@@ -0,0 +1,71 @@
+# test_oscoutput.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Releasing the last button sends /mnc/release, with /mnc/bass <pitch> 0 only if a bass was sounding.
+
+import struct
+
+from instrument import Performer
+from oscoutput import OscOutput
+from output import NoteRegistry, NullBackend
+
+# Keeps every packet instead of sending it
+class RecordingSocket(object):
+
+    def __init__(self):
+        self.packets = []
+
+    def sendto(self, packet, destination):
+        self.packets.append(bytes(packet))
+
+def oscString(data, position):
+    end = data.index(b"\0", position)
+    return data[position:end].decode("ascii"), (end + 4) & ~3
+
+# [(address, arguments)] of a bundle of messages with int arguments
+def decodeBundle(packet):
+    assert packet.startswith(b"#bundle\0")
+    messages = []
+    position = 16
+    while position < len(packet):
+        size = struct.unpack_from(">i", packet, position)[0]
+        element = packet[position + 4:position + 4 + size]
+        address, start = oscString(element, 0)
+        tags, start = oscString(element, start)
+        messages.append((address, list(struct.unpack_from(">" + "i" * (len(tags) - 1), element, start))))
+        position += 4 + size
+    return messages
+
+def performerWithOutput():
+    performer = Performer(None, NoteRegistry(NullBackend()))
+    sock = RecordingSocket()
+    performer.useOscOutput(OscOutput([("127.0.0.1", 9000)], sock))
+    return performer, sock
+
+def test_release_stops_the_sounding_bass():
+    performer, sock = performerWithOutput()
+    performer.pressButton("16", 1)
+    performer.toggleBassNote(performer.bassNote, 1.0)
+    bassNote = performer.bassNote
+    performer.pressButton("16", 0)
+    assert decodeBundle(sock.packets[-1]) == [("/mnc/release", []), ("/mnc/bass", [bassNote, 0])]
+
+def test_release_without_a_sounding_bass_sends_no_bass():
+    performer, sock = performerWithOutput()
+    performer.pressButton("16", 1)
+    performer.pressButton("16", 0)  # no chord, so no bass
+    assert decodeBundle(sock.packets[-1]) == [("/mnc/release", [])]
+
+    performer.pressButton("16", 1)
+    performer.toggleBassNote(performer.bassNote, 1.0)
+    performer.pressButton("16", 0)
+    performer.pressButton("16", 1)
+    performer.pressButton("16", 0)  # the bass already stopped on the first release
+    assert decodeBundle(sock.packets[-1]) == [("/mnc/release", [])]
+
+def test_release_without_bass():
+    performer, sock = performerWithOutput()
+    performer.useBass = False
+    performer.pressButton("16", 1)
+    performer.pressButton("16", 0)
+    assert decodeBundle(sock.packets[-1]) == [("/mnc/release", [])]
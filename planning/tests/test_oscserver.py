@@ -0,0 +1,55 @@
+# test_oscserver.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# OscDispatcher parses a whole packet before handling any of it, so only bad packets count as dropped.
+
+import struct
+
+import pytest
+
+from oscserver import OscDispatcher, TOUCH, ACCELEROMETER
+
+def oscString(text):
+    data = text.encode("ascii") + b"\0"
+    return data + b"\0" * (-len(data) % 4)
+
+def message(address, *values):
+    return oscString(address) + oscString("," + "f" * len(values)) + b"".join(struct.pack(">f", value) for value in values)
+
+def bundle(*elements):
+    return b"#bundle\0" + struct.pack(">Q", 1) + b"".join(struct.pack(">i", len(element)) + element for element in elements)
+
+def dispatcher(touchHandler):
+    touchDispatcher = OscDispatcher(touchHandler, lambda message: None)
+    touchDispatcher.addPrefix("/7/push", TOUCH)
+    touchDispatcher.addAddress("/accxyz", ACCELEROMETER)
+    return touchDispatcher
+
+def receive(touchDispatcher, packet):
+    touchDispatcher.receive(bytearray(packet), len(packet), 0.0)
+
+def test_bundled_messages_are_handled_in_order():
+    touches = []
+    touchDispatcher = dispatcher(lambda message: touches.append(message.getAddress()))
+    receive(touchDispatcher, bundle(message("/7/push16", 1.0), bundle(message("/7/push12", 1.0)), message("/other", 1.0)))
+    assert touches == ["/7/push16", "/7/push12"]
+    assert touchDispatcher.dropped == 1  # the unknown address
+
+def test_malformed_bundle_handles_nothing():
+    touches = []
+    touchDispatcher = dispatcher(lambda message: touches.append(message.getAddress()))
+    broken = bundle(message("/7/push16", 1.0), message("/7/push12", 1.0))[:-2]
+    receive(touchDispatcher, broken)
+    assert touches == []
+    assert touchDispatcher.dropped == 1
+
+def test_handler_errors_are_not_malformed_packets():
+    def touchHandler(message):
+        raise ValueError("from the handler")
+    touchDispatcher = dispatcher(touchHandler)
+    with pytest.raises(ValueError):
+        receive(touchDispatcher, message("/7/push16", 1.0))
+    with pytest.raises(ValueError):
+        receive(touchDispatcher, bundle(message("/7/push16", 1.0)))
+    assert touchDispatcher.dropped == 0
+    assert touchDispatcher.bundled == []
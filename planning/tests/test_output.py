@@ -0,0 +1,157 @@
+# test_output.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# The output stages send only what changes between chords, and RawMidiBackend sends it in as few bytes
+# and writes as it can.
+
+from output import ChannelVoices, MpeVoices, RawMidiBackend
+
+from conftest import RecordingBackend
+
+# region ChannelVoices
+def test_first_chord_strikes_every_voice_from_the_bottom_up():
+    backend = RecordingBackend()
+    voices = ChannelVoices(backend, 0)
+    voices.play([48, 52, 55, 60])
+    assert backend.take() == [("on", 48, 0), ("on", 52, 0), ("on", 55, 0), ("on", 60, 0)]
+
+def test_chord_change_only_moves_the_voices_that_change():
+    backend = RecordingBackend()
+    voices = ChannelVoices(backend, 0)
+    voices.play([48, 52, 55, 60])
+    backend.take()
+
+    voices.play([48, 53, 57, 60])  # 48 and 60 are common tones
+    assert backend.take() == [("off", 52, 0), ("off", 55, 0), ("on", 53, 0), ("on", 57, 0)]
+    voices.play([48, 53, 57, 60])
+    assert backend.take() == []
+
+def test_restriking_common_tones_stops_and_starts_every_voice():
+    backend = RecordingBackend()
+    voices = ChannelVoices(backend, 1, restrikeCommonTones=True)
+    voices.play([48, 52])
+    backend.take()
+    voices.play([48, 53])
+    assert backend.take() == [("off", 48, 1), ("off", 52, 1), ("on", 48, 1), ("on", 53, 1)]
+
+def test_leaving_voices_go_to_voiceRelease():
+    backend = RecordingBackend()
+    voices = ChannelVoices(backend, 0)
+    ringing = []
+    voices.voiceRelease = lambda pitch, channel: ringing.append((pitch, channel))
+    voices.play([48, 52])
+    backend.take()
+    voices.play([48, 53])
+    assert ringing == [(52, 0)]
+    assert backend.take() == [("on", 53, 0)]
+    voices.release()
+    assert ringing == [(52, 0), (48, 0), (53, 0)]
+# endregion
+
+# region RawMidiBackend
+# Keeps each write separately
+class RecordingStream(object):
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+
+def test_running_status_and_one_write_per_flush():
+    stream = RecordingStream()
+    backend = RawMidiBackend(stream)
+    backend.noteOn(60, 100, 0)
+    backend.noteOn(64, 100, 0)
+    backend.noteOff(60, 0)       # a note on with velocity 0, so it keeps the running status
+    backend.setVolume(100, 1)
+    backend.noteOn(67, 90, 1)
+    backend.noteOn(69, 90, 1)
+    assert stream.writes == []
+
+    backend.flush()
+    assert stream.writes == [bytes(bytearray([0x90, 60, 100, 64, 100, 60, 0,
+                                              0xB1, 7, 100,
+                                              0x91, 67, 90, 69, 90]))]
+    assert backend.messages == 6
+
+    # a write always starts with a status byte, even if it is the same as the last one sent
+    backend.noteOn(71, 90, 1)
+    backend.flush()
+    assert stream.writes[-1] == bytes(bytearray([0x91, 71, 90]))
+    backend.flush()
+    assert len(stream.writes) == 2  # nothing waiting, nothing written
+
+def test_without_running_status_every_message_has_its_status():
+    stream = RecordingStream()
+    backend = RawMidiBackend(stream, runningStatus=False)
+    backend.noteOn(60, 100, 0)
+    backend.noteOff(60, 0)
+    backend.flush()
+    assert stream.writes == [bytes(bytearray([0x90, 60, 100, 0x90, 60, 0]))]
+
+def test_program_change_and_pitch_bend_bytes():
+    stream = RecordingStream()
+    backend = RawMidiBackend(stream)
+    backend.setInstrument(24, 2)
+    backend.pitchBend(-8192, 3)
+    backend.pitchBend(0, 3)
+    backend.pitchBend(8191, 3)
+    backend.flush()
+    assert stream.writes == [bytes(bytearray([0xC2, 24, 0xE3, 0x00, 0x00, 0x00, 0x40, 0x7F, 0x7F]))]
+# endregion
+
+# region MpeVoices
+CHANNELS = [2, 3, 4, 5]
+
+def channelOf(sent, pitch):
+    return [channel for kind, value, channel in sent if kind == "on" and value == pitch][0]
+
+def test_each_voice_gets_a_channel_of_its_own():
+    backend = RecordingBackend()
+    voices = MpeVoices(backend, CHANNELS)
+    voices.play([60, 64, 67, 72])
+    sent = backend.take()
+    channels = [channelOf(sent, pitch) for pitch in (60, 64, 67, 72)]
+    assert sorted(channels) == CHANNELS
+    for channel in channels:
+        # each channel is centred before its first note
+        assert [message for message in sent if message[2] == channel][0] == ("bend", 0, channel)
+
+def test_nearby_voice_glides_and_far_voice_is_struck_again():
+    backend = RecordingBackend()
+    voices = MpeVoices(backend, CHANNELS, bendRange=2)
+    voices.play([60, 64, 67, 72])
+    sent = backend.take()
+    channel64, channel72 = channelOf(sent, 64), channelOf(sent, 72)
+
+    voices.play([60, 65, 67, 72])  # 64 glides a semitone up, on its own channel
+    assert backend.take() == [("bend", 4096, channel64)]
+
+    voices.play([60, 65, 67, 76])  # 72 to 76 is past the bend range
+    assert backend.take() == [("off", 72, channel72), ("on", 76, channel72)]
+
+    voices.play([60, 64, 67, 76])  # back down to where the note was struck
+    assert backend.take() == [("bend", 0, channel64)]
+
+def test_glide_steps_the_bend_on_the_voice_channel_only():
+    backend = RecordingBackend()
+    voices = MpeVoices(backend, CHANNELS, bendRange=2, glideTime=0.020)
+    voices.startGlides = lambda: True
+    voices.play([60, 64, 67, 72])
+    channel64 = channelOf(backend.take(), 64)
+
+    voices.play([60, 66, 67, 72])  # a whole tone up, a full bend
+    assert backend.take() == []  # nothing moves until the glide steps
+    assert voices.stepGlides(0.000) is not None
+    assert voices.stepGlides(0.010) is not None
+    assert voices.stepGlides(0.020) is None
+    assert backend.take() == [("bend", 4095, channel64), ("bend", 8191, channel64)]
+    assert voices.stepping is False
+
+def test_voices_past_the_pool_are_left_out():
+    backend = RecordingBackend()
+    voices = MpeVoices(backend, CHANNELS[:2])
+    voices.play([60, 64, 67])
+    assert [message for message in backend.take() if message[0] == "on"] == [("on", 60, 2), ("on", 64, 3)]
+# endregion
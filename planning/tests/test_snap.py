@@ -0,0 +1,31 @@
+# test_snap.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Keys snap to the nearest pitch in the scale of chords, and never past the ends of the MIDI range.
+
+from theory import *
+
+def inScale(pitch, scaleOfChordsId, scaleOfChordsRoot):
+    return SCALE_DEGREES[scaleOfChordsId][(pitch - scaleOfChordsRoot) % OCTAVE] != NO_DEGREE
+
+def test_every_key_snaps_into_the_scale_and_the_midi_range():
+    for scaleOfChordsId in range(len(SCALES_OF_CHORDS)):
+        for scaleOfChordsRoot in range(LOWEST_TONIC - 1, HIGHEST_TONIC + OCTAVE + 2):
+            for pitch in range(LOWEST_PITCH, HIGHEST_PITCH + 1):
+                snapped = snapToScaleOfChords(pitch, scaleOfChordsId, scaleOfChordsRoot)
+                assert LOWEST_PITCH <= snapped <= HIGHEST_PITCH
+                assert inScale(snapped, scaleOfChordsId, scaleOfChordsRoot)
+                if LOWEST_PITCH + OCTAVE <= pitch <= HIGHEST_PITCH - OCTAVE:
+                    nearest = min(abs(candidate - pitch) for candidate in range(pitch - OCTAVE, pitch + OCTAVE)
+                                  if inScale(candidate, scaleOfChordsId, scaleOfChordsRoot))
+                    assert abs(snapped - pitch) == nearest
+
+def test_top_key_snaps_down_instead_of_wrapping():
+    scaleOfChordsId = ScaleOfChords.MAJOR_SIXTH_DIMINISHED_SCALE
+    # a root that leaves 127 out of the scale and puts 128 in it, where the nearest pitch would be off the top
+    for scaleOfChordsRoot in range(OCTAVE):
+        if not inScale(127, scaleOfChordsId, scaleOfChordsRoot) and inScale(128, scaleOfChordsId, scaleOfChordsRoot):
+            assert snapToScaleOfChords(127, scaleOfChordsId, scaleOfChordsRoot) < 127
+            break
+    else:
+        assert False, "no root puts 128 but not 127 in the scale"
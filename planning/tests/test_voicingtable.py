@@ -0,0 +1,49 @@
+# test_voicingtable.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# The voicing table gives the same chords as buildContraryChord().
+
+import pytest
+
+from theory import *
+from voicingtable import LOWEST_ROOT, HIGHEST_ROOT, PITCHES, loadVoicingTable
+
+# every root the table covers, and every pitch at a stride that still reaches every pitch class
+INPUTS = [(contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot)
+          for scaleOfChordsId in range(len(SCALES_OF_CHORDS))
+          for scaleOfChordsRoot in range(LOWEST_ROOT, HIGHEST_ROOT + 1)
+          for pivotPitch in range(0, PITCHES, 7)
+          for contraryPitch in range(0, PITCHES, 5)]
+
+def contraryChordOrNone(contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot):
+    try:
+        return buildContraryChord(contraryPitch, pivotPitch, SCALES_OF_CHORDS[scaleOfChordsId], scaleOfChordsRoot)
+    except ValueError:
+        return None
+
+def lookupOrNone(voicingTable, contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot):
+    try:
+        return voicingTable.lookup(contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot)
+    except ValueError:
+        return None
+
+def test_lookup_matches_buildContraryChord(voicingTable):
+    mismatches = [inputs for inputs in INPUTS if lookupOrNone(voicingTable, *inputs) != contraryChordOrNone(*inputs)]
+    assert mismatches == []
+
+def test_lookup_raises_for_pitches_outside_the_scale_of_chords(voicingTable):
+    with pytest.raises(ValueError):
+        voicingTable.lookup(61, 72, ScaleOfChords.MAJOR_SIXTH_DIMINISHED_SCALE, 0)  # C# is not in C major sixth diminished
+
+def test_lookup_outside_the_table_falls_back_to_buildContraryChord(voicingTable):
+    for inputs in [(60, 72, 0, HIGHEST_ROOT + OCTAVE), (60, 72, 0, LOWEST_ROOT - OCTAVE), (-1, 72, 0, 0)]:
+        assert voicingTable.offset(*inputs) == -1
+        assert lookupOrNone(voicingTable, *inputs) == contraryChordOrNone(*inputs)
+
+def test_saved_table_loads_the_same_chords(voicingTable, tmp_path):
+    path = str(tmp_path / "voicingtable.bin")
+    voicingTable.save(path)
+    loaded = loadVoicingTable(path)
+    assert loaded is not None
+    for inputs in INPUTS[::97]:
+        assert lookupOrNone(loaded, *inputs) == lookupOrNone(voicingTable, *inputs)
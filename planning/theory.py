@@ -0,0 +1,443 @@
+# theory.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Scales of chords and the contrary motion voicing rules.
+# Nothing in here touches MIDI or OSC and importing it does nothing but define tables and functions,
+# so it imports in milliseconds under plain Python as well as JythonMusic, for tests, tools and benchmarks.
+
+OCTAVE = 12  # 12 semitones in an octave
+
+# region Scales of Chords
+# Scales of chords by "pitch class". Semitones are assigned to 0-11. 
+MAJOR_SIXTH_DIMINISHED_SCALE = [0, 2, 4, 5, 7, 8, 9, 11]    
+MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD = [0, 1, 3, 4, 5, 7, 8, 10]   
+MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH = [0, 1, 2, 4, 5, 7, 9, 10]   
+MINOR_SEVENTH_DIMINISHED_SCALE = [0, 2, 3, 5, 7, 8, 10, 11] # aka major sixth diminished scale from sixth
+
+MINOR_SIXTH_DIMINISHED_SCALE = [0, 2, 3, 5, 7, 8, 9, 11] 
+MINOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD = [0, 2, 4, 5, 6, 8, 9, 11] 
+MINOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH = [0, 1, 2, 4, 5, 7, 8, 10]
+MINOR_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE = [0, 2, 3, 5, 6, 8, 10, 11] # aka minor sixth diminished scale from sixth
+
+DOMINANT_SEVENTH_DIMINISHED_SCALE = [0, 2, 4, 5, 7, 8, 10, 11]
+DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_THIRD = [0, 1, 3, 4, 6, 7, 8, 10] 
+DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_FIFTH = [0, 1, 3, 4, 5, 7, 9, 10, ]
+DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_SEVENTH = [0, 1, 2, 4, 6, 7, 9, 10]
+
+DOMINANT_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE = [0, 2, 4, 5, 6, 8, 10, 11]
+DOMINANT_ROOTS_AND_THEIR_DIMINISHED = [0, 2, 3, 5, 6, 8, 9, 11] # aka whole-half diminished scale
+
+# integer IDs for the scales of chords, used instead of comparing lists
+class ScaleOfChords(object):
+    MAJOR_SIXTH_DIMINISHED_SCALE = 0
+    MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD = 1
+    MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH = 2
+    MINOR_SEVENTH_DIMINISHED_SCALE = 3
+    MINOR_SIXTH_DIMINISHED_SCALE = 4
+    MINOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD = 5
+    MINOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH = 6
+    MINOR_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE = 7
+    DOMINANT_SEVENTH_DIMINISHED_SCALE = 8
+    DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_THIRD = 9
+    DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_FIFTH = 10
+    DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_SEVENTH = 11
+    DOMINANT_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE = 12
+    DOMINANT_ROOTS_AND_THEIR_DIMINISHED = 13
+
+# scale of chords ID --> name, for printing and dumping tables
+SCALE_OF_CHORDS_NAMES = sorted(
+    [name for name in vars(ScaleOfChords) if not name.startswith("_")],
+    key=lambda name: getattr(ScaleOfChords, name))
+
+# scale of chords ID --> pitch classes
+SCALES_OF_CHORDS = [globals()[name] for name in SCALE_OF_CHORDS_NAMES]
+# endregion
+
+# region Pitch Class Sets
+# A set of pitch classes is a 12 bit mask, bit 0 for pitch class 0, so membership is a shift and transposing a rotation.
+# Each scale of chords also has the degree of every pitch class worked out once, so finding a degree never searches.
+ALL_PITCH_CLASSES = (1 << OCTAVE) - 1
+NO_DEGREE = -1  # degree of a pitch class outside the scale of chords
+
+# bitmask of the pitch classes of some pitches, bit 0 is C
+def pitchClassMask(pitches):
+    mask = 0
+    for pitch in pitches:
+        mask |= 1 << (pitch % OCTAVE)
+    return mask
+
+# pitch classes in a bitmask, lowest first
+def maskPitchClasses(mask):
+    return [pitchClass for pitchClass in range(OCTAVE) if mask >> pitchClass & 1]
+
+# every pitch class of a bitmask moved up by semitones, wrapping around the octave
+def transposePitchClassMask(mask, semitones):
+    semitones %= OCTAVE
+    return ((mask << semitones) | (mask >> (OCTAVE - semitones))) & ALL_PITCH_CLASSES
+
+# pitch class bitmask --> how many pitch classes it has
+PITCH_CLASS_COUNTS = [bin(mask).count("1") for mask in range(1 << OCTAVE)]
+
+# SCALE_OF_CHORDS_MASKS[scaleOfChordsId] --> bitmask of its pitch classes above the root
+SCALE_OF_CHORDS_MASKS = [pitchClassMask(scaleOfChords) for scaleOfChords in SCALES_OF_CHORDS]
+
+# SCALE_DEGREES[scaleOfChordsId][pitch class above the root] --> scale degree 0-7, or NO_DEGREE
+# the other way, scale degree --> pitch class, is SCALES_OF_CHORDS[scaleOfChordsId][degree]
+SCALE_DEGREES = [[scaleOfChords.index(pitchClass) if pitchClass in scaleOfChords else NO_DEGREE
+                  for pitchClass in range(OCTAVE)] for scaleOfChords in SCALES_OF_CHORDS]
+
+def inScaleOfChords(pitch, scaleOfChordsId, scaleOfChordsRoot):
+    return (SCALE_OF_CHORDS_MASKS[scaleOfChordsId] >> ((pitch - scaleOfChordsRoot) % OCTAVE)) & 1 == 1
+
+# scale degree 0-7 of a pitch, or NO_DEGREE if it is not in the scale of chords, see snapToScaleOfChords() for those
+def scaleDegree(pitch, scaleOfChordsId, scaleOfChordsRoot):
+    return SCALE_DEGREES[scaleOfChordsId][(pitch - scaleOfChordsRoot) % OCTAVE]
+
+# bitmask of the pitch classes a scale of chords plays on a root
+def scaleOfChordsMask(scaleOfChordsId, scaleOfChordsRoot):
+    return transposePitchClassMask(SCALE_OF_CHORDS_MASKS[scaleOfChordsId], scaleOfChordsRoot)
+# endregion
+
+# region Scale of Chords Transitions
+# modifier buttons that move from one scale of chords to another
+FAMILY_UP = 0      # scale of chords goes up in minor thirds, ex: Dmin6 --> Fmin6/D
+FAMILY_DOWN = 1    # scale of chords goes down in minor thirds, ex: Dmin6 --> Bmin6/D
+FAMILY_ACROSS = 2  # scale of chords goes across in tritones, ex: Dmin6 --> Abmin6/Eb
+DOMINANT = 3       # any scale of chords becomes a dom7 with the same root
+OPERATION_NAMES = ["FAMILY_UP", "FAMILY_DOWN", "FAMILY_ACROSS", "DOMINANT"]
+
+# (scale of chords, operation) --> (new scale of chords, root offset in semitones)
+# the bass note of the scale of chords cycles through 1 - 3 - 5 - 6/7 for voice leading,
+# so each transformation moves the root by at most a semitone
+_S = ScaleOfChords
+_FAMILY_TRANSITIONS = {
+    FAMILY_UP: {
+        # maj6 variants
+        _S.MAJOR_SIXTH_DIMINISHED_SCALE: (_S.MINOR_SEVENTH_DIMINISHED_SCALE, 0),
+        _S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD: (_S.MAJOR_SIXTH_DIMINISHED_SCALE, -1),
+        _S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD, 0),
+        _S.MINOR_SEVENTH_DIMINISHED_SCALE: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH, 1),
+        # min6 variants
+        _S.MINOR_SIXTH_DIMINISHED_SCALE: (_S.MINOR_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE, 0),
+        _S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD: (_S.MINOR_SIXTH_DIMINISHED_SCALE, 0),
+        _S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH: (_S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD, -1),
+        _S.MINOR_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE: (_S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH, 1),
+        # dom7 variants
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_SEVENTH, 1),
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_THIRD: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE, -1),
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_FIFTH: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_THIRD, 0),
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_SEVENTH: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_FIFTH, 0),
+    },
+    FAMILY_DOWN: {
+        # maj6 variants
+        _S.MAJOR_SIXTH_DIMINISHED_SCALE: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD, 1),
+        _S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH, 0),
+        _S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH: (_S.MINOR_SEVENTH_DIMINISHED_SCALE, -1),
+        _S.MINOR_SEVENTH_DIMINISHED_SCALE: (_S.MAJOR_SIXTH_DIMINISHED_SCALE, 0),
+        # min6 variants
+        _S.MINOR_SIXTH_DIMINISHED_SCALE: (_S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD, 0),
+        _S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD: (_S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH, 1),
+        _S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH: (_S.MINOR_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE, -1),
+        _S.MINOR_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE: (_S.MINOR_SIXTH_DIMINISHED_SCALE, 0),
+        # dom7 variants
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_THIRD, 1),
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_THIRD: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_FIFTH, 0),
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_FIFTH: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_SEVENTH, 0),
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_SEVENTH: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE, -1),
+    },
+    FAMILY_ACROSS: {
+        # maj6 variants
+        _S.MAJOR_SIXTH_DIMINISHED_SCALE: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH, 1),
+        _S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD: (_S.MINOR_SEVENTH_DIMINISHED_SCALE, -1),
+        _S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH: (_S.MAJOR_SIXTH_DIMINISHED_SCALE, -1),
+        _S.MINOR_SEVENTH_DIMINISHED_SCALE: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD, 1),
+        # min6 variants
+        _S.MINOR_SIXTH_DIMINISHED_SCALE: (_S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH, 1),
+        _S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD: (_S.MINOR_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE, 0),
+        _S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH: (_S.MINOR_SIXTH_DIMINISHED_SCALE, -1),
+        _S.MINOR_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE: (_S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD, 0),
+        # dom7 variants
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_FIFTH, 1),
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_THIRD: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_SEVENTH, 0),
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_FIFTH: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE, -1),
+        _S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_SEVENTH: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_THIRD, 0),
+    },
+}
+
+# SCALE_OF_CHORDS_TRANSITIONS[operation][scaleOfChordsId] --> (new scale of chords ID, root offset)
+# scales of chords without a family stay where they are
+SCALE_OF_CHORDS_TRANSITIONS = [
+    [_FAMILY_TRANSITIONS[operation].get(scaleOfChordsId, (scaleOfChordsId, 0))
+        for scaleOfChordsId in range(len(SCALES_OF_CHORDS))]
+    for operation in (FAMILY_UP, FAMILY_DOWN, FAMILY_ACROSS)
+] + [
+    [(_S.DOMINANT_SEVENTH_DIMINISHED_SCALE, 0) for scaleOfChordsId in range(len(SCALES_OF_CHORDS))]
+]
+
+# chord numeral --> (alternate scale of chords ID, degree of the key for its root)
+ALTERNATE_SCALES_OF_CHORDS = {
+    1: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH, 1),    # the major 6th on the 5, ex: Cmaj6 --> Gmaj6/C (Cmaj9)
+    2: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD, 2),    # ex: Dmin7 --> Cmaj6/D (Dmin11)
+    3: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD, 2),    # ex: Emin7 --> Cmaj6/E
+    4: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH, 4),    # ex: Fmaj6dim --> Cmaj6dim/F (Fmaj9)
+    5: (_S.MINOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH, 5),    # minor 6th on the 5, ex: G7dim --> Dmin6dim/G
+    6: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_THIRD, 6),    # ex: Amin7 --> Gmaj6/A (Amin11)
+    7: (_S.DOMINANT_SEVENTH_DIMINISHED_SCALE_FROM_THIRD, 6),  # ex: Bmin7b5 --> G7/B
+    8: (_S.MAJOR_SIXTH_DIMINISHED_SCALE_FROM_FIFTH, 1),    # same as the 1 chord
+}
+del _S
+
+# scale of chords ID and root after a family or dominant transformation, with one lookup in the transition tables
+def transformScaleOfChords(operation, scaleOfChordsId, scaleOfChordsRoot):
+    newScaleOfChordsId, rootOffset = SCALE_OF_CHORDS_TRANSITIONS[operation][scaleOfChordsId]
+    return newScaleOfChordsId, scaleOfChordsRoot + rootOffset
+
+# scale of chords ID and root of a chord numeral's alternate in a key, or None if it has no alternate
+def alternateScaleOfChords(chordNumeral, key):
+    if chordNumeral not in ALTERNATE_SCALES_OF_CHORDS:
+        return None
+    newScaleOfChordsId, keyDegree = ALTERNATE_SCALES_OF_CHORDS[chordNumeral]
+    return newScaleOfChordsId, key[keyDegree]
+
+# one line per transition, so the tables can be dumped and diffed
+def formatTransitionTables():
+    lines = []
+    for operation, transitions in enumerate(SCALE_OF_CHORDS_TRANSITIONS):
+        for scaleOfChordsId, (newScaleOfChordsId, rootOffset) in enumerate(transitions):
+            lines.append("%s %s -> %s %+d" % (OPERATION_NAMES[operation], SCALE_OF_CHORDS_NAMES[scaleOfChordsId],
+                SCALE_OF_CHORDS_NAMES[newScaleOfChordsId], rootOffset))
+    for chordNumeral in sorted(ALTERNATE_SCALES_OF_CHORDS):
+        newScaleOfChordsId, keyDegree = ALTERNATE_SCALES_OF_CHORDS[chordNumeral]
+        lines.append("ALTERNATE %d -> %s KEY[%d]" % (chordNumeral, SCALE_OF_CHORDS_NAMES[newScaleOfChordsId], keyDegree))
+    return lines
+# endregion
+
+# region Keys
+# 7 note scales, different from the "scales of chords". Used to follow typical chord progression notations.
+MAJOR_KEY = [0, 2, 4, 5, 7, 9, 11]  # same as JythonMusic's MAJOR_SCALE
+MINOR_KEY = [0, 2, 3, 5, 7, 8, 10]  # same as JythonMusic's MINOR_SCALE
+MAJOR_MODE = 0
+MINOR_MODE = 1
+MODE_NAMES = ["major", "minor"]
+MODE_KEYS = [MAJOR_KEY, MINOR_KEY]
+
+_S = ScaleOfChords
+# scale of chords ID for each chord numeral 1-8, by mode
+NUMERAL_SCALES_OF_CHORDS = [
+    [_S.MAJOR_SIXTH_DIMINISHED_SCALE, _S.MINOR_SEVENTH_DIMINISHED_SCALE, _S.MINOR_SEVENTH_DIMINISHED_SCALE,
+     _S.MAJOR_SIXTH_DIMINISHED_SCALE, _S.DOMINANT_SEVENTH_DIMINISHED_SCALE, _S.MINOR_SEVENTH_DIMINISHED_SCALE,
+     _S.MINOR_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE, _S.MAJOR_SIXTH_DIMINISHED_SCALE],
+    # ex: Cmin6, Dmin7b5, Ebmaj6, Fmin7, G7, Abmaj6, Bb7, Cmin6, the 5 chord borrowed from harmonic minor
+    [_S.MINOR_SIXTH_DIMINISHED_SCALE, _S.MINOR_SEVENTH_FLAT_FIVE_DIMINISHED_SCALE, _S.MAJOR_SIXTH_DIMINISHED_SCALE,
+     _S.MINOR_SEVENTH_DIMINISHED_SCALE, _S.DOMINANT_SEVENTH_DIMINISHED_SCALE, _S.MAJOR_SIXTH_DIMINISHED_SCALE,
+     _S.DOMINANT_SEVENTH_DIMINISHED_SCALE, _S.MINOR_SIXTH_DIMINISHED_SCALE],
+]
+del _S
+
+BASS_OCTAVE_OFFSET = OCTAVE * 3
+LOWEST_TONIC = -6  # keys go from F# below C...
+HIGHEST_TONIC = 5  # ... to F above it, so every key is within a tritone of C
+
+# tonic of the key a transposition plays in, moved by octaves to between LOWEST_TONIC and HIGHEST_TONIC
+def keyTonic(semitones):
+    return (semitones - LOWEST_TONIC) % OCTAVE + LOWEST_TONIC
+
+# Everything a chord numeral sets, for one key, with the key already added to every pitch
+class KeyTable(object):
+    __slots__ = ("tonic", "mode", "key", "numerals", "alternates")
+
+    def __init__(self, tonic, mode):
+        self.tonic = tonic
+        self.mode = mode
+        self.key = [tonic + degree for degree in MODE_KEYS[mode]]  # pitch of each degree of the key
+        self.numerals = [None]    # chord numeral --> (scale of chords ID, root, bass note)
+        self.alternates = [None]  # chord numeral --> (scale of chords ID, root) of its alternate, or None
+        for chordNumeral, scaleOfChordsId in enumerate(NUMERAL_SCALES_OF_CHORDS[mode], 1):
+            root = self.key[(chordNumeral - 1) % len(self.key)]
+            if chordNumeral > len(self.key): root += OCTAVE  # the 8 chord is the 1 chord an octave up
+            self.numerals.append((scaleOfChordsId, root, root + BASS_OCTAVE_OFFSET))
+            self.alternates.append(alternateScaleOfChords(chordNumeral, self.key))
+
+# KEY_TABLES[mode][tonic - LOWEST_TONIC] --> KeyTable, so changing key is one lookup
+KEY_TABLES = [[KeyTable(tonic, mode) for tonic in range(LOWEST_TONIC, HIGHEST_TONIC + 1)]
+              for mode in range(len(MODE_KEYS))]
+
+# key table for a transposition from C, in semitones, and a mode
+def keyTable(semitones, mode=MAJOR_MODE):
+    return KEY_TABLES[mode][keyTonic(semitones) - LOWEST_TONIC]
+# endregion
+
+# region Tilt
+# (lowest tilt, highest tilt, scale degree at the lowest, scale degree at the highest)
+TILT_X_RANGE = (-1.0, 0.1, 0, 9)  # roll --> scale degree
+TILT_Y_RANGE = (-1.0, 0.0, 9, 0)  # pitch --> scale degree
+
+# scale degree for a tilt value, truncated like JythonMusic's mapValue()
+def tiltToScaleDegree(value, minValue, maxValue, minDegree, maxDegree):
+    value = min(max(value, minValue), maxValue)
+    return int((value - minValue) / (maxValue - minValue) * (maxDegree - minDegree) + minDegree)
+
+# tilt value in the middle of the values tiltToScaleDegree() maps to a scale degree
+def tiltForScaleDegree(degree, minValue, maxValue, minDegree, maxDegree):
+    edges = [minValue + float(step - minDegree) / (maxDegree - minDegree) * (maxValue - minValue)
+             for step in (degree, degree + 1)]
+    low = max(min(edges), minValue)
+    high = min(max(edges), maxValue)
+    return (low + high) / 2
+
+# contrary and pivot pitches for the scale degrees tilt was mapped to
+def scaleDegreesToPitches(xMapped, yMapped, scaleOfChords, scaleOfChordsRoot, offChordLock):
+    if offChordLock:
+        # if off chord locked, only play odd scale degrees
+        if xMapped % 2 == 0: xMapped += 1
+
+    else:
+        # if on chord locked, only play even scale degrees
+        if xMapped % 2 == 1: xMapped += 1
+
+    # x
+    octaveX = (xMapped // 8) + 4
+    scaleDegree = xMapped % 8
+    pitchX = scaleOfChords[scaleDegree] + scaleOfChordsRoot + (octaveX * OCTAVE)
+
+    # y
+    octaveY = (yMapped // 8) + 5
+    scaleDegree = yMapped % 8
+    pitchY = scaleOfChords[scaleDegree] + scaleOfChordsRoot + (octaveY * OCTAVE)
+
+    return [pitchX, pitchY]
+
+# Map accelerometer values to pitches, as the instrument does with no smoothing or hysteresis
+def mapAccelerometerToPitch(x, y, scaleOfChords, scaleOfChordsRoot, offChordLock):
+    # Ensure x and y are within range
+    if x > 0.0: x = 0.0
+    if y > 0.0: y = 0.0
+
+    # map acc range to octave + 1 range, ex. C4-C5
+    xMapped = tiltToScaleDegree(x, *TILT_X_RANGE)
+    yMapped = tiltToScaleDegree(y, *TILT_Y_RANGE)
+    return scaleDegreesToPitches(xMapped, yMapped, scaleOfChords, scaleOfChordsRoot, offChordLock)
+# endregion
+
+# region Snapping
+LOWEST_PITCH = 0     # MIDI note numbers a snapped pitch stays within
+HIGHEST_PITCH = 127
+
+# semitones from each pitch class above the root to the nearest one in a scale of chords, ties go down
+# directions (-1, 1) for the nearest either way, (-1,) for the nearest at or below, (1,) at or above
+def _snapOffsets(mask, directions=(-1, 1)):
+    offsets = []
+    for pitchClass in range(OCTAVE):
+        inScale = [direction * distance for distance in range(OCTAVE) for direction in directions
+                   if mask >> ((pitchClass + direction * distance) % OCTAVE) & 1]
+        offsets.append(inScale[0])
+    return offsets
+
+# SNAP_TO_SCALE_OF_CHORDS[scaleOfChordsId][pitch class above the root] --> semitones to move the pitch by
+# pitches in the scale of chords move by 0
+SNAP_TO_SCALE_OF_CHORDS = [_snapOffsets(mask) for mask in SCALE_OF_CHORDS_MASKS]
+SNAP_DOWN_TO_SCALE_OF_CHORDS = [_snapOffsets(mask, (-1,)) for mask in SCALE_OF_CHORDS_MASKS]  # for the top of the range
+SNAP_UP_TO_SCALE_OF_CHORDS = [_snapOffsets(mask, (1,)) for mask in SCALE_OF_CHORDS_MASKS]     # for the bottom
+
+# nearest pitch in the scale of chords, with one lookup, so a played note never falls outside the scale
+# pitches snap inwards at the ends of LOWEST_PITCH to HIGHEST_PITCH, ex: 127 never becomes 128
+def snapToScaleOfChords(pitch, scaleOfChordsId, scaleOfChordsRoot):
+    pitchClass = (pitch - scaleOfChordsRoot) % OCTAVE
+    snapped = pitch + SNAP_TO_SCALE_OF_CHORDS[scaleOfChordsId][pitchClass]
+    if snapped > HIGHEST_PITCH:
+        return pitch + SNAP_DOWN_TO_SCALE_OF_CHORDS[scaleOfChordsId][pitchClass]
+    if snapped < LOWEST_PITCH:
+        return pitch + SNAP_UP_TO_SCALE_OF_CHORDS[scaleOfChordsId][pitchClass]
+    return snapped
+# endregion
+
+# region Voicings
+# chord voicings by width
+OCTAVE_CHORD = 5
+DROP_2 = 6
+DROP_3 = 7
+DROP_2_AND_4 = 8
+DOUBLE_OCTAVE_CHORD = 9
+MAX_CHORD_WIDTH = DOUBLE_OCTAVE_CHORD  # max chord size is double octave chord so oblique motion works
+MAX_VOICES = 4
+VOICING_NAMES = ["none", "single note", "two notes", "three notes", "close",
+                 "octave", "drop 2", "drop 3", "drop 2 and 4", "double octave"]  # by width, "none" for no chord or pitches outside the scale of chords
+
+# fill in the middle of contrary motion chords, take a note - skip a note
+# raises ValueError if either pitch is not in the scale of chords
+def buildContraryChord(contraryPitch, pivotPitch, scaleOfChords, scaleOfChordsRoot):
+    chord = []
+
+    # If playing the pivot pitch, play one note
+    if contraryPitch >= pivotPitch:
+        chord.append(pivotPitch)
+        return chord
+
+    # Map pitches to a pitch class (0 to 11),
+    # adjusted to make "0" represent the scale root
+    inputPitchClass  = (contraryPitch - scaleOfChordsRoot) % OCTAVE
+    pivotPitchClass = (pivotPitch - scaleOfChordsRoot) % OCTAVE
+
+    inputOctave = (contraryPitch - scaleOfChordsRoot) // OCTAVE # the octave of the input note, counted from the root
+    currentOctave = inputOctave
+    octaveSpread = (abs(contraryPitch - pivotPitch)) // OCTAVE # how many octaves apart are the input and pivot pitches?
+    inputScaleDegree = scaleOfChords.index(inputPitchClass) # the scale degree of the input note (0-7)
+    pivotScaleDegree = scaleOfChords.index(pivotPitchClass) # the scale degree of the pivot note (0-7)
+    previousPitch = contraryPitch
+
+    # How many notes should be in the chord?
+    chordWidth = 1 + ((pivotScaleDegree - inputScaleDegree) % 8) + (8 * octaveSpread)
+    chordWidth = min(chordWidth, MAX_CHORD_WIDTH)
+
+    # Fill in the chord list by taking a note, skipping a note, taking a note...
+    # until the desired chord width is achieved
+    contrary = 0 # used for iteration to build the polyphony
+    for note in range(1, chordWidth+1):
+        currentPitch = scaleOfChords[(inputScaleDegree + contrary) % 8] + scaleOfChordsRoot + (OCTAVE * (currentOctave - 1))
+        
+        # Keep adding higher notes
+        if currentPitch < previousPitch:
+            currentOctave += 1
+            currentPitch += OCTAVE
+        
+        contrary += 2
+        previousPitch = currentPitch
+        
+        # maintain 4 voices
+        if (chordWidth == OCTAVE_CHORD and note == 3) or\
+        (chordWidth == DROP_2 and note in (2, 5) ) or\
+        (chordWidth == DROP_3 and note in (2, 3, 5) ) or\
+        (chordWidth == DROP_2_AND_4 and note in (2, 4, 5, 7) ) or\
+        (chordWidth == DOUBLE_OCTAVE_CHORD and note in (2, 3, 5, 7, 8)): 
+            continue
+    
+        # Add a pitch to the chord
+        chord.append(currentPitch)
+
+    # Return the complete chord 
+    return chord
+
+# width of a voicing from its lowest and highest notes, which are 2 scale degrees apart for each note filled in
+# 1 for a single note, 0 for no chord or one with notes outside the scale of chords, see VOICING_NAMES
+def voicingWidth(chord, scaleOfChordsId, scaleOfChordsRoot):
+    if not chord:
+        return 0
+    lowest, highest = min(chord), max(chord)
+    if lowest == highest:
+        return 1
+    degrees = SCALE_DEGREES[scaleOfChordsId]
+    lowestDegree = degrees[(lowest - scaleOfChordsRoot) % OCTAVE]
+    highestDegree = degrees[(highest - scaleOfChordsRoot) % OCTAVE]
+    if lowestDegree == NO_DEGREE or highestDegree == NO_DEGREE:
+        return 0
+    steps = (highestDegree - lowestDegree) % 8 + 8 * ((highest - lowest) // OCTAVE)
+    return min(steps // 2 + 1, MAX_CHORD_WIDTH)
+
+# contrary motion chord for a scale of chords ID, see buildContraryChord()
+def contraryMotion(contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot):
+    return buildContraryChord(contraryPitch, pivotPitch, SCALES_OF_CHORDS[scaleOfChordsId], scaleOfChordsRoot)
+# endregion
+
+if __name__ == "__main__":
+    for line in formatTransitionTables():
+        print(line)
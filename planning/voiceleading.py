@@ -0,0 +1,99 @@
+# voiceleading.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Voice leading between chords of different scales of chords.
+# Every voicing a scale of chords can play (every contrary motion width, at every octave within range)
+# is listed once per scale of chords and root, grouped by its pitch classes. When the chord numeral changes,
+# the voicing of the new chord that moves the voices least from the last chord is played instead,
+# and each decision is remembered, so a repeated change is one dictionary lookup.
+
+from theory import *
+
+# region Constants
+LOWEST_PITCH = 36   # C2, voicings reaching below this are not considered
+HIGHEST_PITCH = 96  # C7, or above this
+MAX_SPREAD = 2 * OCTAVE  # widest contrary motion considered, the double octave chord
+CHOICE_CACHE_SIZE = 4096  # remembered decisions, forgotten all at once when full
+# endregion
+
+# total voice movement from one chord to another
+# chords are lowest note first, so voices pair up in order when the sizes match,
+# otherwise each new voice moves from the nearest old one
+def voiceMovement(fromChord, toChord):
+    if len(fromChord) == len(toChord):
+        movement = 0
+        for index in range(len(toChord)):
+            movement += abs(toChord[index] - fromChord[index])
+        return movement
+    movement = 0
+    for pitch in toChord:
+        movement += min([abs(pitch - fromPitch) for fromPitch in fromChord])
+    return movement
+
+class VoiceLeading(object):
+
+    def __init__(self, voicingTable=None, lowestPitch=LOWEST_PITCH, highestPitch=HIGHEST_PITCH):
+        self.voicingTable = voicingTable  # faster than building each voicing, if there is one
+        self.lowestPitch = lowestPitch
+        self.highestPitch = highestPitch
+        self.voicings = {}  # (scale of chords ID, root) --> {(pitch classes, voice count): [voicings]}
+        self.choices = {}   # (last chord, scale of chords ID, root, chord) --> chord to play
+
+    # every voicing of a scale of chords and root within range, grouped by pitch classes and voice count
+    def voicingsFor(self, scaleOfChordsId, scaleOfChordsRoot):
+        key = (scaleOfChordsId, scaleOfChordsRoot)
+        voicings = self.voicings.get(key)
+        if voicings is not None:
+            return voicings
+
+        inScale = [pitch for pitch in range(self.lowestPitch, self.highestPitch + 1)
+                   if inScaleOfChords(pitch, scaleOfChordsId, scaleOfChordsRoot)]
+        found = {}
+        for pivotPitch in inScale:
+            for contraryPitch in inScale:
+                if contraryPitch >= pivotPitch:
+                    break
+                if pivotPitch - contraryPitch > MAX_SPREAD:
+                    continue
+                chord = tuple(self._voicing(contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot))
+                if chord and chord[0] >= self.lowestPitch and chord[-1] <= self.highestPitch:
+                    found.setdefault(self._shape(chord), set()).add(chord)
+
+        voicings = self.voicings[key] = dict((shape, sorted(chords)) for shape, chords in found.items())
+        return voicings
+
+    def _voicing(self, contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot):
+        if self.voicingTable is not None:
+            return self.voicingTable.lookup(contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot)
+        return contraryMotion(contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot)
+
+    # what makes two voicings the same chord: the same pitch classes, in the same number of voices
+    def _shape(self, chord):
+        return (frozenset([pitch % OCTAVE for pitch in chord]), len(chord))
+
+    # list the voicings of these scales of chords and roots now, instead of on the first tap that needs them
+    def precompute(self, scaleOfChordsIds, scaleOfChordsRoots):
+        for scaleOfChordsId in scaleOfChordsIds:
+            for scaleOfChordsRoot in scaleOfChordsRoots:
+                self.voicingsFor(scaleOfChordsId, scaleOfChordsRoot)
+
+    # the voicing of chord that moves least from lastChord, chord itself if nothing moves less
+    def lead(self, lastChord, chord, scaleOfChordsId, scaleOfChordsRoot):
+        if not lastChord or len(chord) < 2:
+            return chord
+        key = (tuple(lastChord), scaleOfChordsId, scaleOfChordsRoot, tuple(chord))
+        choice = self.choices.get(key)
+        if choice is not None:
+            return list(choice)
+
+        best, bestMovement = tuple(chord), voiceMovement(lastChord, chord)
+        candidates = self.voicingsFor(scaleOfChordsId, scaleOfChordsRoot).get(self._shape(chord), ())
+        for candidate in candidates:
+            movement = voiceMovement(lastChord, candidate)
+            if movement < bestMovement:
+                best, bestMovement = candidate, movement
+
+        if len(self.choices) >= CHOICE_CACHE_SIZE:
+            self.choices.clear()
+        self.choices[key] = best
+        return list(best)
@@ -0,0 +1,152 @@
+# voicingtable.py
+# Movements, Not Chords by Trevor Ritchie
+#
+# Precomputed contrary motion voicings.
+# Every (scale of chords, root, pivot pitch, contrary pitch) is built once with buildContraryChord()
+# and stored in one flat byte array, so playing a chord is a single indexed read.
+# The array is saved to disk and memory-mapped on the next run when mmap is available.
+
+from array import array
+import os
+import struct
+
+from theory import *
+
+try:
+    import mmap
+except ImportError:
+    mmap = None  # Jython has no mmap, the table is read into memory instead
+if bytes is str:
+    mmap = None  # Python 2 memoryviews index as characters, not ints
+
+# region Constants
+PITCHES = 128                 # MIDI pitches 0-127, for both the pivot and the contrary pitch
+LOWEST_ROOT = LOWEST_TONIC - 1            # family transformations can move a root a semitone below the lowest key
+HIGHEST_ROOT = HIGHEST_TONIC + OCTAVE + 1  # ... or a semitone above the 8 chord of the highest
+ROOTS = HIGHEST_ROOT - LOWEST_ROOT + 1
+ENTRY_SIZE = 1 + MAX_VOICES   # note count, then up to 4 pitches
+NOT_IN_SCALE = 255            # note count for inputs where buildContraryChord() raises ValueError
+PITCH_BIAS = OCTAVE           # voicings can reach a semitone below pitch 0, so pitches are stored an octave up
+
+FILE_MAGIC = b"MNCV"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHHhHH")  # magic, version, scales, lowest root, roots, pitches
+# endregion
+
+class VoicingTable(object):
+
+    def __init__(self, data, source=None):
+        self.data = data      # anything indexable by byte offset that yields ints
+        self.source = source  # file the table was loaded from, if any
+
+    # offset of the entry for these inputs, or -1 if they are outside the table
+    def offset(self, contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot):
+        root = scaleOfChordsRoot - LOWEST_ROOT
+        if not (0 <= root < ROOTS and 0 <= pivotPitch < PITCHES and 0 <= contraryPitch < PITCHES):
+            return -1
+        return ((((scaleOfChordsId * ROOTS) + root) * PITCHES + pivotPitch) * PITCHES + contraryPitch) * ENTRY_SIZE
+
+    # same result as buildContraryChord(), including the ValueError for pitches outside the scale of chords
+    def lookup(self, contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot):
+        offset = self.offset(contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot)
+        if offset < 0:
+            return buildContraryChord(contraryPitch, pivotPitch, SCALES_OF_CHORDS[scaleOfChordsId], scaleOfChordsRoot)
+
+        data = self.data
+        count = data[offset]
+        if count == NOT_IN_SCALE:
+            raise ValueError("pitch is not in the scale of chords")
+        return [data[offset + 1 + voice] - PITCH_BIAS for voice in range(count)]
+
+    # compare every entry with buildContraryChord(), returns a list of mismatched inputs
+    def verify(self):
+        mismatches = []
+        for scaleOfChordsId, scaleOfChords in enumerate(SCALES_OF_CHORDS):
+            for scaleOfChordsRoot in range(LOWEST_ROOT, HIGHEST_ROOT + 1):
+                for pivotPitch in range(PITCHES):
+                    for contraryPitch in range(PITCHES):
+                        try:
+                            expected = buildContraryChord(contraryPitch, pivotPitch, scaleOfChords, scaleOfChordsRoot)
+                        except ValueError:
+                            expected = None
+                        try:
+                            actual = self.lookup(contraryPitch, pivotPitch, scaleOfChordsId, scaleOfChordsRoot)
+                        except ValueError:
+                            actual = None
+                        if actual != expected:
+                            mismatches.append((scaleOfChordsId, scaleOfChordsRoot, pivotPitch, contraryPitch))
+        return mismatches
+
+    # write the header and entries to a file that load() can memory-map
+    def save(self, path):
+        handle = open(path, "wb")
+        try:
+            handle.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(SCALES_OF_CHORDS), LOWEST_ROOT, ROOTS, PITCHES))
+            array("B", self.data).tofile(handle)
+        finally:
+            handle.close()
+
+# build every entry from buildContraryChord()
+def buildVoicingTable():
+    data = array("B", [0]) * (len(SCALES_OF_CHORDS) * ROOTS * PITCHES * PITCHES * ENTRY_SIZE)
+    offset = 0
+    for scaleOfChords in SCALES_OF_CHORDS:
+        for scaleOfChordsRoot in range(LOWEST_ROOT, HIGHEST_ROOT + 1):
+            for pivotPitch in range(PITCHES):
+                for contraryPitch in range(PITCHES):
+                    try:
+                        chord = buildContraryChord(contraryPitch, pivotPitch, scaleOfChords, scaleOfChordsRoot)
+                    except ValueError:
+                        data[offset] = NOT_IN_SCALE
+                    else:
+                        data[offset] = len(chord)
+                        for voice, pitch in enumerate(chord):
+                            data[offset + 1 + voice] = pitch + PITCH_BIAS
+                    offset += ENTRY_SIZE
+    return VoicingTable(data)
+
+# open a table saved by VoicingTable.save(), returns None if the file is missing or out of date
+def loadVoicingTable(path):
+    if not os.path.exists(path):
+        return None
+
+    handle = open(path, "rb")
+    try:
+        header = FILE_HEADER.unpack(handle.read(FILE_HEADER.size))
+        if header != (FILE_MAGIC, FILE_VERSION, len(SCALES_OF_CHORDS), LOWEST_ROOT, ROOTS, PITCHES):
+            return None
+
+        size = len(SCALES_OF_CHORDS) * ROOTS * PITCHES * PITCHES * ENTRY_SIZE
+        if mmap is not None:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            data = memoryview(mapped)[FILE_HEADER.size:FILE_HEADER.size + size]
+        else:
+            data = array("B")
+            data.fromfile(handle, size)
+    finally:
+        handle.close()
+    return VoicingTable(data, path)
+
+# load the table from disk, building and saving it first if needed
+def getVoicingTable(path):
+    table = loadVoicingTable(path)
+    if table is None:
+        table = buildVoicingTable()
+        table.save(path)
+        table.source = path
+    return table
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "voicingtable.bin")
+    start = time.time()
+    table = buildVoicingTable()
+    table.save(path)
+    print("Built " + path + " in " + str(round(time.time() - start, 1)) + "s")
+
+    start = time.time()
+    mismatches = loadVoicingTable(path).verify()
+    print("Verified in " + str(round(time.time() - start, 1)) + "s, " + str(len(mismatches)) + " mismatches")
+    sys.exit(1 if mismatches else 0)